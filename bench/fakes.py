@@ -0,0 +1,129 @@
+"""벤치마크용 가짜 Discord 객체
+
+cog 의 명령어 콜백이 실제로 쓰는 속성만 흉내 냅니다. 응답은 네트워크로 보내지 않고 기록만 합니다.
+"""
+import itertools
+from types import SimpleNamespace
+
+_message_ids = itertools.count(1)
+
+ADMIN = SimpleNamespace(administrator=True)
+MEMBER = SimpleNamespace(administrator=False)
+
+
+class FakeMember:
+    __slots__ = ("id", "name", "guild", "guild_permissions")
+
+    def __init__(self, user_id, guild, admin=False):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.guild = guild
+        self.guild_permissions = ADMIN if admin else MEMBER
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    @property
+    def display_name(self):
+        return self.name
+
+
+class FakeChannel:
+    __slots__ = ("id", "name", "guild")
+
+    def __init__(self, channel_id, guild):
+        self.id = channel_id
+        self.name = f"channel{channel_id}"
+        self.guild = guild
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    async def send(self, *args, **kwargs):
+        return FakeMessage()
+
+
+class FakeGuild:
+    def __init__(self, guild_id, member_ids, channel_ids):
+        self.id = guild_id
+        self.name = f"guild{guild_id}"
+        self._members = {user_id: FakeMember(user_id, self) for user_id in member_ids}
+        self._channels = {channel_id: FakeChannel(channel_id, self) for channel_id in channel_ids}
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    @property
+    def member_count(self):
+        return len(self._members)
+
+    @property
+    def chunked(self):
+        return True
+
+    @property
+    def channels(self):
+        return list(self._channels.values())
+
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_role(self, role_id):
+        return None
+
+
+class FakeMessage:
+    __slots__ = ("id",)
+
+    def __init__(self):
+        self.id = next(_message_ids)
+
+    async def edit(self, **kwargs):
+        pass
+
+
+class FakeResponse:
+    def __init__(self):
+        self.sent = []  # (content, kwargs)
+        self.view = None
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.view = kwargs.get("view", self.view)
+        self.sent.append((content, kwargs))
+
+    async def edit_message(self, **kwargs):
+        self._done = True
+        self.view = kwargs.get("view", self.view)
+        self.sent.append((kwargs.get("content"), kwargs))
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+
+class FakeInteraction:
+    def __init__(self, guild, user, channel, command=None):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel = channel
+        self.channel_id = channel.id
+        self.command = command
+        self.response = FakeResponse()
+        self.extras = {}
+        self._message = None
+
+    async def original_response(self):
+        if self._message is None:
+            self._message = FakeMessage()
+        return self._message
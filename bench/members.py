@@ -0,0 +1,104 @@
+"""멤버 캐시 메모리 벤치마크
+
+GUILD_CREATE 와 같은 형식의 가짜 서버 데이터로 discord.py 의 Guild 를 만들어서
+MEMBER_CACHE=full 과 MEMBER_CACHE=lean 일 때 멤버 캐시가 차지하는 메모리를 tracemalloc 으로 잽니다.
+lean 은 순위/내역에 표시하려고 조회한 이름 캐시(MemberNames)가 가득 찬 상태까지 포함합니다.
+Discord 나 DB 에 연결하지 않습니다.
+
+    python -m bench.members --members 100000 --roles 3 --online 0.3
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+import discord
+
+from core.members import MemberNames, client_options
+
+GUILD_ID = 1
+USER_BASE = 10 ** 17
+
+
+def guild_payload(members: int, roles: int, online: float, rng: random.Random) -> dict:
+    role_ids = [str(GUILD_ID + 1 + i) for i in range(max(roles, 1) * 4)]
+    payload = {
+        "id": str(GUILD_ID),
+        "name": "bench",
+        "member_count": members,
+        "roles": [{"id": role_id, "name": f"role{i}", "color": 0, "hoist": False, "position": i,
+                   "permissions": "0", "managed": False, "mentionable": False}
+                  for i, role_id in enumerate(role_ids)],
+        "emojis": [],
+        "channels": [],
+        "features": [],
+        "members": [],
+        "presences": [],
+    }
+    for i in range(members):
+        user_id = str(USER_BASE + i)
+        payload["members"].append({
+            "user": {"id": user_id, "username": f"user{i}", "discriminator": "0", "global_name": f"사용자{i}",
+                     "avatar": f"{rng.getrandbits(128):032x}"},
+            "roles": rng.sample(role_ids, roles),
+            "joined_at": "2024-01-01T00:00:00+00:00",
+            "nick": f"닉네임{i}" if rng.random() < 0.2 else None,
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+        })
+        if rng.random() < online:
+            payload["presences"].append({
+                "user": {"id": user_id},
+                "status": "online",
+                "client_status": {"desktop": "online"},
+                "activities": [{"type": 0, "name": "게임", "created_at": 0}],
+            })
+    return payload
+
+
+def measure(mode: str, payload: dict, names: int) -> dict:
+    client = discord.Client(**client_options(mode))
+    gc.collect()
+    tracemalloc.start()
+    guild = discord.Guild(data=payload, state=client._connection)
+    member_cache = tracemalloc.get_traced_memory()[0]
+
+    name_cache = 0
+    if mode == "lean":
+        member_names = MemberNames(maxsize=names)
+        for i in range(min(names, payload["member_count"])):
+            member_names.remember(GUILD_ID, USER_BASE + i, f"user{i}")
+        name_cache = tracemalloc.get_traced_memory()[0] - member_cache
+    tracemalloc.stop()
+    return {
+        "mode": mode,
+        "cached_members": len(guild.members),
+        "member_cache_bytes": member_cache,
+        "name_cache_bytes": name_cache,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="멤버 캐시 메모리 벤치마크")
+    parser.add_argument("--members", type=int, default=100000, help="서버 멤버 수")
+    parser.add_argument("--roles", type=int, default=3, help="멤버당 역할 수")
+    parser.add_argument("--online", type=float, default=0.3, help="presence 가 있는 멤버 비율")
+    parser.add_argument("--names", type=int, default=10000, help="lean 모드의 이름 캐시 크기 (MEMBER_NAME_CACHE_SIZE)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    payload = guild_payload(args.members, args.roles, args.online, random.Random(args.seed))
+    print(f"멤버 {args.members:,}명, 역할 {args.roles}개/명, 온라인 {args.online:.0%}, 이름 캐시 {args.names:,}명")
+    print(f"{'모드':<6}{'캐시 멤버':>12}{'멤버 캐시(MB)':>16}{'이름 캐시(MB)':>16}{'합계(MB)':>12}{'바이트/멤버':>14}")
+    results = [measure(mode, payload, args.names) for mode in ("full", "lean")]
+    for result in results:
+        total = result["member_cache_bytes"] + result["name_cache_bytes"]
+        print(f"{result['mode']:<6}{result['cached_members']:>12,}{result['member_cache_bytes'] / 1e6:>16.2f}"
+              f"{result['name_cache_bytes'] / 1e6:>16.2f}{total / 1e6:>12.2f}{total / args.members:>14.1f}")
+    full, lean = (result["member_cache_bytes"] + result["name_cache_bytes"] for result in results)
+    print(f"절감: {(full - lean) / 1e6:,.2f}MB ({(1 - lean / full) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""명령어 벤치마크
+
+Discord 에 연결하지 않고 가짜 Interaction 으로 cog 명령어 콜백을 직접 실행해서
+명령어별 지연 시간(p50/p95/p99), 초당 처리량, 명령어당 DB 쿼리 수를 잽니다.
+
+    python -m bench.run --users 10000 --members 50000 --commands 20000 --concurrency 100
+    python -m bench.run --output before.json
+    python -m bench.run --compare before.json
+
+.env 의 DB 설정을 그대로 사용하고 벤치마크용 사용자/땅 데이터를 넣으므로 반드시 테스트용 DB에서 실행하세요.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from bench.fakes import FakeGuild, FakeInteraction
+
+BENCH_GUILD_ID = 1
+BENCH_USER_BASE = 10 ** 17  # 실제 Discord ID 와 겹치지 않는 범위
+BENCH_CHANNEL_BASE = 1000
+START_BALANCE = 10 ** 9
+
+DEFAULT_MIX = "잔고=30,송금=10,홀짝=25,블랙잭=15,땅정보=10,순위=10"
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in COMMANDS:
+            raise SystemExit(f"알 수 없는 명령어: {name} (가능: {', '.join(COMMANDS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# 명령어별 실행 방법: (bench, interaction, rng) -> 코루틴
+async def run_balance(bench, interaction, rng):
+    await bench.invoke("잔고", interaction)
+
+
+async def run_transfer(bench, interaction, rng):
+    receiver = bench.guild.get_member(bench.random_user(rng, exclude=interaction.user.id))
+    await bench.invoke("송금", interaction, receiver=receiver, amount=rng.randint(1, 100))
+
+
+async def run_dice(bench, interaction, rng):
+    await bench.invoke("홀짝", interaction, amount=100, choice=rng.choice(("odd", "even")))
+
+
+async def run_dice_rounds(bench, interaction, rng):
+    # 10판 연속 (기본 구성에는 없음, --mix 홀짝10=1 처럼 지정)
+    await bench.invoke("홀짝", interaction, amount=100, choice=rng.choice(("odd", "even")), rounds=10)
+
+
+async def run_blackjack(bench, interaction, rng):
+    # 게임 시작 후 히트 0~1번, 스탠드까지를 한 번으로 셈
+    await bench.invoke("블랙잭", interaction, amount=100)
+    view = interaction.response.view
+    if view is None:
+        return
+    buttons = {button.label: button for button in view.children}
+    if rng.random() < 0.5:
+        click = bench.interaction(interaction.user, interaction.channel)
+        await buttons["히트"].callback(click)
+    click = bench.interaction(interaction.user, interaction.channel)
+    await buttons["스탠드"].callback(click)
+
+
+async def run_land_info(bench, interaction, rng):
+    await bench.invoke("땅정보", interaction, channel=rng.choice(bench.guild.channels))
+
+
+async def run_rank(bench, interaction, rng):
+    await bench.invoke("순위", interaction)
+
+
+COMMANDS = {
+    "잔고": run_balance,
+    "송금": run_transfer,
+    "홀짝": run_dice,
+    "홀짝10": run_dice_rounds,
+    "블랙잭": run_blackjack,
+    "땅정보": run_land_info,
+    "순위": run_rank,
+}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.bot = None
+        self.guild = None
+        self.user_ids = []
+
+    async def setup(self):
+        # main 을 import 하기 전에 환경 변수를 맞춰야 from_env 설정에 반영됨
+        if self.args.seed is not None:
+            os.environ.setdefault("BLACKJACK_SEED", str(self.args.seed))
+        from main import AClient
+
+        self.bot = AClient()
+        await self.bot.open_services()
+        await self.bot.load_cogs()
+
+        args = self.args
+        self.user_ids = [BENCH_USER_BASE + i for i in range(args.users)]
+        member_ids = self.user_ids + [BENCH_USER_BASE + i for i in range(args.users, max(args.users, args.members))]
+        channel_ids = [BENCH_CHANNEL_BASE + i for i in range(args.channels)]
+        self.guild = FakeGuild(BENCH_GUILD_ID, member_ids, channel_ids)
+
+        await self.seed(channel_ids)
+
+        # on_ready 에서 하던 준비를 가짜 서버로 대신 실행
+        await self.bot.guild_members.reconcile(self.guild)
+        await self.bot.get_cog("GuildSettings").configs.load_all([self.guild.id])
+        await self.bot.get_cog("Land").holdings.rebuild(self.bot.db)
+
+    async def seed(self, channel_ids):
+        rng = random.Random(self.args.seed)
+        db = self.bot.db
+        async with db.transaction() as tx:
+            for start in range(0, len(self.user_ids), 5000):
+                chunk = self.user_ids[start:start + 5000]
+                await tx.execute_values("""
+                    INSERT INTO users (uuid, money) VALUES %s
+                    ON CONFLICT (uuid) DO UPDATE SET money = EXCLUDED.money
+                """, [(user_id, START_BALANCE) for user_id in chunk])
+            await tx.execute("DELETE FROM blackjack_sessions WHERE user_id >= %s", (BENCH_USER_BASE,))
+            # 채널의 절반은 주인이 있는 땅으로
+            await tx.execute_values("""
+                INSERT INTO lands (guild_id, channel_id, owner_id, current_price, purchase_date) VALUES %s
+                ON CONFLICT (guild_id, channel_id) DO UPDATE SET owner_id = EXCLUDED.owner_id
+            """, [(BENCH_GUILD_ID, channel_id, rng.choice(self.user_ids), 1000000, datetime.datetime.now())
+                  for channel_id in channel_ids[::2]])
+        self.bot.balances.clear()
+
+    async def teardown(self):
+        # 게이트웨이에 연결하지 않았으므로 bot.close() 대신 확장과 서비스만 정리
+        for name in list(self.bot.extensions):
+            await self.bot.unload_extension(name)
+        await self.bot.close_services()
+
+    def random_user(self, rng, exclude=None):
+        while True:
+            user_id = rng.choice(self.user_ids)
+            if user_id != exclude:
+                return user_id
+
+    def interaction(self, user, channel, command=None):
+        return FakeInteraction(self.guild, user, channel, command)
+
+    async def invoke(self, name, interaction, **kwargs):
+        command = self.bot.tree.get_command(name)
+        interaction.command = command
+        # 실제 실행과 같이 채널 권한 검사부터
+        if not await self.bot.tree.interaction_check(interaction):
+            return
+        await command.callback(command.binding, interaction, **kwargs)
+        self.bot.command_metrics.finished(interaction)
+
+    def jobs(self, count, mix, rng):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        channels = self.guild.channels
+        for name in rng.choices(names, weights, k=count):
+            user = self.guild.get_member(rng.choice(self.user_ids))
+            yield name, user, rng.choice(channels)
+
+    async def run(self, count, mix, concurrency, seed):
+        rng = random.Random(seed)
+        jobs = iter(list(self.jobs(count, mix, rng)))
+        latencies = {name: [] for name in mix}
+        errors = {name: 0 for name in mix}
+
+        async def worker(worker_rng):
+            for name, user, channel in jobs:
+                interaction = self.interaction(user, channel)
+                start = time.perf_counter()
+                try:
+                    await COMMANDS[name](self, interaction, worker_rng)
+                except Exception as e:
+                    errors[name] += 1
+                    if errors[name] == 1:
+                        print(f"{name} 실패: {e!r}", file=sys.stderr)
+                    continue
+                latencies[name].append(time.perf_counter() - start)
+
+        queries_before = self.bot.db.queries
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(random.Random(rng.random())) for _ in range(concurrency)))
+        # 아직 반영되지 않은 정산까지 포함
+        await self.bot.settlement.flush()
+        elapsed = time.perf_counter() - start
+        return latencies, errors, elapsed, self.bot.db.queries - queries_before
+
+    async def calibrate(self, mix, per_command, seed):
+        """명령어를 하나씩 순서대로 실행해서 명령어별 DB 쿼리 수를 잼"""
+        rng = random.Random(seed)
+        queries = {}
+        for name in mix:
+            before = self.bot.db.queries
+            for _, user, channel in self.jobs(per_command, {name: 1}, rng):
+                await COMMANDS[name](self, self.interaction(user, channel), rng)
+                await self.bot.settlement.flush()
+            queries[name] = (self.bot.db.queries - before) / per_command
+        return queries
+
+
+def summarize(args, mix, latencies, errors, elapsed, total_queries, per_command_queries):
+    total = sum(len(values) for values in latencies.values())
+    results = {}
+    for name, values in latencies.items():
+        values.sort()
+        results[name] = {
+            "count": len(values),
+            "errors": errors[name],
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "queries_per_command": per_command_queries.get(name),
+        }
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "users": args.users,
+            "members": args.members,
+            "channels": args.channels,
+            "commands": args.commands,
+            "concurrency": args.concurrency,
+            "mix": mix,
+            "seed": args.seed,
+        },
+        "elapsed_s": elapsed,
+        "commands_per_sec": total / elapsed if elapsed else 0.0,
+        "queries_per_command": total_queries / total if total else 0.0,
+        "results": results,
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"commit {report['commit']}  {report['config']}")
+    print(f"{'명령어':<8}{'횟수':>8}{'실패':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'쿼리/회':>9}")
+    for name, result in report["results"].items():
+        queries = result["queries_per_command"]
+        line = (f"{name:<8}{result['count']:>8}{result['errors']:>6}{result['p50_ms']:>10.2f}"
+                f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                f"{queries if queries is not None else float('nan'):>9.2f}")
+        old = (baseline or {}).get("results", {}).get(name)
+        if old and old["p95_ms"]:
+            line += f"   p95 {(result['p95_ms'] / old['p95_ms'] - 1) * 100:+.1f}%"
+        print(line)
+
+    line = f"처리량 {report['commands_per_sec']:,.1f} 명령/초, 전체 쿼리 {report['queries_per_command']:.2f} 회/명령"
+    if baseline and baseline.get("commands_per_sec"):
+        line += (f"  (기준 {baseline['commit']}: "
+                 f"{(report['commands_per_sec'] / baseline['commands_per_sec'] - 1) * 100:+.1f}%)")
+    print(line)
+
+
+async def main(args):
+    mix = parse_mix(args.mix)
+    random.seed(args.seed)  # /홀짝 주사위도 재현되도록
+
+    bench = Bench(args)
+    await bench.setup()
+    try:
+        if args.warmup:
+            await bench.run(args.warmup, mix, args.concurrency, args.seed)
+        latencies, errors, elapsed, total_queries = await bench.run(args.commands, mix, args.concurrency, args.seed)
+        per_command_queries = await bench.calibrate(mix, args.calibrate, args.seed) if args.calibrate else {}
+    finally:
+        await bench.teardown()
+
+    report = summarize(args, mix, latencies, errors, elapsed, total_queries, per_command_queries)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="sjm_bot 명령어 벤치마크")
+    parser.add_argument("--users", type=int, default=10000, help="명령어를 실행하는 사용자 수")
+    parser.add_argument("--members", type=int, default=50000, help="서버 멤버 수")
+    parser.add_argument("--channels", type=int, default=50, help="채널(땅) 수")
+    parser.add_argument("--commands", type=int, default=10000, help="실행할 명령어 수")
+    parser.add_argument("--warmup", type=int, default=500, help="측정 전에 실행할 명령어 수")
+    parser.add_argument("--concurrency", type=int, default=50, help="동시에 실행하는 명령어 수")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"명령어 비율 (기본 {DEFAULT_MIX})")
+    parser.add_argument("--calibrate", type=int, default=50, help="쿼리 수 측정용으로 명령어마다 순서대로 실행할 횟수")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 파일")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
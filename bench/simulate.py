@@ -0,0 +1,310 @@
+"""블랙잭 / 홀짝 기대값 시뮬레이터
+
+배당이나 딜러 규칙을 바꾸기 전에 기대값(EV), 분산, 버스트 비율을 확인하는 도구입니다.
+블랙잭은 봇과 같은 카드 점수표(core.cards.CARD_POINTS)와 규칙(core.cards.BlackjackRules)을 쓰고,
+슈 수십만 개를 NumPy 배열로 나란히 두고 한 판씩 동시에 진행합니다. 슈는 봇과 같이 컷 카드(penetration)를
+지나면 다음 판 전에 다시 섞습니다.
+
+    python -m bench.simulate --hands 2000000
+    python -m bench.simulate --sweep --hands 500000 --workers 4
+    python -m bench.simulate --blackjack-payout 1.2 --dealer-hits-soft-17 --strategy stand17
+    python -m bench.simulate --reference 200000   # 봇의 Hand/Shoe 로 한 판씩 진행한 결과와 비교
+
+NumPy 가 필요합니다. (봇 실행에는 필요 없음)
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("시뮬레이터에는 numpy 가 필요합니다: pip install numpy")
+
+from core.cards import CARD_POINTS, BlackjackRules, Hand, Shoe
+from core.dice import WIN_PAYOUT
+
+SHOES = 10000  # 블랙잭: 나란히 진행하는 슈 개수 (많을수록 섞는 비용이 커짐)
+DICE_BATCH = 1000000  # 홀짝: 한 번에 굴리는 판 수 (메모리 사용량 조절)
+
+# 플레이어 전략: (합계, soft 여부, 딜러 오픈 카드 점수) 배열 -> 히트할지 배열
+def stand_on(threshold: int):
+    def hits(total, soft, upcard):
+        return total < threshold
+    return hits
+
+
+def basic_strategy(total, soft, upcard):
+    """더블/스플릿이 없는 규칙의 기본 전략 (딜러 오픈 카드 A = 1)"""
+    weak_dealer = (upcard >= 2) & (upcard <= 6)
+    hard_hit = (total <= 11) | ((total == 12) & ~((upcard >= 4) & (upcard <= 6))) | \
+               ((total >= 13) & (total <= 16) & ~weak_dealer)
+    soft_hit = (total <= 17) | ((total == 18) & ((upcard >= 9) | (upcard == 1)))
+    return np.where(soft, soft_hit, hard_hit)
+
+
+STRATEGIES = {
+    "basic": basic_strategy,
+    "stand17": stand_on(17),
+    "stand15": stand_on(15),
+    "stand12": stand_on(12),
+}
+
+
+class _Stats:
+    """손익 배수의 합/제곱합과 결과별 횟수 (프로세스 간에 합칠 수 있음)"""
+    FIELDS = ("hands", "total", "total_sq", "wins", "pushes", "losses",
+              "player_bust", "dealer_bust", "player_blackjack", "dealer_blackjack")
+
+    def __init__(self, **values):
+        for name in self.FIELDS:
+            setattr(self, name, values.get(name, 0))
+
+    def __add__(self, other):
+        return _Stats(**{name: getattr(self, name) + getattr(other, name) for name in self.FIELDS})
+
+    @classmethod
+    def from_results(cls, multipliers, **counts):
+        return cls(hands=len(multipliers), total=float(multipliers.sum()),
+                   total_sq=float(np.square(multipliers).sum()),
+                   wins=int((multipliers > 0).sum()), pushes=int((multipliers == 0).sum()),
+                   losses=int((multipliers < 0).sum()), **counts)
+
+    @property
+    def ev(self) -> float:
+        return self.total / self.hands
+
+    @property
+    def variance(self) -> float:
+        return self.total_sq / self.hands - self.ev ** 2
+
+    @property
+    def stderr(self) -> float:
+        return (self.variance / self.hands) ** 0.5
+
+    def rate(self, name) -> float:
+        return getattr(self, name) / self.hands
+
+
+class _Shoes:
+    """나란히 진행하는 여러 개의 슈 (봇의 Shoe 와 같이 컷 카드를 지나면 다음 판 전에 다시 섞음)
+
+    카드는 점수(A=1 ~ 10)로만 들고 있습니다.
+    """
+
+    def __init__(self, rng, shoes: int, decks: int, penetration: float):
+        self.rng = rng
+        deck = np.frombuffer(CARD_POINTS, dtype=np.uint8)
+        self.cards = rng.permuted(np.tile(deck, (shoes, decks)), axis=1)
+        self.size = self.cards.shape[1]
+        self.cut = int(self.size * penetration)
+        self.pos = np.zeros(shoes, dtype=np.int32)
+        self.rows = np.arange(shoes)
+
+    def _shuffle(self, rows):
+        self.cards[rows] = self.rng.permuted(self.cards[rows], axis=1)
+        self.pos[rows] = 0
+
+    def prepare(self):
+        """새 판을 시작하기 전에 호출: 컷 카드를 지난 슈만 섞음"""
+        rows = self.rows[self.pos >= self.cut]
+        if len(rows):
+            self._shuffle(rows)
+
+    def draw(self, active=None):
+        """각 슈에서 한 장씩 뽑은 점수 (active 가 False 인 슈는 뽑지 않고 0)"""
+        if active is None:
+            active = np.ones(len(self.pos), dtype=bool)
+        # 판 도중 슈가 바닥나면 그 자리에서 다시 섞음
+        empty = self.rows[active & (self.pos >= self.size)]
+        if len(empty):
+            self._shuffle(empty)
+        points = self.cards[self.rows, np.minimum(self.pos, self.size - 1)].astype(np.int16)
+        self.pos += active
+        return np.where(active, points, 0)
+
+
+def _totals(hard, aces):
+    """core.cards.Hand 와 같은 규칙: A 한 장을 11점으로 세도 21을 넘지 않으면 soft"""
+    soft = (aces > 0) & (hard + 10 <= 21)
+    return np.where(soft, hard + 10, hard), soft
+
+
+def simulate_blackjack(hands: int, rules: BlackjackRules, strategy: str, decks: int, penetration: float,
+                       seed) -> _Stats:
+    rng = np.random.default_rng(seed)
+    hits = STRATEGIES[strategy]
+    stats = _Stats()
+    # 슈 SHOES 개를 나란히 두고 한 판씩 동시에 진행
+    shoes = _Shoes(rng, min(SHOES, hands), decks, penetration)
+    for start in range(0, hands, SHOES):
+        size = min(SHOES, hands - start)
+        shoes.prepare()
+
+        # 봇과 같은 순서로 플레이어 2장, 딜러 2장
+        first, second = shoes.draw(), shoes.draw()
+        player_hard, player_aces = first + second, (first == 1).astype(np.int8) + (second == 1)
+        upcard, hole = shoes.draw(), shoes.draw()
+        dealer_hard, dealer_aces = upcard + hole, (upcard == 1).astype(np.int8) + (hole == 1)
+
+        player_total, player_soft = _totals(player_hard, player_aces)
+        dealer_total, dealer_soft = _totals(dealer_hard, dealer_aces)
+        player_blackjack = player_total == 21
+        dealer_blackjack = dealer_total == 21
+
+        # 플레이어: 블랙잭이면 바로 스탠드, 아니면 전략대로 히트
+        active = ~player_blackjack & hits(player_total, player_soft, upcard)
+        while active.any():
+            card = shoes.draw(active)
+            player_hard = player_hard + card
+            player_aces = player_aces + (card == 1)
+            player_total, player_soft = _totals(player_hard, player_aces)
+            active = active & (player_hard <= 21) & hits(player_total, player_soft, upcard)
+        player_bust = player_hard > 21
+
+        # 딜러: 플레이어가 버스트하지 않은 판만 규칙대로 받음
+        def dealer_hits(total, soft):
+            hit = total < rules.dealer_stands_on
+            if rules.dealer_hits_soft_17:
+                hit = hit | ((total == rules.dealer_stands_on) & soft)
+            return hit
+
+        active = ~player_bust & dealer_hits(dealer_total, dealer_soft)
+        while active.any():
+            card = shoes.draw(active)
+            dealer_hard = dealer_hard + card
+            dealer_aces = dealer_aces + (card == 1)
+            dealer_total, dealer_soft = _totals(dealer_hard, dealer_aces)
+            active = active & dealer_hits(dealer_total, dealer_soft)
+        dealer_bust = ~player_bust & (dealer_hard > 21)
+
+        # BlackjackRules.judge 와 같은 우선순위
+        multipliers = np.select(
+            [player_bust,
+             player_blackjack & dealer_blackjack,
+             player_blackjack,
+             dealer_blackjack,
+             dealer_bust,
+             player_total > dealer_total,
+             player_total < dealer_total],
+            [-1.0, 0.0, rules.blackjack_payout, -rules.dealer_blackjack_loss, 1.0, 1.0, -1.0],
+            default=0.0)[:size]
+        stats = stats + _Stats.from_results(
+            multipliers, player_bust=int(player_bust[:size].sum()), dealer_bust=int(dealer_bust[:size].sum()),
+            player_blackjack=int(player_blackjack[:size].sum()), dealer_blackjack=int(dealer_blackjack[:size].sum()))
+    return stats
+
+
+def reference_blackjack(hands: int, rules: BlackjackRules, strategy: str, decks: int, penetration: float,
+                        seed) -> _Stats:
+    """봇의 Hand / Shoe / BlackjackRules 로 한 판씩 진행 (시뮬레이터 검증용, 느림)"""
+    rng = random.Random(seed)
+    hits = STRATEGIES[strategy]
+    multipliers = []
+    counts = dict.fromkeys(("player_bust", "dealer_bust", "player_blackjack", "dealer_blackjack"), 0)
+    shoe = Shoe(decks, penetration, rng)
+    for _ in range(hands):
+        shoe.prepare()
+        player = Hand((shoe.draw(), shoe.draw()))
+        dealer = Hand((shoe.draw(), shoe.draw()))
+        upcard = CARD_POINTS[dealer[0]]
+        if not player.is_blackjack():
+            while not player.busted and bool(hits(np.int64(player.total), np.bool_(player.soft), np.int64(upcard))):
+                player.add(shoe.draw())
+        if not player.busted:
+            while rules.dealer_hits(dealer):
+                dealer.add(shoe.draw())
+        _, multiplier = rules.judge(player, dealer, busted=player.busted)
+        multipliers.append(multiplier)
+        counts["player_bust"] += player.busted
+        counts["dealer_bust"] += not player.busted and dealer.busted
+        counts["player_blackjack"] += player.is_blackjack()
+        counts["dealer_blackjack"] += dealer.is_blackjack()
+    return _Stats.from_results(np.array(multipliers, dtype=float), **counts)
+
+
+def simulate_dice(rounds: int, payout: float, seed) -> _Stats:
+    """/홀짝: 주사위 눈의 홀짝을 맞히면 payout 배 수익, 틀리면 배팅 금액 손실"""
+    rng = np.random.default_rng(seed)
+    stats = _Stats()
+    for start in range(0, rounds, DICE_BATCH):
+        size = min(DICE_BATCH, rounds - start)
+        rolls = rng.integers(1, 7, size=size)
+        multipliers = np.where(rolls % 2 == 1, payout, -1.0)  # 항상 홀을 고른 경우 (짝도 확률은 같음)
+        stats = stats + _Stats.from_results(multipliers)
+    return stats
+
+
+def run_parallel(func, hands: int, workers: int, seed, *args) -> _Stats:
+    """hands 를 workers 개로 나눠 프로세스마다 독립된 시드로 실행하고 합침"""
+    seeds = np.random.SeedSequence(seed).spawn(max(workers, 1))
+    if workers <= 1:
+        return func(hands, *args, seeds[0])
+    shares = [hands // workers + (i < hands % workers) for i in range(workers)]
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(func, share, *args, child) for share, child in zip(shares, seeds)]
+        results = [future.result() for future in futures]
+    total = _Stats()
+    for result in results:
+        total = total + result
+    return total
+
+
+def print_blackjack(label: str, stats: _Stats, elapsed: float):
+    print(f"{label:<34}{stats.ev * 100:>+8.3f}% ±{stats.stderr * 196:.3f}{stats.variance:>8.3f}"
+          f"{stats.rate('wins') * 100:>7.2f}{stats.rate('pushes') * 100:>7.2f}{stats.rate('losses') * 100:>7.2f}"
+          f"{stats.rate('player_bust') * 100:>8.2f}{stats.rate('dealer_bust') * 100:>8.2f}"
+          f"{stats.rate('player_blackjack') * 100:>7.2f}{stats.hands / elapsed / 1e6:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="블랙잭 / 홀짝 기대값 시뮬레이터")
+    parser.add_argument("--hands", type=int, default=1000000, help="규칙마다 진행할 판 수")
+    parser.add_argument("--decks", type=int, default=6, help="슈의 덱 수 (BLACKJACK_DECKS)")
+    parser.add_argument("--penetration", type=float, default=0.75, help="컷 카드 위치 (BLACKJACK_PENETRATION)")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="basic", help="플레이어 전략")
+    parser.add_argument("--blackjack-payout", type=float, default=BlackjackRules.blackjack_payout)
+    parser.add_argument("--dealer-blackjack-loss", type=float, default=BlackjackRules.dealer_blackjack_loss)
+    parser.add_argument("--dealer-hits-soft-17", action="store_true")
+    parser.add_argument("--dice-payout", type=float, default=WIN_PAYOUT, help="/홀짝 승리 시 수익 배수")
+    parser.add_argument("--sweep", action="store_true", help="배당/딜러 규칙/전략 조합을 모두 실행")
+    parser.add_argument("--reference", type=int, default=0, help="봇 규칙으로 한 판씩 진행해서 비교할 판 수")
+    parser.add_argument("--workers", type=int, default=1, help="프로세스 수")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.sweep:
+        variants = [(BlackjackRules(payout, loss, 17, soft17), strategy)
+                    for payout, loss, soft17, strategy in itertools.product(
+                        (1.5, 1.2, 1.0), (1.5, 1.0), (False, True), ("basic", "stand17"))]
+    else:
+        variants = [(BlackjackRules(args.blackjack_payout, args.dealer_blackjack_loss, 17, args.dealer_hits_soft_17),
+                     args.strategy)]
+
+    print(f"블랙잭: 규칙마다 {args.hands:,}판, {args.decks}덱, 프로세스 {args.workers}개 (EV 는 배팅 금액 대비, ± 는 95% 구간)")
+    print(f"{'규칙':<34}{'EV':>9}{'':>7}{'분산':>6}{'승%':>7}{'무%':>7}{'패%':>7}"
+          f"{'P버스트%':>8}{'D버스트%':>8}{'BJ%':>7}{'M판/초':>8}")
+    for rules, strategy in variants:
+        label = (f"BJ {rules.blackjack_payout:g} / DBJ -{rules.dealer_blackjack_loss:g} / "
+                 f"{'H17' if rules.dealer_hits_soft_17 else 'S17'} / {strategy}")
+        start = time.perf_counter()
+        stats = run_parallel(simulate_blackjack, args.hands, args.workers, args.seed, rules, strategy,
+                             args.decks, args.penetration)
+        print_blackjack(label, stats, time.perf_counter() - start)
+        if args.reference:
+            start = time.perf_counter()
+            reference = reference_blackjack(args.reference, rules, strategy, args.decks, args.penetration, args.seed)
+            print_blackjack("  └ 봇 규칙으로 한 판씩", reference, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    dice = run_parallel(simulate_dice, args.hands, args.workers, args.seed, args.dice_payout)
+    elapsed = time.perf_counter() - start
+    print(f"\n홀짝 (수익 {args.dice_payout:g}배): {args.hands:,}판, EV {dice.ev * 100:+.3f}% ±{dice.stderr * 196:.3f}, "
+          f"분산 {dice.variance:.3f}, 이론값 {(args.dice_payout - 1) / 2 * 100:+.3f}%, {args.hands / elapsed / 1e6:.1f}M판/초")
+
+
+if __name__ == "__main__":
+    main()
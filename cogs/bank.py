@@ -1,5 +1,7 @@
 import datetime
+import functools
 import json
+import os
 import random
 
 import discord
@@ -7,152 +9,211 @@ from discord import app_commands
 from discord.ext import commands
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from discord.ui import View, Button
 
+from core.fanout import FanoutDispatcher
+from core.permissions import Category
+
+INTEREST_RATE = 0.075  # 하루 이자율
+INTEREST_MIN_BALANCE = 10000  # 이자를 받을 수 있는 최소 잔고
+
+# 송금: 보내는 사람의 잔액이 충분할 때만 차감하고, 차감된 경우에만 받는 사람에게 입금
+# (정산 큐와 같이 사용자 id 순서로 행을 잠가서 교착 상태를 피함)
+TRANSFER_SQL = """
+    WITH locked AS (
+        SELECT uuid, money FROM users
+        WHERE uuid IN (%(sender_id)s, %(receiver_id)s)
+        ORDER BY uuid
+        FOR UPDATE
+    ),
+    debit AS (
+        UPDATE users SET money = users.money - %(amount)s
+        FROM locked
+        WHERE users.uuid = locked.uuid AND users.uuid = %(sender_id)s AND locked.money >= %(amount)s
+        RETURNING users.money
+    ),
+    credit AS (
+        UPDATE users SET money = users.money + %(amount)s
+        FROM locked
+        WHERE users.uuid = locked.uuid AND users.uuid = %(receiver_id)s AND EXISTS (SELECT 1 FROM debit)
+        RETURNING users.money
+    )
+    SELECT (SELECT money FROM debit), (SELECT money FROM credit)
+"""
 
-class PaginationView(View):
-    def __init__(self, bot, total_pages: int, current_page: int):
-        super().__init__(timeout=60)  # 60초 후 버튼 비활성화
-        self.bot = bot
-        self.current_page = current_page
-        self.total_pages = total_pages
 
+class PaginationView(View):
+    """/순위 결과를 넘겨 보는 뷰. 페이지마다 마지막 사용자의 (잔액, id) 를 커서로 써서 다음 페이지를 읽습니다."""
+
+    def __init__(self, leaderboard, names, guild_id: int, total: int, my_rank=None, page_size: int = 10):
+        super().__init__(timeout=60)  # 마지막 입력 후 60초가 지나면 버튼 비활성화
+        self.leaderboard = leaderboard  # BalanceLeaderboard
+        self.names = names  # MemberNames, 페이지에 보이는 사용자 이름만 조회
+        self.guild_id = guild_id
+        self.total = total
+        self.my_rank = my_rank
+        self.page_size = page_size
+        self.total_pages = (total + page_size - 1) // page_size
+        self.cursors = [None]  # 각 페이지의 시작 커서
+        self.pages = []  # 읽은 페이지의 (user_id, 잔액) 목록 (이전 페이지로 돌아갈 때는 다시 조회하지 않음)
+        self.rows = []  # 현재 페이지의 (user_id, 잔액)
+        self.message = None
+
+        self.prev_button = Button(label="이전", style=discord.ButtonStyle.primary)
+        self.prev_button.callback = self.prev_callback
+        self.next_button = Button(label="다음", style=discord.ButtonStyle.primary)
+        self.next_button.callback = self.next_callback
+
+    @property
+    def current_page(self) -> int:
+        return len(self.cursors)
+
+    async def load(self):
+        if len(self.pages) < self.current_page:
+            self.pages.append(await self.leaderboard.page(self.guild_id, self.cursors[-1], self.page_size))
+        self.rows = self.pages[self.current_page - 1]
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.clear_items()
         # 이전 페이지 버튼
-        if current_page > 1:
-            prev_button = Button(label="이전", style=discord.ButtonStyle.primary,
-                                 custom_id=f"prev_{current_page - 1}")
-            prev_button.callback = self.prev_callback
-            self.add_item(prev_button)
-
-        # 다음 페이지 버튼
-        if current_page < total_pages:
-            next_button = Button(label="다음", style=discord.ButtonStyle.primary,
-                                 custom_id=f"next_{current_page + 1}")
-            next_button.callback = self.next_callback
-            self.add_item(next_button)
-
-    async def prev_callback(self, interaction: discord.Interaction):
-        # 이전 페이지 데이터 가져오기
-        guild_members = interaction.guild.members
-        member_ids = [member.id for member in guild_members]
+        if self.current_page > 1:
+            self.add_item(self.prev_button)
+        # 다음 페이지 버튼 (마지막 페이지가 꽉 차 있지 않으면 더 없음)
+        if self.current_page < self.total_pages and len(self.rows) == self.page_size:
+            self.add_item(self.next_button)
 
-        self.bot.cursor.execute("SELECT uuid, money FROM users WHERE uuid IN %s ORDER BY money DESC",
-                                (tuple(member_ids),))
-        user_data = self.bot.cursor.fetchall()
+    async def build_embed(self, guild: discord.Guild) -> discord.Embed:
+        start_index = (self.current_page - 1) * self.page_size
+        names = await self.names.resolve(guild, [user_id for user_id, _ in self.rows])
 
-        page_size = 10
-        total_pages = (len(user_data) + page_size - 1) // page_size
-
-        # 새 페이지의 데이터 표시
-        start_index = (self.current_page - 2) * page_size
-        end_index = start_index + page_size
-        user_data_page = user_data[start_index:end_index]
-
-        embed = discord.Embed(title=f"이 서버의 잔고 순위 - {self.current_page - 1}/{total_pages} 페이지",
+        embed = discord.Embed(title=f"이 서버의 잔고 순위 - {self.current_page}/{self.total_pages} 페이지",
                               color=discord.Color.blue())
 
-        for rank, (user_id, balance) in enumerate(user_data_page, start=start_index + 1):
-            user = interaction.guild.get_member(user_id)
-            username = user.name if user else f"Unknown User ({user_id})"
+        for rank, (user_id, balance) in enumerate(self.rows, start=start_index + 1):
+            username = names.get(user_id, f"Unknown User ({user_id})")
             embed.add_field(name=f"{rank}. {username}", value=f"{balance:,}원", inline=False)
 
-        view = PaginationView(self.bot, total_pages, self.current_page - 1)
-        await interaction.response.edit_message(embed=embed, view=view)
-
-    async def next_callback(self, interaction: discord.Interaction):
-        # 다음 페이지 데이터 가져오기
-        guild_members = interaction.guild.members
-        member_ids = [member.id for member in guild_members]
-
-        self.bot.cursor.execute("SELECT uuid, money FROM users WHERE uuid IN %s ORDER BY money DESC",
-                                (tuple(member_ids),))
-        user_data = self.bot.cursor.fetchall()
+        if self.my_rank:
+            embed.set_footer(text=f"내 순위: {self.my_rank:,}위 / {self.total:,}명")
+        return embed
 
-        page_size = 10
-        total_pages = (len(user_data) + page_size - 1) // page_size
+    async def show(self, interaction: discord.Interaction):
+        await self.load()
+        await interaction.response.edit_message(embed=await self.build_embed(interaction.guild), view=self)
 
-        # 새 페이지의 데이터 표시
-        start_index = self.current_page * page_size
-        end_index = start_index + page_size
-        user_data_page = user_data[start_index:end_index]
+    async def prev_callback(self, interaction: discord.Interaction):
+        self.cursors.pop()
+        self.pages.pop()
+        await self.show(interaction)
 
-        embed = discord.Embed(title=f"이 서버의 잔고 순위 - {self.current_page + 1}/{total_pages} 페이지",
-                              color=discord.Color.blue())
+    async def next_callback(self, interaction: discord.Interaction):
+        user_id, balance = self.rows[-1]
+        self.cursors.append((balance, user_id))
+        await self.show(interaction)
 
-        for rank, (user_id, balance) in enumerate(user_data_page, start=start_index + 1):
-            user = interaction.guild.get_member(user_id)
-            username = user.name if user else f"Unknown User ({user_id})"
-            embed.add_field(name=f"{rank}. {username}", value=f"{balance:,}원", inline=False)
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
 
-        view = PaginationView(self.bot, total_pages, self.current_page + 1)
-        await interaction.response.edit_message(embed=embed, view=view)
 
 class Bank(commands.Cog):
+    command_category = Category.BANK  # 채널 권한 검사에 쓰이는 명령어 분류
+
     def __init__(self, bot):
         self.bot = bot
+        # INTEREST_MODE=auto 이면 자정에 모든 사용자의 이자를 한 번에 지급
+        self.interest_mode = os.getenv("INTEREST_MODE", "manual")
+        self.interest_chunk_size = int(os.getenv("INTEREST_CHUNK_SIZE", 5000))
+        # 자정 알림 전송기 (NOTIFY_CONCURRENCY / NOTIFY_RATE / NOTIFY_JITTER)
+        self.notifier = FanoutDispatcher.from_env()
+        # 멤버 수가 같아 시작할 때 건너뛴 서버도 이 주기(시간)마다 멤버 목록을 다시 맞춤 (0 이면 하지 않음)
+        self.members_reconcile_hours = float(os.getenv("GUILD_MEMBERS_RECONCILE_HOURS", 24))
         self.scheduler = AsyncIOScheduler()
         self.scheduler.start()
         self.schedule_daily_interest_notification()
+        if self.members_reconcile_hours > 0:
+            self.scheduler.add_job(self.reconcile_members_job, IntervalTrigger(hours=self.members_reconcile_hours))
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # 봇이 꺼져 있던 동안의 입장/퇴장을 반영 (재연결 때마다 on_ready 가 다시 불리므로 아직 안 맞춘 서버만)
+        # 멤버 수가 DB와 같은 서버는 건너뜀 (lean 모드에서는 멤버 목록을 HTTP 로 받아야 하므로)
+        guilds = [guild for guild in self.bot.guilds if guild.id not in self.bot.guild_members.reconciled]
+        if guilds:
+            synced, added, removed = await self.bot.guild_members.reconcile_all(guilds)
+            print(f"서버 멤버 목록 동기화: {len(guilds):,}개 중 {synced:,}개 서버, 추가 {added:,}명, 삭제 {removed:,}명")
+
+    async def reconcile_members_job(self):
+        synced, added, removed = await self.bot.guild_members.reconcile_all(self.bot.guilds, force=True)
+        print(f"서버 멤버 목록 정기 동기화: {synced:,}개 서버, 추가 {added:,}명, 삭제 {removed:,}명")
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        await self.bot.guild_members.add(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload):
+        # on_member_remove 는 캐시에 있던 멤버만 알려주므로 MEMBER_CACHE=lean 에서도 오는 raw 이벤트를 사용
+        await self.bot.guild_members.remove(payload.guild_id, payload.user.id)
+        self.bot.member_names.forget(payload.guild_id, payload.user.id)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        await self.bot.guild_members.reconcile(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        await self.bot.guild_members.remove_guild(guild.id)
+        self.bot.member_names.forget_guild(guild.id)
 
     def schedule_daily_interest_notification(self):
-        self.scheduler.add_job(self.daily_interest_notification, CronTrigger(hour=0, minute=0))
+        self.scheduler.add_job(self.midnight_job, CronTrigger(hour=0, minute=0))
 
     async def daily_interest_notification(self):
         settings_cog = self.bot.get_cog('GuildSettings')
         if not settings_cog:
             return
 
-        for guild in self.bot.guilds:
-            channel_id, role_id = await settings_cog.get_notification_settings(guild.id)
+        # 이 프로세스가 맡은 샤드의 서버 알림 설정을 한 번에 읽고 병렬로 전송
+        notification_settings = await settings_cog.get_all_notification_settings(
+            [guild.id for guild in self.bot.guilds if self.bot.shard_plan.owns(guild.id)])
 
-            if channel_id:
-                channel = guild.get_channel(channel_id)
-                role = guild.get_role(role_id) if role_id else None
+        jobs = []
+        for guild_id, (channel_id, role_id) in notification_settings.items():
+            guild = self.bot.get_guild(guild_id)
+            channel = guild.get_channel(channel_id) if guild else None
+            if not channel:
+                continue
 
-                if channel:
-                    if role:
-                        await channel.send(f"{role.mention} 다음 이자를 받을 수 있는 시간이 되었습니다!")
-                    else:
-                        await channel.send("다음 이자를 받을 수 있는 시간이 되었습니다!")
+            role = guild.get_role(role_id) if role_id else None
+            if role:
+                content = f"{role.mention} 다음 이자를 받을 수 있는 시간이 되었습니다!"
+            else:
+                content = "다음 이자를 받을 수 있는 시간이 되었습니다!"
+            jobs.append((guild_id, functools.partial(channel.send, content)))
 
-    async def ensure_user(self, user_id):
-        self.bot.cursor.execute("SELECT * FROM users WHERE uuid = %s", (user_id,))
-        user_data = self.bot.cursor.fetchone()
-        if not user_data:
-            # 사용자가 없으면 추가
-            print(user_id)
-            self.bot.cursor.execute("INSERT INTO users (uuid) VALUES (%s)", (user_id,))
-            self.bot.conn.commit()
+        report = await self.notifier.run(jobs)
+        print(f"이자 알림: {report.summary()}")
+        for guild_id, error in report.failed:
+            print(f"이자 알림 실패 (guild {guild_id}): {error!r}")
 
     @app_commands.command(name="잔고", description="사용자의 잔액을 확인합니다.")
     async def get_money(self, interaction: discord.Interaction, member: discord.Member = None):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
-
         if not member:
             member = interaction.user
         user_id = member.id  # Discord 고유 사용자 ID
-        await self.ensure_user(user_id)  # 사용자가 없으면 자동으로 추가
+        await self.bot.user_registry.ensure(user_id)  # 사용자가 없으면 자동으로 추가
         # 사용자 잔액 조회
-        self.bot.cursor.execute("SELECT money FROM users WHERE uuid = %s", (user_id,))
-        user_data = self.bot.cursor.fetchone()
-        await interaction.response.send_message(f"{member.name}님의 잔액: {user_data[0]:,}원")
+        balance = await self.bot.balances.get(user_id)
+        await interaction.response.send_message(f"{member.name}님의 잔액: {balance:,}원")
 
     @app_commands.command(name="보상금", description="관리자 전용 명령어입니다.")
     async def increase_money(self, interaction: discord.Interaction, amount: int, receiver: discord.Member = None):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
-
         if not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message("이 명령어는 관리자만 사용할 수 있습니다.", ephemeral=True)
             return
@@ -162,11 +223,12 @@ class Bank(commands.Cog):
             receiver = interaction.user
 
         receiver_id = receiver.id
-        await self.ensure_user(receiver_id)
+        await self.bot.user_registry.ensure(receiver_id)
 
         # 잔액 업데이트
-        self.bot.cursor.execute("UPDATE users SET money = money + %s WHERE uuid= %s", (amount, receiver_id))
-        self.bot.conn.commit()
+        balance = await self.bot.db.fetchval("UPDATE users SET money = money + %s WHERE uuid = %s RETURNING money",
+                                             (amount, receiver_id))
+        self.bot.balances.set(receiver_id, balance)
 
         # 메시지 출력 (receiver가 본인인지 다른 사용자인지에 따라 다른 메시지)
         if receiver_id == interaction.user.id:
@@ -176,14 +238,6 @@ class Bank(commands.Cog):
 
     @app_commands.command(name="벌금", description="관리자 전용 명령어입니다.")
     async def decrease_money(self, interaction: discord.Interaction, amount: int, receiver: discord.Member = None):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
-
         if not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message("이 명령어는 관리자만 사용할 수 있습니다.", ephemeral=True)
             return
@@ -193,11 +247,12 @@ class Bank(commands.Cog):
             receiver = interaction.user
 
         receiver_id = receiver.id
-        await self.ensure_user(receiver_id)
+        await self.bot.user_registry.ensure(receiver_id)
 
         # 잔액 업데이트
-        self.bot.cursor.execute("UPDATE users SET money = money - %s WHERE uuid= %s", (amount, receiver_id))
-        self.bot.conn.commit()
+        balance = await self.bot.db.fetchval("UPDATE users SET money = money - %s WHERE uuid = %s RETURNING money",
+                                             (amount, receiver_id))
+        self.bot.balances.set(receiver_id, balance)
 
         # 메시지 출력 (receiver가 본인인지 다른 사용자인지에 따라 다른 메시지)
         if receiver_id == interaction.user.id:
@@ -207,165 +262,195 @@ class Bank(commands.Cog):
 
     @app_commands.command(name="송금", description="다른 사용자에게 돈을 송금합니다.")
     async def send_money(self, interaction: discord.Interaction, receiver: discord.Member, amount: int):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
-
         sender_id = interaction.user.id
         receiver_id = receiver.id
 
-        # 송금하는 사람과 받는 사람의 계정 확인
-        await self.ensure_user(sender_id)
-        await self.ensure_user(receiver_id)
+        if amount <= 0:
+            await interaction.response.send_message("0원 이하로는 송금할 수 없습니다.", ephemeral=True)
+            return
+        if sender_id == receiver_id:
+            await interaction.response.send_message("자기 자신에게는 송금할 수 없습니다.", ephemeral=True)
+            return
 
-        # 송금하는 사람의 잔액 확인
-        self.bot.cursor.execute("SELECT money FROM users WHERE uuid = %s", (sender_id,))
-        sender_balance = self.bot.cursor.fetchone()[0]
+        # 송금하는 사람과 받는 사람의 계정 확인
+        await self.bot.user_registry.ensure(sender_id, receiver_id)
+
+        # 같은 사용자의 다른 배팅/송금과 겹치지 않도록 잠금
+        async with self.bot.balances.locked(sender_id):
+            # 잔액 캐시는 다른 프로세스의 변경을 모를 수 있으므로 잔액 확인은 차감하는 쿼리에서 함
+            # (두 사용자 행을 id 순서로 잠근 뒤 차감과 입금을 한 번에 처리)
+            sender_balance, receiver_balance = await self.bot.db.fetchone(TRANSFER_SQL, {
+                "sender_id": sender_id,
+                "receiver_id": receiver_id,
+                "amount": amount,
+            })
+            insufficient = sender_balance is None
+            if insufficient:
+                self.bot.balances.invalidate(sender_id)
+            else:
+                self.bot.balances.set(sender_id, sender_balance)
+                self.bot.balances.set(receiver_id, receiver_balance)
 
-        if sender_balance < amount:
+        if insufficient:
             await interaction.response.send_message("잔액이 부족합니다.")
             return
 
-        # 송금 처리
-        self.bot.cursor.execute("UPDATE users SET money = money - %s WHERE uuid = %s", (amount, sender_id))
-        self.bot.cursor.execute("UPDATE users SET money = money + %s WHERE uuid = %s", (amount, receiver_id))
-        self.bot.conn.commit()
-
         await interaction.response.send_message(
             f"{interaction.user.name}님이 {receiver.name}님에게 {amount:,}원을 송금했습니다.")
 
     @app_commands.command(name="꽁돈", description="1시간마다 꽁돈을 지급합니다.")
     async def hourly_reward(self, interaction: discord.Interaction):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
-
         user_id = interaction.user.id
-        await self.ensure_user(user_id)
+        await self.bot.user_registry.ensure(user_id)
 
-        self.bot.cursor.execute("SELECT money, last_hourly FROM users WHERE uuid = %s", (user_id,))
-        user_data = self.bot.cursor.fetchone()
-        last_hourly = user_data[1]
         current_time = datetime.datetime.now()
+        reward_amount = random.randint(1000, 5000)
 
-        if not last_hourly or (current_time - last_hourly).total_seconds() >= 3600:
-            reward_amount = random.randint(1000, 5000)
-            new_balance = user_data[0] + reward_amount
-
-            # Update the user's balance and last hourly reward time in the database
-            self.bot.cursor.execute("UPDATE users SET money = %s, last_hourly = %s WHERE uuid = %s",
-                                    (new_balance, current_time, user_id))
-            self.bot.conn.commit()
+        # 1시간이 지났는지 확인하면서 한 번에 지급 (동시에 여러 번 받을 수 없음)
+        new_balance = await self.bot.db.fetchval("""
+            UPDATE users SET money = money + %(reward)s, last_hourly = %(now)s
+            WHERE uuid = %(uuid)s AND (last_hourly IS NULL OR last_hourly <= %(now)s - interval '1 hour')
+            RETURNING money
+        """, {"reward": reward_amount, "now": current_time, "uuid": user_id})
 
+        if new_balance is not None:
+            self.bot.balances.set(user_id, new_balance)
             await interaction.response.send_message(
                 f"{reward_amount}원을 주웠다!\n잔액: {new_balance:,}원")
-        else:
-            # Calculate the remaining time until the next reward
-            remaining_time = 3600 - (current_time - last_hourly).total_seconds()
-            minutes = int(remaining_time // 60)
-            seconds = int(remaining_time % 60)
-            await interaction.response.send_message(
-                f"{minutes}분 {seconds}초 후에 꽁돈을 받을 수 있습니다.")
-
-    @app_commands.command(name="이자", description="은행 이자를 받습니다.")
-    async def interest(self, interaction: discord.Interaction):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
             return
 
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
+        # 지급되지 않았으면 다음 꽁돈까지 남은 시간 계산
+        last_hourly = await self.bot.db.fetchval("SELECT last_hourly FROM users WHERE uuid = %s", (user_id,))
+        remaining_time = max(3600 - (current_time - last_hourly).total_seconds(), 0)
+        minutes = int(remaining_time // 60)
+        seconds = int(remaining_time % 60)
+        await interaction.response.send_message(
+            f"{minutes}분 {seconds}초 후에 꽁돈을 받을 수 있습니다.")
 
+    @app_commands.command(name="이자", description="은행 이자를 받습니다.")
+    async def interest(self, interaction: discord.Interaction):
         user_id = interaction.user.id
 
-        self.bot.cursor.execute("SELECT money, last_interest FROM users WHERE uuid = %s", (user_id,))
-        user_data = self.bot.cursor.fetchone()
-        current_balance = user_data[0]
-        last_interest = user_data[1]
+        if self.interest_mode == "auto":
+            # 자동 지급 모드에서는 상태만 보여줌 (잔액은 캐시에서 읽음)
+            current_balance = await self.bot.balances.get(user_id) or 0
+            if current_balance < INTEREST_MIN_BALANCE:
+                await interaction.response.send_message(
+                    f"이자는 잔고 {INTEREST_MIN_BALANCE}원부터 받을 수 있습니다. (매일 자정 자동 지급)")
+                return
 
-        if current_balance < 10000:
-            await interaction.response.send_message("이자는 잔고 10000원부터 받을 수 있습니다.")
+            await interaction.response.send_message(
+                f"이자는 매일 자정에 자동으로 지급됩니다.\n"
+                f"예상 이자: {int(current_balance * INTEREST_RATE):,}원\n"
+                f"다음 지급까지 {self.format_time_until_midnight()} 남았습니다.")
             return
 
-        # 마지막 이자 지급 시간 확인
-        if last_interest is None or last_interest.date() != datetime.datetime.now().date():
+        now = datetime.datetime.now()
+        # 잔액 조건과 오늘 지급 여부를 확인하면서 한 번에 지급 (동시에 여러 번 받을 수 없음)
+        credited = await self.bot.db.fetchone("""
+            UPDATE users u
+            SET money = u.money + FLOOR(u.money * %(rate)s::numeric)::bigint, last_interest = %(now)s
+            FROM (SELECT uuid, money AS old_money FROM users WHERE uuid = %(uuid)s FOR UPDATE) o
+            WHERE u.uuid = o.uuid AND u.money >= %(min_balance)s
+              AND (u.last_interest IS NULL OR u.last_interest::date <> %(today)s)
+            RETURNING u.money, u.money - o.old_money
+        """, {"uuid": user_id, "rate": INTEREST_RATE, "min_balance": INTEREST_MIN_BALANCE,
+              "now": now, "today": now.date()})
+
+        if credited:
             # 오늘 처음 이자를 지급하는 경우
-            new_balance = int(current_balance + current_balance * 0.075)
-            self.bot.cursor.execute("UPDATE users SET money = %s, last_interest = %s WHERE uuid = %s",
-                                    (new_balance, datetime.datetime.now(), user_id))
-            self.bot.conn.commit()
-
+            new_balance, amount = credited
+            self.bot.balances.set(user_id, new_balance)
             await interaction.response.send_message(
-                f"오늘 {int(current_balance * 0.075):,}원의 이자를 받으셨습니다.\n현재 잔액: {new_balance:,}원")
+                f"오늘 {amount:,}원의 이자를 받으셨습니다.\n현재 잔액: {new_balance:,}원")
+            return
+
+        # 지급되지 않은 이유 확인
+        current_balance = await self.bot.balances.get(user_id) or 0
+        if current_balance < INTEREST_MIN_BALANCE:
+            await interaction.response.send_message(f"이자는 잔고 {INTEREST_MIN_BALANCE}원부터 받을 수 있습니다.")
         else:
-            now = datetime.datetime.now()
-            next_midnight = (now + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-            remaining_time = next_midnight - now
-
-            hours = remaining_time.seconds // 3600
-            minutes = (remaining_time.seconds % 3600) // 60
-            seconds = remaining_time.seconds % 60
-
-            await interaction.response.send_message(f"다음 이자까지 {hours}시간 {minutes}분 {seconds}초 남았습니다.")
-
-    async def show_balance_rank(self, interaction: discord.Interaction, page: int = 1):
-        # 명령어를 호출한 서버의 멤버 목록 가져오기
-        guild_members = interaction.guild.members
-
-        # 데이터베이스에서 서버 멤버들의 정보 가져오기
-        member_ids = [member.id for member in guild_members]
-        self.bot.cursor.execute("SELECT uuid, money FROM users WHERE uuid IN %s ORDER BY money DESC",
-                              (tuple(member_ids),))
-        user_data = self.bot.cursor.fetchall()
-
-        # 총 페이지 수 계산
-        page_size = 10
-        total_pages = (len(user_data) + page_size - 1) // page_size
-
-        # 현재 페이지의 데이터 가져오기
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        user_data_page = user_data[start_index:end_index]
-
-        # 임베드 메시지 생성
-        embed = discord.Embed(title=f"이 서버의 잔고 순위 - {page}/{total_pages} 페이지", color=discord.Color.blue())
-
-        for rank, (user_id, balance) in enumerate(user_data_page, start=start_index + 1):
-            user = interaction.guild.get_member(user_id)
-            if user:
-                username = user.name
-            else:
-                username = f"Unknown User ({user_id})"
-            embed.add_field(name=f"{rank}. {username}", value=f"{balance:,}원", inline=False)
+            await interaction.response.send_message(f"다음 이자까지 {self.format_time_until_midnight()} 남았습니다.")
+
+    @staticmethod
+    def format_time_until_midnight() -> str:
+        now = datetime.datetime.now()
+        next_midnight = (now + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        remaining_time = next_midnight - now
+
+        hours = remaining_time.seconds // 3600
+        minutes = (remaining_time.seconds % 3600) // 60
+        seconds = remaining_time.seconds % 60
+        return f"{hours}시간 {minutes}분 {seconds}초"
+
+    async def accrue_daily_interest(self):
+        """조건을 만족하는 모든 사용자에게 오늘의 이자를 지급 (uuid 구간별로 나눠서 처리)
+
+        Returns: (지급한 사용자 수, 지급한 총액)
+        """
+        now = datetime.datetime.now()
+        credited_users = 0
+        credited_total = 0
+        after = None
+
+        while True:
+            async with self.bot.db.transaction() as tx:
+                # 다음 구간의 끝 uuid
+                upper = await tx.fetchval("""
+                    SELECT max(uuid) FROM (
+                        SELECT uuid FROM users
+                        WHERE %(after)s::bigint IS NULL OR uuid > %(after)s
+                        ORDER BY uuid
+                        LIMIT %(chunk)s
+                    ) chunk
+                """, {"after": after, "chunk": self.interest_chunk_size})
+                if upper is None:
+                    break
+
+                rows = await tx.fetchall("""
+                    UPDATE users u
+                    SET money = u.money + FLOOR(u.money * %(rate)s::numeric)::bigint, last_interest = %(now)s
+                    FROM (
+                        SELECT uuid, money AS old_money FROM users
+                        WHERE (%(after)s::bigint IS NULL OR uuid > %(after)s) AND uuid <= %(upper)s
+                        FOR UPDATE
+                    ) o
+                    WHERE u.uuid = o.uuid AND u.money >= %(min_balance)s
+                      AND (u.last_interest IS NULL OR u.last_interest::date <> %(today)s)
+                    RETURNING u.uuid, u.money, u.money - o.old_money
+                """, {"after": after, "upper": upper, "rate": INTEREST_RATE,
+                      "min_balance": INTEREST_MIN_BALANCE, "now": now, "today": now.date()})
+
+            for user_id, balance, amount in rows:
+                self.bot.balances.publish(user_id, balance)
+                credited_total += amount
+            credited_users += len(rows)
+            after = upper
+
+        return credited_users, credited_total
+
+    async def midnight_job(self):
+        # 이자 지급은 모든 사용자 대상이므로 샤드 0 을 맡은 프로세스에서만
+        if self.interest_mode == "auto" and self.bot.shard_plan.primary:
+            credited_users, credited_total = await self.accrue_daily_interest()
+            print(f"이자 자동 지급: {credited_users:,}명, 총 {credited_total:,}원")
+        await self.daily_interest_notification()
+
+    async def show_balance_rank(self, interaction: discord.Interaction):
+        guild_id = interaction.guild.id
+        total, my_rank = await self.bot.leaderboard.summary(guild_id, interaction.user.id)
+        if not total:
+            await interaction.response.send_message("순위에 표시할 사용자가 없습니다.", ephemeral=True)
+            return
 
         # 버튼이 있는 뷰 생성
-        view = PaginationView(self.bot, total_pages, page)
-
-        # 첫 메시지인지 또는 버튼을 통한 업데이트인지 확인
-        if interaction.response.is_done():
-            await interaction.message.edit(embed=embed, view=view)
-        else:
-            await interaction.response.send_message(embed=embed, view=view)
+        view = PaginationView(self.bot.leaderboard, self.bot.member_names, guild_id, total, my_rank)
+        await view.load()
+        await interaction.response.send_message(embed=await view.build_embed(interaction.guild), view=view)
+        view.message = await interaction.original_response()
 
     @app_commands.command(name="순위", description="이 서버의 사용자들의 잔고 순위를 보여줍니다.")
     async def balance_rank_command(self, interaction: discord.Interaction):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
-
         await self.show_balance_rank(interaction)
 
 
@@ -1,273 +1,252 @@
+import os
 import random
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from core.cards import BlackjackRules, Hand, Shoe, card_str
+from core.permissions import Category
+from core.sessions import BlackjackSession, GameInProgress, SessionStore
 
-class Card:
-    def __init__(self, suit, value):
-        self.suit = suit
-        self.value = value
-
-    def __str__(self):
-        suits = {'hearts': '♥', 'diamonds': '♦', 'clubs': '♣', 'spades': '♠'}
-        values = {
-            1: 'A', 11: 'J', 12: 'Q', 13: 'K',
-            **{i: str(i) for i in range(2, 11)}
-        }
-        return f"{suits[self.suit]}{values[self.value]}"
-
-
-class Deck:
-    def __init__(self):
-        self.cards = []
-        suits = ['hearts', 'diamonds', 'clubs', 'spades']
-        for suit in suits:
-            for value in range(1, 14):
-                self.cards.append(Card(suit, value))
-        random.shuffle(self.cards)
-
-    def draw(self):
-        return self.cards.pop()
+EXPIRE_POLICIES = ("refund", "stand", "forfeit")
 
 
 class Blackjack(commands.Cog):
+    command_category = Category.GAMBLING  # 채널 권한 검사에 쓰이는 명령어 분류
+
     def __init__(self, bot):
         self.bot = bot
-        self.games = {}  # 진행 중인 게임 저장
-
-    async def ensure_user(self, user_id):
-        self.bot.cursor.execute("SELECT * FROM users WHERE uuid = %s", (user_id,))
-        user_data = self.bot.cursor.fetchone()
-        if not user_data:
-            self.bot.cursor.execute("INSERT INTO users (uuid) VALUES (%s)", (user_id,))
-            self.bot.conn.commit()
-
-    def calculate_hand(self, hand):
-        total = 0
-        aces = 0
-
-        for card in hand:
-            if card.value == 1:  # Ace
-                aces += 1
-            elif card.value > 10:  # Face cards
-                total += 10
-            else:
-                total += card.value
-
-        # Ace 처리
-        for _ in range(aces):
-            if total + 11 <= 21:
-                total += 11
-            else:
-                total += 1
-
-        return total
-
-    def is_blackjack(self, hand):
-        # 카드가 정확히 2장이고, 합이 21인 경우만 블랙잭으로 인정
-        if len(hand) != 2:
-            return False
-
-        # Ace와 10점 카드(10,J,Q,K)가 있는지 확인
-        has_ace = any(card.value == 1 for card in hand)
-        has_ten = any(card.value >= 10 for card in hand)
-
-        return has_ace and has_ten
+        # 진행 중인 게임 저장 (BLACKJACK_IDLE_TIMEOUT 초 동안 방치된 게임은 자동 정리)
+        self.games = SessionStore.from_env(bot.db, bot.balances, on_expire=self.expire_game)
+        # 방치된 게임 처리 방식: refund(배팅 반환) / stand(그 자리에서 스탠드) / forfeit(배팅 몰수)
+        self.expire_policy = os.getenv("BLACKJACK_EXPIRE_POLICY", "refund")
+        if self.expire_policy not in EXPIRE_POLICIES:
+            raise ValueError(f"BLACKJACK_EXPIRE_POLICY는 {', '.join(EXPIRE_POLICIES)} 중 하나여야 합니다.")
+        self.rules = BlackjackRules()  # 배당과 딜러 규칙 (python -m bench.simulate 로 기대값 확인)
+        self.shoes = {}  # 채널별 카드 슈
+        self.decks = int(os.getenv("BLACKJACK_DECKS", 6))
+        self.penetration = float(os.getenv("BLACKJACK_PENETRATION", 0.75))
+        seed = os.getenv("BLACKJACK_SEED")  # 지정하면 카드 순서가 재현됨 (테스트용)
+        self.rng = random.Random(int(seed) if seed is not None else None)
+
+    async def cog_load(self):
+        restored = await self.games.restore(self.bot.shard_plan)
+        if restored:
+            print(f"진행 중이던 블랙잭 게임 {restored}개 복원")
+        self.games.start()
+
+    async def cog_unload(self):
+        await self.games.close()
+
+    def get_shoe(self, channel_id):
+        # 채널(테이블)마다 슈 하나를 계속 사용 (재시작 후 복원된 게임은 여기서 새 슈를 받음)
+        shoe = self.shoes.get(channel_id)
+        if shoe is None:
+            shoe = self.shoes[channel_id] = Shoe(self.decks, self.penetration, self.rng)
+        return shoe
 
     @app_commands.command(name="블랙잭", description="블랙잭 게임을 시작합니다.\n승리시 2배, 무승부시 1배, 패배시 0배")
+    @app_commands.guild_only()  # 게임은 서버(채널)별로 저장하므로 DM 에서는 시작할 수 없음
     async def blackjack(self, interaction: discord.Interaction, amount: int):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
-
         user_id = interaction.user.id
 
-        if user_id in self.games:
+        # 진행 중인 게임이 있으면 (메시지를 잃어버렸거나 재시작된 경우 포함) 이어서 진행
+        game = self.games.get(user_id)
+        if game and game.status == 'playing':
+            # 이어서 하는 게임이 곧바로 방치 게임으로 정리되지 않도록 마지막 동작 시각 갱신
+            self.games.touch(game)
             await interaction.response.send_message(
-                "이미 진행 중인 게임이 있습니다. 현재 게임을 완료해주세요.",
-                ephemeral=True
+                "진행 중인 게임을 이어서 합니다.\n" + self.render(game),
+                view=self.build_view(user_id)
             )
             return
 
-        await self.ensure_user(user_id)
-
-        # 현재 잔액 확인
-        self.bot.cursor.execute("SELECT money FROM users WHERE uuid = %s", (user_id,))
-        current_balance = self.bot.cursor.fetchone()[0]
-
         # 배팅 금액 검증
         if amount <= 0:
             await interaction.response.send_message("0원 이하로는 배팅할 수 없습니다.", ephemeral=True)
             return
 
-        if current_balance < amount:
-            await interaction.response.send_message("잔액이 부족합니다.", ephemeral=True)
-            return
+        await self.bot.user_registry.ensure(user_id)
+
+        # 잔액 확인과 배팅 차감 사이에 같은 사용자의 다른 배팅이 끼어들지 않도록 잠금
+        async with self.bot.balances.locked(user_id):
+            if user_id in self.games:
+                await interaction.response.send_message(
+                    "이미 진행 중인 게임이 있습니다. 현재 게임을 완료해주세요.",
+                    ephemeral=True
+                )
+                return
+
+            # 현재 잔액 확인
+            current_balance = await self.bot.balances.get(user_id)
+            if current_balance < amount:
+                # 다른 프로세스에서 입금되었을 수 있으므로 거절하기 전에 DB에서 다시 읽음
+                current_balance = await self.bot.balances.get(user_id, fresh=True)
+            if current_balance < amount:
+                await interaction.response.send_message("잔액이 부족합니다.", ephemeral=True)
+                return
+
+            # 새 게임 시작
+            # 컷 카드를 지났으면 게임을 시작하기 전에만 다시 섞음 (히트/딜러 드로우 중에는 섞지 않음)
+            shoe = self.get_shoe(interaction.channel_id)
+            shoe.prepare()
+            player_hand = Hand((shoe.draw(), shoe.draw()))
+            dealer_hand = Hand((shoe.draw(), shoe.draw()))
+            game = BlackjackSession(user_id, interaction.guild_id, interaction.channel_id,
+                                    amount, player_hand, dealer_hand)
+
+            # 배팅 금액은 게임 시작 시 게임 저장과 함께 먼저 차감하고, 게임이 끝나면 원금과 함께 정산
+            # 다른 프로세스에서 먼저 시작한 게임이 있으면 아무것도 차감하지 않고 거절
+            try:
+                new_balance = await self.games.begin(game)
+            except GameInProgress:
+                await interaction.response.send_message(
+                    "이미 진행 중인 게임이 있습니다. 현재 게임을 완료해주세요.",
+                    ephemeral=True
+                )
+                return
+            if new_balance is None:
+                await interaction.response.send_message("잔액이 부족합니다.", ephemeral=True)
+                return
+
+        # 초기 게임 상태 표시
+        await interaction.response.send_message(self.render(game), view=self.build_view(user_id))
 
-        # 새 게임 시작
-        deck = Deck()
-        player_hand = [deck.draw(), deck.draw()]
-        dealer_hand = [deck.draw(), deck.draw()]
-
-        self.games[user_id] = {
-            'deck': deck,
-            'player_hand': player_hand,
-            'dealer_hand': dealer_hand,
-            'amount': amount,
-            'status': 'playing'
-        }
-
-        # 버튼 생성
-        view = discord.ui.View()
+    def build_view(self, user_id):
+        # 버튼은 게임이 자동 정리되기 전까지만 유효
+        view = discord.ui.View(timeout=self.games.idle_timeout)
         hit_button = discord.ui.Button(label="히트", style=discord.ButtonStyle.primary, custom_id="hit")
         stand_button = discord.ui.Button(label="스탠드", style=discord.ButtonStyle.secondary, custom_id="stand")
 
         async def hit_callback(interaction):
+            if not await self.check_player(interaction, user_id):
+                return
             game = self.games.get(user_id)
-            if not game or game['status'] != 'playing':
+            if not game or game.status != 'playing':
                 return
 
             # 카드 추가 드로우
-            game['player_hand'].append(game['deck'].draw())
-            player_total = self.calculate_hand(game['player_hand'])
+            game.player_hand.add(self.get_shoe(game.channel_id).draw())
 
-            if player_total > 21:
+            if game.player_hand.busted:
                 await self.end_game(interaction, user_id, "bust")
             else:
+                await self.games.save(game)
                 await self.update_game_message(interaction, user_id)
 
         async def stand_callback(interaction):
+            if not await self.check_player(interaction, user_id):
+                return
             game = self.games.get(user_id)
-            if not game or game['status'] != 'playing':
+            if not game or game.status != 'playing':
                 return
 
-            # 딜러 플레이
-            dealer_total = self.calculate_hand(game['dealer_hand'])
-            while dealer_total < 17:
-                game['dealer_hand'].append(game['deck'].draw())
-                dealer_total = self.calculate_hand(game['dealer_hand'])
-
             await self.end_game(interaction, user_id, "stand")
 
         hit_button.callback = hit_callback
         stand_button.callback = stand_callback
         view.add_item(hit_button)
         view.add_item(stand_button)
+        return view
 
-        # 초기 게임 상태 표시
-        player_total = self.calculate_hand(player_hand)
-        dealer_cards = f"{dealer_hand[0]} ??"
-        player_cards = " ".join(str(card) for card in player_hand)
-
-        await interaction.response.send_message(
-            f"딜러의 패: {dealer_cards}\n"
-            f"당신의 패: {player_cards} (총합: {player_total})\n"
-            f"배팅 금액: {amount:,}원",
-            view=view
-        )
+    async def check_player(self, interaction, user_id):
+        # 게임 메시지는 채널의 모두에게 보이므로 버튼은 게임을 시작한 사람만 누를 수 있음
+        if interaction.user.id == user_id:
+            return True
+        await interaction.response.send_message("본인의 게임만 진행할 수 있습니다.", ephemeral=True)
+        return False
 
-    async def update_game_message(self, interaction, user_id):
-        game = self.games[user_id]
-        player_total = self.calculate_hand(game['player_hand'])
-        dealer_cards = f"{game['dealer_hand'][0]} ??"
-        player_cards = " ".join(str(card) for card in game['player_hand'])
+    def render(self, game):
+        dealer_cards = f"{card_str(game.dealer_hand[0])} ??"
+        return (f"딜러의 패: {dealer_cards}\n"
+                f"당신의 패: {game.player_hand} (총합: {game.player_hand.total})\n"
+                f"배팅 금액: {game.amount:,}원")
 
-        await interaction.response.edit_message(
-            content=f"딜러의 패: {dealer_cards}\n"
-                    f"당신의 패: {player_cards} (총합: {player_total})\n"
-                    f"배팅 금액: {game['amount']:,}원"
-        )
+    async def update_game_message(self, interaction, user_id):
+        game = self.games.get(user_id)
+        await interaction.response.edit_message(content=self.render(game))
+
+    def play_dealer(self, game):
+        shoe = self.get_shoe(game.channel_id)
+        while self.rules.dealer_hits(game.dealer_hand):
+            game.dealer_hand.add(shoe.draw())
+
+    def judge(self, game, reason):
+        """게임 결과와 배팅 원금을 제외한 손익을 반환"""
+        result, multiplier = self.rules.judge(game.player_hand, game.dealer_hand, busted=reason == "bust")
+        return result, int(game.amount * multiplier)
+
+    async def settle_game(self, game, winnings):
+        """게임을 정산하고 (정산 후 잔액, 땅 주인 수수료, 실제 반영된 손익)을 반환"""
+        # 남의 땅이면 땅 주인 수수료
+        landowner_cut, owner_id = await self.bot.venues.fee_for(game.guild_id, game.channel_id, game.user_id, winnings)
+        winnings_after_cut = winnings - landowner_cut
+
+        # 배팅 원금 + 수수료 제외 금액 반영 (내가 땅 주인이거나 지거나 비겼을 때는 그대로)
+        # 게임 삭제와 지급을 함께 처리하므로 이미 정산된 게임이면 None
+        # 딜러 블랙잭 추가 손실은 잔액이 0 아래로 내려가지 않는 만큼만 빠지므로 실제 지급액으로 손익을 다시 계산
+        settled = await self.games.finish(game, game.amount + winnings_after_cut)
+        if settled is None:
+            return None, landowner_cut, winnings_after_cut
+        new_balance, paid = settled
+
+        # 땅 주인 수수료 추가
+        self.bot.venues.pay_fee(owner_id, landowner_cut)
+        return new_balance, landowner_cut, paid - game.amount
+
+    async def expire_game(self, game):
+        """방치된 게임을 BLACKJACK_EXPIRE_POLICY 에 따라 정리"""
+        if self.expire_policy == "refund":
+            await self.games.finish(game, game.amount)
+        elif self.expire_policy == "forfeit":
+            await self.games.finish(game, 0)
+        else:
+            self.play_dealer(game)
+            _, winnings = self.judge(game, "stand")
+            await self.settle_game(game, winnings)
 
     async def end_game(self, interaction, user_id, reason):
-        game = self.games[user_id]
-        player_hand = game['player_hand']
-        dealer_hand = game['dealer_hand']
-        player_total = self.calculate_hand(player_hand)
-        dealer_total = self.calculate_hand(dealer_hand)
-        amount = game['amount']
+        game = self.games.get(user_id)
+        # DB 처리 중 버튼이 다시 눌려도 중복 정산되지 않도록 먼저 상태를 바꿈
+        game.status = 'finished'
+        dealer_cards = bytes(game.dealer_hand.cards)
+        if game.player_hand.busted:
+            # 버스트 후 정산에 실패한 게임은 스탠드를 눌러도 버스트로 정산
+            reason = "bust"
+
+        # 딜러 플레이 (버스트면 딜러는 카드를 받지 않음)
+        if reason == "stand":
+            self.play_dealer(game)
+        player_hand = game.player_hand
+        dealer_hand = game.dealer_hand
 
         # 결과 계산
-        if reason == "bust":
-            result = "패배"
-            winnings = -amount
-        else:
-            player_blackjack = self.is_blackjack(player_hand)
-            dealer_blackjack = self.is_blackjack(dealer_hand)
-
-            if player_blackjack:
-                if dealer_blackjack:
-                    result = "무승부 (블랙잭)"
-                    winnings = 0
-                else:
-                    result = "블랙잭!"
-                    winnings = int(amount * 1.5)  # 원금 포함 2.5배
-            elif dealer_blackjack:
-                result = "패배 (딜러 블랙잭)"
-                winnings = -int(amount * 1.5)
-            elif dealer_total > 21:
-                result = "승리"
-                winnings = amount
-            elif player_total > dealer_total:
-                result = "승리"
-                winnings = amount
-            elif player_total < dealer_total:
-                result = "패배"
-                winnings = -amount
-            else:
-                result = "무승부"
-                winnings = 0
-        landowner_cut = 0
-        winnings_after_cut = winnings
-        if winnings > 0:
-            self.bot.cursor.execute("SELECT owner_id FROM lands WHERE guild_id = %s AND channel_id = %s",
-                                    (interaction.guild.id, interaction.channel_id))
-            owner_id = self.bot.cursor.fetchone()
-            if owner_id and owner_id[0] and owner_id[0] != user_id:
-                # 수수료
-                landowner_cut = int(winnings * 0.02)
-                winnings_after_cut = winnings - landowner_cut
-
-                # 수수료 제외 금액 추가
-                self.bot.cursor.execute("UPDATE users SET money = money + %s WHERE uuid = %s",
-                                        (winnings_after_cut, user_id))
-                # 땅 주인 수수료 추가
-                self.bot.cursor.execute("UPDATE users SET money = money + %s WHERE uuid = %s",
-                                        (landowner_cut, owner_id[0]))
-            else:
-                # 내가 땅 주인이면 그냥 ㄱ
-                self.bot.cursor.execute("UPDATE users SET money = money + %s WHERE uuid = %s", (winnings, user_id))
-        else:
-            # 지거나 비겼을 때
-            self.bot.cursor.execute("UPDATE users SET money = money + %s WHERE uuid = %s", (winnings, user_id))
-
-        self.bot.conn.commit()
-
-        # 새로운 잔액 조회
-        self.bot.cursor.execute("SELECT money FROM users WHERE uuid = %s", (user_id,))
-        new_balance = self.bot.cursor.fetchone()[0]
-
-        dealer_cards = " ".join(str(card) for card in dealer_hand)
-        player_cards = " ".join(str(card) for card in player_hand)
+        result, winnings = self.judge(game, reason)
+        try:
+            new_balance, landowner_cut, winnings_after_cut = await self.settle_game(game, winnings)
+        except Exception as e:
+            # 정산되지 않았으므로 딜러 패를 되돌리고 게임을 되살려서 다시 스탠드하거나 방치 게임으로 정리될 수 있게 함
+            game.dealer_hand = Hand(dealer_cards)
+            game.status = 'playing'
+            await interaction.response.send_message(
+                "정산 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요.", ephemeral=True)
+            raise e
+        if new_balance is None:
+            await interaction.response.edit_message(content="이미 정산된 게임입니다.", view=None)
+            return
 
         # 결과 메시지 전송
         msg = f"게임 종료!\n" \
-              f"딜러의 패: {dealer_cards} (총합: {dealer_total})\n" \
-              f"당신의 패: {player_cards} (총합: {player_total})\n" \
+              f"딜러의 패: {dealer_hand} (총합: {dealer_hand.total})\n" \
+              f"당신의 패: {player_hand} (총합: {player_hand.total})\n" \
               f"결과: {result}\n"
 
         if winnings > 0:
+            msg += f"획득: +{winnings_after_cut:,}원\n"
             if landowner_cut != 0:
-                msg += f"획득: +{winnings_after_cut:,}원\n"
                 msg += f"수수료: -{landowner_cut:,}원\n"
-            else:
-                msg += f"획득: +{winnings:,}원\n"
         elif winnings < 0:
-            msg += f"손실: {winnings:,}원\n"
+            msg += f"손실: {winnings_after_cut:,}원\n"
         else:
             msg += "금액 변동 없음\n"
 
@@ -278,9 +257,6 @@ class Blackjack(commands.Cog):
             view=None
         )
 
-        # 게임 정보 삭제
-        del self.games[user_id]
-
 
 async def setup(bot):
-    await bot.add_cog(Blackjack(bot))
\ No newline at end of file
+    await bot.add_cog(Blackjack(bot))
@@ -1,85 +1,115 @@
-import random
+import os
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from core.dice import play_rounds, roll, winnings_for
+from core.permissions import Category
+from core.settlement import InsufficientFunds
+
+# 여러 판을 진행했을 때 중간에 멈춘 이유
+STOP_REASONS = {
+    "balance": "잔액 부족으로 중단",
+    "stop_loss": "손절 기준 도달로 중단",
+    "take_profit": "익절 기준 도달로 중단",
+}
+
+
 class Dice(commands.Cog):
+    command_category = Category.GAMBLING  # 채널 권한 검사에 쓰이는 명령어 분류
+
     def __init__(self, bot):
         self.bot = bot
+        # 한 번에 진행할 수 있는 최대 판 수
+        self.max_rounds = int(os.getenv("DICE_MAX_ROUNDS", 100))
 
-    async def ensure_user(self, user_id):
-        self.bot.cursor.execute("SELECT * FROM users WHERE uuid = %s", (user_id,))
-        user_data = self.bot.cursor.fetchone()
-        if not user_data:
-            # 사용자가 없으면 추가
-            print(user_id)
-            self.bot.cursor.execute("INSERT INTO users (uuid) VALUES (%s)", (user_id,))
-            self.bot.conn.commit()
-
-    @app_commands.command(name="홀짝", description="주사위 눈금으로 승부가 결정납니다.\n승리시 1.75배, 패배시 0배")
+    @app_commands.command(name="홀짝", description="주사위 눈금으로 승부가 결정납니다.\n승리시 1.75배, 패배시 0배 "
+                                                  "(rounds 로 여러 판, stop_loss/take_profit 으로 손절/익절)")
     @app_commands.choices(choice=[
         app_commands.Choice(name="홀", value="odd"),
         app_commands.Choice(name="짝", value="even")
     ])
-    async def binary_dice(self, interaction: discord.Interaction, amount: int, choice: str):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
-
-        user_id = interaction.user.id
-        await self.ensure_user(user_id)
-
-        # 현재 잔액 확인
-        self.bot.cursor.execute("SELECT money FROM users WHERE uuid = %s", (user_id,))
-        current_balance = self.bot.cursor.fetchone()[0]
-
+    async def binary_dice(self, interaction: discord.Interaction, amount: int, choice: str, rounds: int = 1,
+                          stop_loss: int = None, take_profit: int = None):
         # 배팅 금액 검증
         if amount <= 0:
             await interaction.response.send_message("0원 이하로는 배팅할 수 없습니다.", ephemeral=True)
             return
+        if not 1 <= rounds <= self.max_rounds:
+            await interaction.response.send_message(f"판 수는 1~{self.max_rounds}판까지 가능합니다.", ephemeral=True)
+            return
+        if (stop_loss is not None and stop_loss <= 0) or (take_profit is not None and take_profit <= 0):
+            await interaction.response.send_message("손절/익절 금액은 0원보다 커야 합니다.", ephemeral=True)
+            return
 
-        if current_balance < amount:
-            await interaction.response.send_message("잔액이 부족합니다.", ephemeral=True)
+        user_id = interaction.user.id
+        await self.bot.user_registry.ensure(user_id)
+
+        # 잔액 확인부터 정산까지 같은 사용자의 다른 배팅과 겹치지 않도록 잠금
+        async with self.bot.balances.locked(user_id):
+            # 현재 잔액 확인 (캐시 값은 다른 프로세스에서 바뀌었을 수 있으므로 정산할 때 DB에서 다시 확인)
+            current_balance = await self.bot.balances.get(user_id)
+            if current_balance < amount:
+                # 다른 프로세스에서 입금되었을 수 있으므로 거절하기 전에 DB에서 다시 읽음
+                current_balance = await self.bot.balances.get(user_id, fresh=True)
+            if current_balance < amount:
+                await interaction.response.send_message("잔액이 부족합니다.", ephemeral=True)
+                return
+
+            # 승리 시 수익 (1.75배 중 추가 수익), 남의 땅이면 이길 때마다 땅 주인 수수료를 뗌
+            winnings = winnings_for(amount)
+            fee, owner_id = await self.bot.venues.fee_for(
+                interaction.guild_id, interaction.channel_id, user_id, winnings)
+
+            # 주사위는 한 번에 굴리고, 모든 판의 손익을 한 번에 정산
+            run = play_rounds(roll(rounds), choice == "odd", amount, winnings - fee, current_balance,
+                              stop_loss, take_profit)
+            try:
+                # 이 결과는 시작 잔액이 run.required 이상일 때만 유효하므로 DB의 잔액이 모자라면 반영하지 않음
+                new_balance = await self.bot.settlement.settle(user_id, run.net, required=run.required)
+            except InsufficientFunds:
+                await interaction.response.send_message("잔액이 부족합니다.", ephemeral=True)
+                return
+            except Exception as e:
+                await interaction.response.send_message(
+                    "정산 중 오류가 발생했습니다. 잔액은 바뀌지 않았습니다.", ephemeral=True)
+                raise e
+            self.bot.venues.pay_fee(owner_id, fee * run.wins)
+
+        if rounds == 1:
+            dice = run.rolls[0]
+            if run.wins:
+                result_msg = f"승리! {run.net:,}원을 얻었습니다."
+                if fee:
+                    result_msg += f"\n수수료: -{fee:,}원"
+            else:
+                result_msg = f"패배... {amount:,}원을 잃었습니다."
+
+            # 결과 메시지
+            await interaction.response.send_message(
+                f"🎲 주사위: {dice}\n"
+                f"선택: {'홀' if choice == 'odd' else '짝'}\n"
+                f"{result_msg}\n"
+                f"현재 잔액: {new_balance:,}원"
+            )
             return
 
-        # 주사위 굴리기
-        dice = random.randint(1, 6)
-        is_odd = dice % 2 == 1
-        user_chose_odd = choice == "odd"
-
-        # 승패 결정
-        if (is_odd and user_chose_odd) or (not is_odd and not user_chose_odd):
-            # 승리 (1.75배)
-            winnings = int(amount * 0.75)  # 추가 수익만 계산
-            self.bot.cursor.execute("UPDATE users SET money = money + %s WHERE uuid = %s",
-                                    (winnings, user_id))  # 추가 수익만 더함
-            result_msg = f"승리! {winnings:,}원을 얻었습니다."
-        else:
-            # 패배 (0배 = 전부 손실)
-            loss = int(amount)  # 잃을 금액 계산
-            self.bot.cursor.execute("UPDATE users SET money = money - %s WHERE uuid = %s",
-                                    (loss, user_id))  # 손실금액을 뺌
-            result_msg = f"패배... {loss:,}원을 잃었습니다."
-
-        self.bot.conn.commit()
-
-        # 새로운 잔액 조회
-        self.bot.cursor.execute("SELECT money FROM users WHERE uuid = %s", (user_id,))
-        new_balance = self.bot.cursor.fetchone()[0]
-
-        # 결과 메시지
-        await interaction.response.send_message(
-            f"🎲 주사위: {dice}\n"
-            f"선택: {'홀' if user_chose_odd else '짝'}\n"
-            f"{result_msg}\n"
-            f"현재 잔액: {new_balance:,}원"
+        embed = discord.Embed(
+            title=f"🎲 홀짝 {run.played}판 ({'홀' if choice == 'odd' else '짝'}, 판당 {amount:,}원)",
+            description=STOP_REASONS.get(run.stopped),
+            color=discord.Color.green() if run.net >= 0 else discord.Color.red()
         )
-
+        embed.add_field(name="승/패", value=f"{run.wins}승 {run.losses}패", inline=True)
+        embed.add_field(name="최장 연승/연패", value=f"{run.longest_win}연승 / {run.longest_loss}연패", inline=True)
+        embed.add_field(name="손익", value=f"{run.net:+,}원", inline=True)
+        if fee and run.wins:
+            embed.add_field(name="수수료", value=f"-{fee * run.wins:,}원", inline=True)
+        embed.add_field(name="현재 잔액", value=f"{new_balance:,}원", inline=True)
+        # 주사위 눈은 최근 30판까지만 표시
+        faces = " ".join(map(str, run.rolls[-30:]))
+        embed.set_footer(text=f"주사위: {'… ' if run.played > 30 else ''}{faces}")
+        await interaction.response.send_message(embed=embed)
 
 
 async def setup(bot):
@@ -2,19 +2,96 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
+from core.guild_config import GuildConfig, GuildConfigCache
+from core.permissions import ALL_CATEGORIES, CATEGORY_NAMES, GUILD_SCOPE, Category
+
+CATEGORY_CHOICES = [
+    app_commands.Choice(name="전체", value=int(ALL_CATEGORIES)),
+    *(app_commands.Choice(name=name, value=int(category)) for category, name in CATEGORY_NAMES.items()),
+]
+
+
 class GuildSettings(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # 서버 설정 캐시 (GUILD_SETTINGS_TTL 초마다 다시 읽음)
+        self.configs = GuildConfigCache.from_env(bot.db)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # 모든 서버의 설정을 한 번에 읽어 두면 명령어 권한 검사에서 DB를 읽을 일이 없음
+        await self.configs.load_all(guild.id for guild in self.bot.guilds)
+
+    async def update_permission_rule(self, guild_id: int, channel_id: int, categories: int,
+                                     allow: bool = False, deny: bool = False):
+        """categories 비트의 기존 규칙을 지우고 허용 또는 차단으로 설정 (둘 다 아니면 초기화)"""
+        allow_bits = categories if allow else 0
+        deny_bits = categories if deny else 0
+        async with self.bot.db.transaction() as tx:
+            await tx.execute("""
+                INSERT INTO command_permissions (guild_id, channel_id, allow_mask, deny_mask)
+                VALUES (%(guild_id)s, %(channel_id)s, %(allow)s, %(deny)s)
+                ON CONFLICT (guild_id, channel_id)
+                DO UPDATE SET
+                    allow_mask = (command_permissions.allow_mask & ~%(clear)s) | %(allow)s,
+                    deny_mask = (command_permissions.deny_mask & ~%(clear)s) | %(deny)s
+            """, {"guild_id": guild_id, "channel_id": channel_id, "clear": categories,
+                  "allow": allow_bits, "deny": deny_bits})
+            await tx.execute("""
+                DELETE FROM command_permissions
+                WHERE guild_id = %s AND channel_id = %s AND allow_mask = 0 AND deny_mask = 0
+            """, (guild_id, channel_id))
+        self.configs.invalidate(guild_id)
+
+    @app_commands.command(name="채널권한", description="채널에서 사용할 수 있는 명령어 분류를 허용/차단합니다.")
+    @app_commands.choices(category=CATEGORY_CHOICES, mode=[
+        app_commands.Choice(name="허용", value="allow"),
+        app_commands.Choice(name="차단", value="deny"),
+        app_commands.Choice(name="초기화", value="reset"),
+    ])
+    async def set_channel_permission(self, interaction: discord.Interaction, category: int, mode: str,
+                                     channel: discord.TextChannel = None):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("이 명령어는 관리자만 사용할 수 있습니다.", ephemeral=True)
+            return
+
+        channel = channel or interaction.channel
+        await self.update_permission_rule(interaction.guild.id, channel.id, category,
+                                          allow=mode == "allow", deny=mode == "deny")
+
+        names = self.format_categories(category)
+        if mode == "allow":
+            await interaction.response.send_message(
+                f"{channel.mention} 채널에서 {names} 명령어를 허용했습니다.\n"
+                f"허용 채널이 있는 분류는 허용된 채널에서만 사용할 수 있습니다.")
+        elif mode == "deny":
+            await interaction.response.send_message(f"{channel.mention} 채널에서 {names} 명령어를 차단했습니다.")
+        else:
+            await interaction.response.send_message(f"{channel.mention} 채널의 {names} 명령어 설정을 초기화했습니다.")
+
+    @app_commands.command(name="서버권한", description="서버 전체에서 명령어 분류를 허용/차단합니다.")
+    @app_commands.choices(category=CATEGORY_CHOICES, mode=[
+        app_commands.Choice(name="허용", value="allow"),
+        app_commands.Choice(name="차단", value="deny"),
+    ])
+    async def set_guild_permission(self, interaction: discord.Interaction, category: int, mode: str):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("이 명령어는 관리자만 사용할 수 있습니다.", ephemeral=True)
+            return
+
+        # 서버 전체 허용은 별도 규칙 없이 차단만 해제
+        await self.update_permission_rule(interaction.guild.id, GUILD_SCOPE, category, deny=mode == "deny")
+
+        names = self.format_categories(category)
+        if mode == "deny":
+            await interaction.response.send_message(
+                f"서버 전체에서 {names} 명령어를 차단했습니다. 채널별로 허용한 채널에서는 사용할 수 있습니다.")
+        else:
+            await interaction.response.send_message(f"서버 전체의 {names} 명령어 차단을 해제했습니다.")
 
-    async def setup_guild_settings_table(self):
-        await self.bot.conn.execute("""
-            CREATE TABLE IF NOT EXISTS guild_settings (
-                guild_id BIGINT PRIMARY KEY,
-                notification_channel_id BIGINT,
-                notification_role_id BIGINT,
-                UNIQUE(guild_id)
-            )
-        """)
+    @staticmethod
+    def format_categories(mask: int) -> str:
+        return ", ".join(name for category, name in CATEGORY_NAMES.items() if mask & category) or "없음"
 
     @app_commands.command(name="알림설정", description="알림을 보낼 채널과 역할을 설정합니다.")
     async def set_notification(self, interaction: discord.Interaction, role: discord.Role = None):
@@ -22,7 +99,7 @@ class GuildSettings(commands.Cog):
             await interaction.response.send_message("이 명령어는 관리자만 사용할 수 있습니다.", ephemeral=True)
             return
 
-        self.bot.cursor.execute("""
+        await self.bot.db.execute("""
             INSERT INTO guild_settings 
                 (guild_id, notification_channel_id, notification_role_id)
             VALUES (%s, %s, %s)
@@ -31,7 +108,7 @@ class GuildSettings(commands.Cog):
                 notification_channel_id = EXCLUDED.notification_channel_id,
                 notification_role_id = EXCLUDED.notification_role_id
         """, (interaction.guild.id, interaction.channel.id, role.id if role else None))
-        self.bot.conn.commit()
+        self.configs.invalidate(interaction.guild.id)
 
         if role:
             await interaction.response.send_message(
@@ -42,20 +119,14 @@ class GuildSettings(commands.Cog):
 
     @app_commands.command(name="설정확인", description="현재 서버의 설정을 확인합니다.")
     async def check_settings(self, interaction: discord.Interaction):
-        self.bot.cursor.execute("""
-            SELECT notification_channel_id, notification_role_id
-            FROM guild_settings
-            WHERE guild_id = %s
-        """, (interaction.guild.id,))
-
-        settings = self.bot.cursor.fetchone()
+        settings = await self.get_settings(interaction.guild.id)
 
-        if not settings:
+        if not settings.notification_channel_id and not settings.permissions.rules:
             await interaction.response.send_message("이 서버의 설정이 없습니다.")
             return
 
-        notification_channel = interaction.guild.get_channel(settings[0])
-        notification_role = interaction.guild.get_role(settings[1]) if settings[1] else None
+        notification_channel = interaction.guild.get_channel(settings.notification_channel_id)
+        notification_role = interaction.guild.get_role(settings.notification_role_id) if settings.notification_role_id else None
 
         embed = discord.Embed(title="서버 설정", color=discord.Color.blue())
         embed.add_field(
@@ -69,26 +140,45 @@ class GuildSettings(commands.Cog):
             inline=False
         )
 
+        rules = []
+        for channel_id, (allow, deny) in sorted(settings.permissions.rules.items()):
+            if channel_id == GUILD_SCOPE:
+                target = "서버 전체"
+            else:
+                channel = interaction.guild.get_channel(channel_id)
+                target = channel.mention if channel else f"삭제된 채널 ({channel_id})"
+            if allow:
+                rules.append(f"{target}: {self.format_categories(allow)} 허용")
+            if deny:
+                rules.append(f"{target}: {self.format_categories(deny)} 차단")
+        embed.add_field(name="명령어 권한", value="\n".join(rules) if rules else "제한 없음", inline=False)
+
         await interaction.response.send_message(embed=embed)
 
     # Bank 클래스에서 사용할 메서드들
-    async def check_command_permission(self, interaction: discord.Interaction) -> bool:
-        # 일단 모두 허용
-        return True
+    async def get_settings(self, guild_id: int) -> GuildConfig:
+        """서버 설정 가져오기 (캐시)"""
+        return await self.configs.get(guild_id)
+
+    async def check_command_permission(self, interaction: discord.Interaction, category: Category) -> bool:
+        """이 채널에서 category 분류의 명령어를 쓸 수 있는지 (PermissionTree 에서 호출)"""
+        settings = self.configs.peek(interaction.guild_id) or await self.get_settings(interaction.guild_id)
+        return settings.permissions.allows(interaction.channel_id, category)
+
+    async def get_all_notification_settings(self, guild_ids) -> dict:
+        """여러 서버의 알림 설정을 쿼리 한 번으로 가져오기 (알림 채널이 있는 서버만)"""
+        rows = await self.bot.db.fetchall("""
+            SELECT guild_id, notification_channel_id, notification_role_id
+            FROM guild_settings
+            WHERE guild_id = ANY(%s) AND notification_channel_id IS NOT NULL
+        """, (list(guild_ids),))
+        return {guild_id: (channel_id, role_id) for guild_id, channel_id, role_id in rows}
 
     async def get_notification_settings(self, guild_id: int) -> tuple:
         """알림 설정 가져오기"""
-        self.bot.cursor.execute("""
-            SELECT notification_channel_id, notification_role_id 
-            FROM guild_settings 
-            WHERE guild_id = %s
-        """, (guild_id,))
-
-        result = self.bot.cursor.fetchone()
-        if result:
-            return result[0], result[1]
-        return None, None
+        settings = await self.get_settings(guild_id)
+        return settings.notification_channel_id, settings.notification_role_id
 
 
 async def setup(bot):
-    await bot.add_cog(GuildSettings(bot))
\ No newline at end of file
+    await bot.add_cog(GuildSettings(bot))
@@ -1,15 +1,121 @@
+import asyncio
 import datetime
+from decimal import Decimal
+
 import discord
 from discord import app_commands
 from discord.ext import commands
 from discord.ui import View, Button
 from typing import Optional
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from core.db import RETRYABLE_ERRORS
+from core.holdings import LandHoldings
+from core.land_history import LandHistory
+from core.permissions import Category
+
+DEFAULT_LAND_PRICE = 1000000  # 주인이 없는 땅의 가격
+TAKEOVER_RATE = Decimal("1.2")  # 인수 가격 = 현재 가격 x 1.2
+MY_LANDS_LIMIT = 20  # /내땅 에 표시할 최대 땅 수
+PURCHASE_RETRIES = 3  # 교착 상태/직렬화 실패 시 구매 쿼리를 다시 실행하는 횟수
+
+# 땅 구매/인수를 한 번에 처리하는 쿼리
+# 땅 행과 구매자/판매자 행을 잠근 뒤, 화면에 보였던 소유자(expected_owner)와 현재 소유자가 다르면 'lost_race',
+# 자기 땅이면 'own_land', 잔액이 모자라면 'insufficient', 성공하면 'ok' 를 돌려줍니다.
+# 주인 없는 땅을 동시에 사려는 경우 INSERT 충돌로 진 쪽은 결제 없이 'lost_race' 가 됩니다.
+PURCHASE_LAND_SQL = """
+    WITH land AS (
+        SELECT id, owner_id, current_price
+        FROM lands
+        WHERE guild_id = %(guild_id)s AND channel_id = %(channel_id)s
+        FOR UPDATE
+    ),
+    quote AS (
+        SELECT land.id AS land_id,
+               land.owner_id AS seller_id,
+               land.current_price AS old_price,
+               CASE WHEN land.owner_id IS NULL THEN COALESCE(land.current_price, %(base_price)s)
+                    ELSE FLOOR(land.current_price * %(takeover_rate)s::numeric)::bigint
+               END AS price
+        FROM (SELECT 1) one
+        LEFT JOIN land ON TRUE
+    ),
+    parties AS (
+        -- 구매자와 판매자 행은 /송금, 정산 큐와 같이 사용자 id 순서로 잠금 (교착 상태 방지)
+        SELECT uuid, money FROM users
+        WHERE uuid IN (%(buyer_id)s, (SELECT owner_id FROM land))
+        ORDER BY uuid
+        FOR UPDATE
+    ),
+    buyer AS (
+        SELECT money FROM parties WHERE uuid = %(buyer_id)s
+    ),
+    checked AS (
+        SELECT q.*,
+               CASE WHEN q.seller_id IS DISTINCT FROM %(expected_owner)s THEN 'lost_race'
+                    WHEN q.seller_id = %(buyer_id)s THEN 'own_land'
+                    WHEN COALESCE(b.money, 0) < q.price THEN 'insufficient'
+                    ELSE 'ok'
+               END AS status
+        FROM quote q
+        LEFT JOIN buyer b ON TRUE
+    ),
+    created AS (
+        INSERT INTO lands (guild_id, channel_id, owner_id, current_price, purchase_date)
+        SELECT %(guild_id)s, %(channel_id)s, %(buyer_id)s, c.price, %(now)s
+        FROM checked c
+        WHERE c.status = 'ok' AND c.land_id IS NULL
+        ON CONFLICT (guild_id, channel_id) DO NOTHING
+        RETURNING id
+    ),
+    transferred AS (
+        UPDATE lands
+        SET owner_id = %(buyer_id)s, current_price = c.price, last_transaction_date = %(now)s
+        FROM checked c
+        WHERE c.status = 'ok' AND lands.id = c.land_id
+        RETURNING lands.id
+    ),
+    purchased AS (
+        SELECT id FROM created UNION ALL SELECT id FROM transferred
+    ),
+    debit AS (
+        UPDATE users
+        SET money = users.money - c.price
+        FROM checked c
+        WHERE users.uuid = %(buyer_id)s AND EXISTS (SELECT 1 FROM purchased)
+        RETURNING users.money
+    ),
+    credit AS (
+        INSERT INTO users (uuid, money)
+        SELECT c.seller_id, c.price
+        FROM checked c
+        WHERE c.seller_id IS NOT NULL AND EXISTS (SELECT 1 FROM purchased)
+        ON CONFLICT (uuid) DO UPDATE SET money = users.money + EXCLUDED.money
+        RETURNING users.money
+    ),
+    history AS (
+        INSERT INTO land_transactions
+            (guild_id, land_id, seller_id, buyer_id, transaction_price, transaction_type, created_at)
+        SELECT %(guild_id)s, p.id, c.seller_id, %(buyer_id)s, c.price,
+               CASE WHEN c.seller_id IS NULL THEN 'PURCHASE' ELSE 'TRANSFER' END, %(now)s
+        FROM checked c, purchased p
+    )
+    SELECT CASE WHEN c.status = 'ok' AND NOT EXISTS (SELECT 1 FROM purchased) THEN 'lost_race' ELSE c.status END,
+           c.seller_id,
+           c.old_price,
+           c.price,
+           (SELECT money FROM debit),
+           (SELECT money FROM credit)
+    FROM checked c
+"""
 
 
 class LandView(View):
-    def __init__(self, bot, channel_id: int, owner_id: Optional[int], price: int):
+    def __init__(self, bot, holdings, channel_id: int, owner_id: Optional[int], price: int):
         super().__init__(timeout=30)
         self.bot = bot
+        self.holdings = holdings
         self.channel_id = channel_id
         self.owner_id = owner_id
         self.price = price
@@ -23,130 +129,180 @@ class LandView(View):
         close_button.callback = self.close_callback
         self.add_item(close_button)
 
-    async def ensure_user(self, user_id):
-        self.bot.cursor.execute("SELECT 1 FROM users WHERE uuid = %s", (user_id,))
-        if not self.bot.cursor.fetchone():
-            print(f"Inserting user {user_id} into users table.")
-            self.bot.cursor.execute("INSERT INTO users (uuid) VALUES (%s)", (user_id,))
-            self.bot.conn.commit()
-
     async def buy_callback(self, interaction: discord.Interaction):
         buyer_id = interaction.user.id
-        await self.ensure_user(buyer_id)
-
-        self.bot.cursor.execute("SELECT owner_id FROM lands WHERE channel_id = %s", (self.channel_id,))
-        owner_data = self.bot.cursor.fetchone()
 
-        if owner_data is not None:
-            self.owner_id = owner_data[0]
-
-        print(self.owner_id, buyer_id)
         # 자기 자신의 땅은 살 수 없음
         if self.owner_id == buyer_id:
             await interaction.response.send_message("자신의 땅은 구매할 수 없습니다.", ephemeral=True)
             return
 
-        # 구매자의 잔액 확인
-        self.bot.cursor.execute("SELECT money FROM users WHERE uuid = %s", (buyer_id,))
-        buyer_balance = self.bot.cursor.fetchone()[0]  # 위에서 ensure_user를 했으므로 항상 존재함
-        purchase_price = self.price if not self.owner_id else int(self.price * 1.2)
-
-        if buyer_balance < purchase_price:
+        await self.bot.user_registry.ensure(buyer_id)
+
+        # 땅과 구매자 행을 잠그고 확인~결제~소유권 이전~거래 기록을 쿼리 한 번으로 처리
+        # (같은 사용자의 다른 배팅/송금과도 겹치지 않도록 잔액 잠금을 함께 잡음)
+        async with self.bot.balances.locked(buyer_id):
+            for attempt in range(1, PURCHASE_RETRIES + 1):
+                try:
+                    status, seller_id, old_price, purchase_price, buyer_balance, seller_balance = \
+                        await self.bot.db.fetchone(PURCHASE_LAND_SQL, {
+                            "guild_id": interaction.guild_id,
+                            "channel_id": self.channel_id,
+                            "buyer_id": buyer_id,
+                            "expected_owner": self.owner_id,
+                            "base_price": DEFAULT_LAND_PRICE,
+                            "takeover_rate": TAKEOVER_RATE,
+                            "now": datetime.datetime.now(),
+                        })
+                    break
+                except RETRYABLE_ERRORS as e:
+                    # 쿼리 한 번이 트랜잭션 하나이므로 롤백된 상태에서 처음부터 다시 실행
+                    if attempt == PURCHASE_RETRIES:
+                        await interaction.response.send_message("거래 처리 중 오류가 발생했습니다.", ephemeral=True)
+                        raise e
+                    await asyncio.sleep(0.05 * attempt)
+                except Exception as e:
+                    await interaction.response.send_message("거래 처리 중 오류가 발생했습니다.", ephemeral=True)
+                    raise e
+
+            if buyer_balance is not None:
+                self.bot.balances.set(buyer_id, buyer_balance)
+            if seller_balance is not None:
+                self.bot.balances.set(seller_id, seller_balance)
+
+        if status == "lost_race":
+            await interaction.response.send_message(
+                "다른 사용자가 먼저 거래했습니다. /땅정보 로 현재 소유자와 가격을 다시 확인해주세요.", ephemeral=True)
+            return
+        if status == "own_land":
+            await interaction.response.send_message("자신의 땅은 구매할 수 없습니다.", ephemeral=True)
+            return
+        if status == "insufficient":
             await interaction.response.send_message(f"잔액이 부족합니다. 필요한 금액: {purchase_price:,}원", ephemeral=True)
             return
 
-        # 트랜잭션 시작
-        try:
-            current_time = datetime.datetime.now()
-
-            # 구매자의 잔액 감소
-            self.bot.cursor.execute("UPDATE users SET money = money - %s WHERE uuid = %s", (purchase_price, buyer_id))
-
-            if self.owner_id:  # 이전 소유자가 있는 경우
-                await self.ensure_user(self.owner_id)
-                # 이전 소유자에게 돈 지급
-                self.bot.cursor.execute("UPDATE users SET money = money + %s WHERE uuid = %s",
-                                        (purchase_price, self.owner_id))
-
-            print(f"guild_id: {interaction.guild_id}, channel_id: {self.channel_id}, buyer_id: {buyer_id}, purchase_price: {purchase_price}")
-            # 땅 소유권 이전 및 가격 업데이트
-            self.bot.cursor.execute("""
-                SELECT id FROM lands WHERE guild_id = %s AND channel_id = %s
-            """, (interaction.guild_id, self.channel_id))
-
-            land = self.bot.cursor.fetchone()
-
-            if land:
-                self.bot.cursor.execute("""
-                    UPDATE lands
-                    SET owner_id = %s, current_price = %s, last_transaction_date = %s
-                    WHERE guild_id = %s AND channel_id = %s
-                """, (buyer_id, purchase_price, current_time, interaction.guild_id, self.channel_id))
-            else:
-                self.bot.cursor.execute("""
-                    INSERT INTO lands (guild_id, channel_id, owner_id, current_price, purchase_date)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (interaction.guild_id, self.channel_id, buyer_id, purchase_price, current_time))
-
-            self.bot.cursor.execute("""
-                SELECT owner_id, current_price
-                FROM lands 
-                WHERE guild_id = %s AND channel_id = %s
-            """, (interaction.guild_id, self.channel_id))
-            updated_data = self.bot.cursor.fetchone()
-            print(f"Updated data: {updated_data}")
-
-            # 땅 ID 조회
-            self.bot.cursor.execute("""
-                SELECT id FROM lands 
-                WHERE guild_id = %s AND channel_id = %s
-            """, (interaction.guild_id, self.channel_id))
-            land_id = self.bot.cursor.fetchone()[0]
-
-            # 거래 기록 추가 - 소유자가 있는 경우와 없는 경우를 구분
-            if self.owner_id:  # 인수의 경우
-                self.bot.cursor.execute("""
-                    INSERT INTO land_transactions 
-                    (land_id, seller_id, buyer_id, transaction_price, transaction_type)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (land_id, self.owner_id, buyer_id, purchase_price, 'TRANSFER'))
-            else:  # 첫 구매의 경우
-                self.bot.cursor.execute("""
-                    INSERT INTO land_transactions 
-                    (land_id, buyer_id, transaction_price, transaction_type)
-                    VALUES (%s, %s, %s, %s)
-                """, (land_id, buyer_id, purchase_price, 'PURCHASE'))
-
-            self.bot.conn.commit()
-
-            # 성공 메시지
-            channel = interaction.guild.get_channel(self.channel_id)
-            seller = interaction.guild.get_member(self.owner_id) if self.owner_id else None
-
-            if self.owner_id and seller:
-                seller = interaction.guild.get_member(self.owner_id)
-                await interaction.response.send_message(
-                    f"🏆 {interaction.user.mention}님이 {seller.mention}님의 땅 {channel.mention}을(를) "
-                    f"{purchase_price:,}원에 인수했습니다!")
-            elif self.owner_id and not seller:
-                await interaction.response.send_message(
-                    f"🏆 {interaction.user.mention}님이 {channel.mention}을(를) {purchase_price:,}원에 인수했습니다!")
-            else:
-                await interaction.response.send_message(
-                    f"🎉 {interaction.user.mention}님이 {channel.mention}을(를) {purchase_price:,}원에 구매했습니다!")
+        self.bot.venues.set_owner(interaction.guild_id, self.channel_id, buyer_id)
+        self.holdings.transfer(interaction.guild_id, seller_id, buyer_id, old_price or 0, purchase_price)
 
-        except Exception as e:
-            self.bot.conn.rollback()
-            await interaction.response.send_message("거래 처리 중 오류가 발생했습니다.", ephemeral=True)
-            raise e
+        # 성공 메시지
+        # 멘션은 id 만으로 만들 수 있으므로 멤버 캐시를 찾지 않음
+        channel = interaction.guild.get_channel(self.channel_id)
+        if seller_id:
+            await interaction.response.send_message(
+                f"🏆 {interaction.user.mention}님이 <@{seller_id}>님의 땅 {channel.mention}을(를) "
+                f"{purchase_price:,}원에 인수했습니다!")
+        else:
+            await interaction.response.send_message(
+                f"🎉 {interaction.user.mention}님이 {channel.mention}을(를) {purchase_price:,}원에 구매했습니다!")
 
     async def close_callback(self, interaction: discord.Interaction):
         await interaction.response.edit_message(content="메시지가 닫혔습니다.", embed=None, view=None)
 
 
+class HistoryView(View):
+    """/거래내역 을 넘겨 보는 뷰. 페이지마다 마지막 거래의 (시각, id) 를 커서로 써서 다음 페이지를 읽습니다."""
+
+    def __init__(self, history: LandHistory, names, guild_id: int, title: str, page_size: int = 10, **filters):
+        super().__init__(timeout=60)
+        self.history = history
+        self.names = names  # MemberNames
+        self.guild_id = guild_id
+        self.title = title
+        self.page_size = page_size
+        self.filters = filters  # channel_id / user_id
+        self.cursors = [None]  # 각 페이지의 시작 커서 (이전 페이지로 돌아갈 때 사용)
+        self.rows = []
+        self.has_next = False
+        self.message = None
+
+        self.prev_button = Button(label="이전", style=discord.ButtonStyle.primary)
+        self.prev_button.callback = self.prev_callback
+        self.next_button = Button(label="다음", style=discord.ButtonStyle.primary)
+        self.next_button.callback = self.next_callback
+
+    async def load(self):
+        # 한 건 더 읽어서 다음 페이지가 있는지 확인
+        rows = await self.history.page(self.guild_id, before=self.cursors[-1], limit=self.page_size + 1,
+                                       **self.filters)
+        self.has_next = len(rows) > self.page_size
+        self.rows = rows[:self.page_size]
+
+        self.clear_items()
+        if len(self.cursors) > 1:
+            self.add_item(self.prev_button)
+        if self.has_next:
+            self.add_item(self.next_button)
+
+    async def build_embed(self, guild: discord.Guild) -> discord.Embed:
+        # 이 페이지에 나오는 사용자 이름만 조회
+        names = await self.names.resolve(guild, {user_id for row in self.rows for user_id in row[3:5] if user_id})
+        embed = discord.Embed(title=f"{self.title} - {len(self.cursors)} 페이지", color=discord.Color.blue())
+        for created_at, _, channel_id, seller_id, buyer_id, price, transaction_type in self.rows:
+            channel = guild.get_channel(channel_id)
+            buyer_name = names.get(buyer_id, f"Unknown User ({buyer_id})")
+            if transaction_type == 'TRANSFER':
+                seller_name = names.get(seller_id, f"Unknown User ({seller_id})")
+                value = f"{seller_name} → {buyer_name} 인수, {price:,}원"
+            else:
+                value = f"{buyer_name} 구매, {price:,}원"
+            embed.add_field(
+                name=f"{created_at.strftime('%Y-%m-%d %H:%M')} {channel.name if channel else channel_id}",
+                value=value,
+                inline=False
+            )
+        return embed
+
+    async def show(self, interaction: discord.Interaction):
+        await self.load()
+        await interaction.response.edit_message(embed=await self.build_embed(interaction.guild), view=self)
+
+    async def prev_callback(self, interaction: discord.Interaction):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self.show(interaction)
+
+    async def next_callback(self, interaction: discord.Interaction):
+        if self.has_next:
+            created_at, transaction_id = self.rows[-1][:2]
+            self.cursors.append((created_at, transaction_id))
+        await self.show(interaction)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+
 class Land(commands.Cog):
+    command_category = Category.LAND  # 채널 권한 검사에 쓰이는 명령어 분류
+
     def __init__(self, bot):
         self.bot = bot
+        self.holdings = LandHoldings()  # 서버별 소유자의 땅 수/총 가격
+        # 거래 내역 조회와 보관 (LAND_HISTORY_RETENTION_DAYS 일이 지난 내역은 매일 새벽 보관 테이블로 이동)
+        self.history = LandHistory.from_env(bot.db)
+        self.scheduler = AsyncIOScheduler()
+
+    async def cog_load(self):
+        await self.holdings.rebuild(self.bot.db, self.bot.shard_plan)
+        # 내역 보관은 모든 서버 대상이므로 샤드 0 을 맡은 프로세스에서만
+        if self.bot.shard_plan.primary:
+            self.scheduler.add_job(self.archive_history, CronTrigger(hour=4, minute=0))
+        self.scheduler.start()
+
+    async def cog_unload(self):
+        self.scheduler.shutdown(wait=False)
+
+    async def archive_history(self):
+        moved = await self.history.archive()
+        if moved:
+            print(f"땅 거래 내역 보관: {moved:,}건")
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.bot.venues.forget_guild(guild.id)
 
     def _convert_to_datetime(self, timestamp) -> Optional[datetime.datetime]:
         """Convert timestamp to datetime object safely"""
@@ -156,92 +312,72 @@ class Land(commands.Cog):
 
     @app_commands.command(name="땅정보", description="채널의 소유권 정보를 확인합니다.")
     async def land_info(self, interaction: discord.Interaction, channel: Optional[discord.TextChannel] = None):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
-
         target_channel = channel or interaction.channel
 
-        self.bot.cursor.execute("""
-            SELECT l.*, u.money 
-            FROM lands l
-            LEFT JOIN users u ON l.owner_id = u.uuid
-            WHERE l.guild_id = %s AND l.channel_id = %s
+        land_data = await self.bot.db.fetchone("""
+            SELECT owner_id, current_price, purchase_date, last_transaction_date
+            FROM lands
+            WHERE guild_id = %s AND channel_id = %s
         """, (interaction.guild_id, target_channel.id))
 
-        land_data = self.bot.cursor.fetchone()
-
         if not land_data:
             embed = discord.Embed(
                 title=f"🏞️ {target_channel.name} 땅 정보",
                 description="아직 주인이 없는 땅입니다.",
                 color=discord.Color.green()
             )
-            embed.add_field(name="기본 가격", value=f"1,000,000원", inline=False)
+            embed.add_field(name="기본 가격", value=f"{DEFAULT_LAND_PRICE:,}원", inline=False)
 
-            view = LandView(self.bot, target_channel.id, None, 1000000)
+            view = LandView(self.bot, self.holdings, target_channel.id, None, DEFAULT_LAND_PRICE)
             await interaction.response.send_message(embed=embed, view=view)
             return
 
-        owner = interaction.guild.get_member(land_data[3])
+        owner_id, current_price, purchase_date, last_transaction_date = land_data
         embed = discord.Embed(
             title=f"🏞️ {target_channel.name} 땅 정보",
-            description=f"소유자: {owner.mention if owner else '알 수 없음'}",
+            description=f"소유자: <@{owner_id}>" if owner_id else "소유자: 알 수 없음",
             color=discord.Color.blue()
         )
 
-        embed.add_field(name="현재 가격", value=f"{land_data[5]:,}원", inline=True)
-        embed.add_field(name="인수 가격", value=f"{int(land_data[5] * 1.2):,}원", inline=True)
+        embed.add_field(name="현재 가격", value=f"{current_price:,}원", inline=True)
+        embed.add_field(name="인수 가격", value=f"{int(current_price * TAKEOVER_RATE):,}원", inline=True)
 
-        purchase_date = self._convert_to_datetime(land_data[5])
+        purchase_date = self._convert_to_datetime(purchase_date)
         if purchase_date:
             embed.add_field(name="구매일", value=purchase_date.strftime("%Y-%m-%d %H:%M"), inline=False)
 
-        last_transaction_date = self._convert_to_datetime(land_data[6])
+        last_transaction_date = self._convert_to_datetime(last_transaction_date)
         if last_transaction_date:
             embed.add_field(name="마지막 거래일", value=last_transaction_date.strftime("%Y-%m-%d %H:%M"), inline=False)
 
-        view = LandView(self.bot, target_channel.id, land_data[2], land_data[4])
+        view = LandView(self.bot, self.holdings, target_channel.id, owner_id, current_price)
         await interaction.response.send_message(embed=embed, view=view)
 
     @app_commands.command(name="내땅", description="자신이 소유한 땅 목록을 확인합니다.")
     async def my_lands(self, interaction: discord.Interaction):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
+        land_count, total_value = self.holdings.summary(interaction.guild_id, interaction.user.id)
+        if not land_count:
+            await interaction.response.send_message("소유한 땅이 없습니다.")
             return
 
-        self.bot.cursor.execute("""
+        # 임베드 필드는 25개까지이므로 최근에 산 땅부터 MY_LANDS_LIMIT 개만 표시
+        lands = await self.bot.db.fetchall("""
             SELECT channel_id, current_price, purchase_date
             FROM lands
             WHERE guild_id = %s AND owner_id = %s
             ORDER BY purchase_date DESC
-        """, (interaction.guild_id, interaction.user.id))
-
-        lands = self.bot.cursor.fetchall()
-
-        if not lands:
-            await interaction.response.send_message("소유한 땅이 없습니다.")
-            return
+            LIMIT %s
+        """, (interaction.guild_id, interaction.user.id, MY_LANDS_LIMIT))
 
         embed = discord.Embed(
             title=f"🗺️ {interaction.user.name}님의 소유 땅 목록",
-            description=f"총 {len(lands)}개의 땅을 소유중입니다.",
+            description=f"총 {land_count}개의 땅을 소유중입니다.",
             color=discord.Color.blue()
         )
 
-        total_value = 0
         for channel_id, price, purchase_date in lands:
             channel = interaction.guild.get_channel(channel_id)
             if channel:
-                total_value += price
                 purchase_date = self._convert_to_datetime(purchase_date)
                 date_str = purchase_date.strftime('%Y-%m-%d') if purchase_date else '날짜 정보 없음'
                 embed.add_field(
@@ -255,24 +391,7 @@ class Land(commands.Cog):
 
     @app_commands.command(name="땅순위", description="서버 내 땅 보유 순위를 확인합니다.")
     async def land_ranking(self, interaction: discord.Interaction):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
-
-        self.bot.cursor.execute("""
-            SELECT owner_id, COUNT(*) as land_count, SUM(current_price) as total_value
-            FROM lands
-            WHERE guild_id = %s AND owner_id IS NOT NULL
-            GROUP BY owner_id
-            ORDER BY total_value DESC
-            LIMIT 10
-        """, (interaction.guild_id,))
-
-        rankings = self.bot.cursor.fetchall()
+        rankings = self.holdings.top(interaction.guild_id, 10)
 
         if not rankings:
             await interaction.response.send_message("아직 땅을 소유한 사용자가 없습니다.")
@@ -284,17 +403,37 @@ class Land(commands.Cog):
             color=discord.Color.gold()
         )
 
+        names = await self.bot.member_names.resolve(interaction.guild, [owner_id for owner_id, _, _ in rankings])
         for rank, (owner_id, land_count, total_value) in enumerate(rankings, 1):
-            member = interaction.guild.get_member(owner_id)
-            if member:
+            # 서버를 나간 사용자는 건너뜀
+            if owner_id in names:
                 embed.add_field(
-                    name=f"{rank}. {member.name}",
+                    name=f"{rank}. {names[owner_id]}",
                     value=f"보유 땅: {land_count}개\n총 자산: {total_value:,}원",
                     inline=False
                 )
 
         await interaction.response.send_message(embed=embed)
 
+    @app_commands.command(name="거래내역", description="땅 거래 내역을 확인합니다. (채널이나 사용자를 지정하면 해당 내역만)")
+    async def land_history(self, interaction: discord.Interaction, channel: Optional[discord.TextChannel] = None,
+                           user: Optional[discord.Member] = None):
+        if channel is not None:
+            title, filters = f"📜 {channel.name} 거래 내역", {"channel_id": channel.id}
+        elif user is not None:
+            title, filters = f"📜 {user.name}님의 거래 내역", {"user_id": user.id}
+        else:
+            title, filters = "📜 서버 땅 거래 내역", {}
+
+        view = HistoryView(self.history, self.bot.member_names, interaction.guild_id, title, **filters)
+        await view.load()
+        if not view.rows:
+            await interaction.response.send_message("거래 내역이 없습니다.")
+            return
+
+        await interaction.response.send_message(embed=await view.build_embed(interaction.guild), view=view)
+        view.message = await interaction.original_response()
+
 
 async def setup(bot):
     await bot.add_cog(Land(bot))
\ No newline at end of file
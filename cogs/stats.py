@@ -0,0 +1,100 @@
+import os
+
+import discord
+from aiohttp import web
+from discord import app_commands
+from discord.ext import commands
+
+from core.metrics import render_prometheus
+
+
+class Stats(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        # METRICS_PORT 를 지정하면 METRICS_HOST(기본 127.0.0.1) 의 /metrics 로 Prometheus 지표를 노출
+        self.metrics_host = os.getenv("METRICS_HOST", "127.0.0.1")
+        self.metrics_port = os.getenv("METRICS_PORT")
+        self.runner = None
+
+    async def cog_load(self):
+        if self.metrics_port:
+            app = web.Application()
+            app.router.add_get("/metrics", self.handle_metrics)
+            self.runner = web.AppRunner(app, access_log=None)
+            await self.runner.setup()
+            await web.TCPSite(self.runner, self.metrics_host, int(self.metrics_port)).start()
+            print(f"지표 노출: http://{self.metrics_host}:{self.metrics_port}/metrics")
+
+    async def cog_unload(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        self.bot.command_metrics.finished(interaction)
+
+    def gauges(self) -> dict:
+        gauges = {
+            "sjm_known_users": len(self.bot.user_registry),
+            "sjm_guild_members_reconciled": len(self.bot.guild_members.reconciled),
+            "sjm_member_names_cached": len(self.bot.member_names),
+            "sjm_member_name_lookups": self.bot.member_names.lookups,
+        }
+        blackjack = self.bot.get_cog("Blackjack")
+        if blackjack is not None:
+            sessions = blackjack.games.stats()
+            gauges["sjm_blackjack_sessions_active"] = sessions["active"]
+            gauges["sjm_blackjack_sessions_evicted"] = sessions["evicted"]
+        return gauges
+
+    async def handle_metrics(self, request):
+        body = render_prometheus(self.bot.command_metrics, self.bot.db, self.bot.balances, self.gauges())
+        return web.Response(text=body, content_type="text/plain", charset="utf-8")
+
+    @app_commands.command(name="통계", description="관리자 전용 명령어입니다. 명령어별 응답 시간과 DB 통계를 보여줍니다.")
+    async def stats(self, interaction: discord.Interaction):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("이 명령어는 관리자만 사용할 수 있습니다.", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="📊 봇 통계", color=discord.Color.blue())
+
+        # 응답 시간(p95)이 긴 명령어부터
+        commands_by_p95 = sorted(self.bot.command_metrics.commands.items(),
+                                 key=lambda item: item[1].latency.quantile(0.95), reverse=True)
+        for name, stats in commands_by_p95[:15]:
+            embed.add_field(
+                name=f"/{name}",
+                value=f"{stats.latency.count:,}회, 평균 {stats.latency.mean * 1000:.1f}ms, "
+                      f"p95 ≤{stats.latency.quantile(0.95) * 1000:g}ms\n"
+                      f"쿼리 {stats.queries.mean:.1f}회/명령, 오류 {stats.errors:,}회",
+                inline=False
+            )
+
+        db = self.bot.db
+        embed.add_field(
+            name="DB",
+            value=f"쿼리 {db.queries:,}회 (오류 {db.query_errors:,}회)\n"
+                  f"왕복 평균 {db.query_time.mean * 1000:.1f}ms, p95 ≤{db.query_time.quantile(0.95) * 1000:g}ms\n"
+                  f"커넥션 대기 p95 ≤{db.pool_wait.quantile(0.95) * 1000:g}ms",
+            inline=False
+        )
+        embed.add_field(
+            name="잔액 캐시",
+            value=f"적중률 {self.bot.balances.hit_rate * 100:.1f}% ({len(self.bot.balances):,}명)",
+            inline=False
+        )
+        gauges = self.gauges()
+        if "sjm_blackjack_sessions_active" in gauges:
+            embed.add_field(
+                name="블랙잭",
+                value=f"진행 중 {gauges['sjm_blackjack_sessions_active']:,}게임, "
+                      f"자동 정리 {gauges['sjm_blackjack_sessions_evicted']:,}게임",
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(Stats(bot))
@@ -8,24 +8,19 @@ class Users(commands.Cog):
 
     @app_commands.command(name="ping", description="퐁~! 응답 시간을 표시합니다.")
     async def ping(self, interaction: discord.Interaction):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
-        await interaction.response.send_message(f"퐁~! {self.bot.latency * 1000:.2f}ms")
+        # 이 서버를 맡은 샤드의 지연 시간, 프로세스가 샤드를 여러 개 맡고 있으면 샤드별로도 표시
+        shard_id = interaction.guild.shard_id if interaction.guild else 0
+        shard = self.bot.get_shard(shard_id)
+        latency = shard.latency if shard else self.bot.latency
+        message = f"퐁~! {latency * 1000:.2f}ms (샤드 {shard_id})"
+        if len(self.bot.latencies) > 1:
+            message += "\n" + "\n".join(f"샤드 {sid}: {seconds * 1000:.2f}ms" for sid, seconds in self.bot.latencies)
+        # DB 왕복 시간 (커넥션 대기 포함)
+        message += f"\nDB: {await self.bot.db.ping() * 1000:.2f}ms"
+        await interaction.response.send_message(message)
 
     @app_commands.command(name="hello", description="봇이 'Hello!'를 출력합니다.")
     async def hello(self, interaction: discord.Interaction):
-        settings_cog = self.bot.get_cog('GuildSettings')
-        if not settings_cog:
-            return
-
-        if not await settings_cog.check_command_permission(interaction):
-            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
-            return
         await interaction.response.send_message("Hello!", ephemeral=False)
 
 async def setup(bot):
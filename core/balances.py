@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+
+class BalanceCache:
+    """사용자 잔액 캐시 (크기 / TTL 제한이 있는 LRU)
+
+    잔액을 바꾸는 모든 경로는 갱신된 잔액을 set() 으로 바로 써 넣습니다(write-through).
+    잔액 확인 후 배팅하는 명령어는 locked() 로 같은 사용자의 명령어를 직렬화합니다.
+    캐시와 잠금은 프로세스마다 따로 있으므로 샤드를 여러 프로세스로 나누면 다른 프로세스의 변경은 TTL 동안 보이지 않습니다.
+    그래서 캐시 값은 표시와 빠른 거절에만 쓰고, 차감은 항상 SQL 에서 잔액을 확인하는 조건부 UPDATE 로 합니다.
+    """
+
+    def __init__(self, db, *, maxsize: int = 10000, ttl: float = 300.0):
+        self.db = db
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()  # user_id -> (balance, 만료 시각)
+        self._locks = {}  # user_id -> [Lock, 대기 중인 수]
+        self._listeners = []  # 새 잔액을 알게 될 때마다 호출되는 callback(user_id, balance)
+
+    @classmethod
+    def from_env(cls, db):
+        return cls(
+            db,
+            maxsize=int(os.getenv("BALANCE_CACHE_SIZE", 10000)),
+            ttl=float(os.getenv("BALANCE_CACHE_TTL", 300)),
+        )
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _lookup(self, user_id: int):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def __contains__(self, user_id: int) -> bool:
+        return self._lookup(user_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, user_id: int, fresh: bool = False) -> Optional[int]:
+        """잔액 조회. 사용자가 DB에 없으면 None (fresh 면 캐시를 건너뛰고 DB에서 읽음)"""
+        entry = None if fresh else self._lookup(user_id)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        balance = await self.db.fetchval("SELECT money FROM users WHERE uuid = %s", (user_id,))
+        if balance is None:
+            return None
+        # 조회하는 사이 write-through 된 값이 있으면 그 값이 더 최신이다
+        if not fresh and user_id in self._entries:
+            return self._entries[user_id][0]
+        self._store(user_id, balance)
+        return balance
+
+    def set(self, user_id: int, balance: int):
+        self._store(user_id, balance)
+
+    def publish(self, user_id: int, balance: int):
+        """대량 갱신용. 캐시에 있는 사용자만 값을 바꾸고(캐시를 밀어내지 않음) 리스너에는 항상 알림"""
+        if user_id in self._entries:
+            self._store(user_id, balance)
+            return
+        for callback in self._listeners:
+            callback(user_id, balance)
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _store(self, user_id: int, balance: int):
+        self._entries[user_id] = (balance, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        for callback in self._listeners:
+            callback(user_id, balance)
+
+    @asynccontextmanager
+    async def locked(self, user_id: int):
+        """같은 사용자의 잔액 확인~정산 구간을 직렬화"""
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[user_id]
@@ -0,0 +1,142 @@
+import random
+from array import array
+from dataclasses import dataclass
+
+# 카드는 0~51 정수 하나로 표현합니다. (무늬 = card // 13, 숫자 = card % 13 + 1)
+SUITS = ('♥', '♦', '♣', '♠')
+RANKS = ('A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K')
+DECK_SIZE = 52
+
+# 매번 계산하지 않도록 카드별 표시 문자열과 점수를 미리 만들어 둠 (A = 1점, J/Q/K = 10점)
+CARD_GLYPHS = tuple(f"{suit}{rank}" for suit in SUITS for rank in RANKS)
+CARD_POINTS = bytes(min(rank, 10) for _ in SUITS for rank in range(1, 14))
+
+
+def card_str(card):
+    return CARD_GLYPHS[card]
+
+
+class Hand:
+    """카드를 받을 때마다 합계를 갱신하는 패 (A는 11점으로 쓸 수 있으면 soft)"""
+    __slots__ = ('cards', 'hard', 'aces')
+
+    def __init__(self, cards=()):
+        self.cards = bytearray()
+        self.hard = 0  # A를 모두 1점으로 센 합계
+        self.aces = 0
+        for card in cards:
+            self.add(card)
+
+    def add(self, card):
+        self.cards.append(card)
+        points = CARD_POINTS[card]
+        self.hard += points
+        if points == 1:
+            self.aces += 1
+        return self.total
+
+    @property
+    def soft(self):
+        # A 한 장을 11점으로 세도 21을 넘지 않는 경우
+        return self.aces > 0 and self.hard + 10 <= 21
+
+    @property
+    def total(self):
+        return self.hard + 10 if self.soft else self.hard
+
+    @property
+    def busted(self):
+        return self.hard > 21
+
+    def is_blackjack(self):
+        # 카드가 정확히 2장이고, 합이 21인 경우만 블랙잭으로 인정
+        return len(self.cards) == 2 and self.total == 21
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __getitem__(self, index):
+        return self.cards[index]
+
+    def __str__(self):
+        return " ".join(CARD_GLYPHS[card] for card in self.cards)
+
+
+@dataclass(frozen=True)
+class BlackjackRules:
+    """배당과 딜러 규칙 (봇과 시뮬레이터가 같은 규칙을 씀)"""
+    blackjack_payout: float = 1.5  # 플레이어 블랙잭 수익 (원금 포함 2.5배)
+    dealer_blackjack_loss: float = 1.5  # 딜러 블랙잭에 졌을 때 손실
+    dealer_stands_on: int = 17
+    dealer_hits_soft_17: bool = False  # True 면 soft 17 에서도 한 장 더 받음
+
+    def dealer_hits(self, hand) -> bool:
+        total = hand.total
+        if total < self.dealer_stands_on:
+            return True
+        return self.dealer_hits_soft_17 and total == self.dealer_stands_on and hand.soft
+
+    def judge(self, player, dealer, busted: bool = False):
+        """(결과, 배팅 금액 대비 손익 배수)"""
+        if busted:
+            return "패배", -1
+        player_blackjack = player.is_blackjack()
+        dealer_blackjack = dealer.is_blackjack()
+        if player_blackjack:
+            if dealer_blackjack:
+                return "무승부 (블랙잭)", 0
+            return "블랙잭!", self.blackjack_payout
+        if dealer_blackjack:
+            return "패배 (딜러 블랙잭)", -self.dealer_blackjack_loss
+        if dealer.total > 21:
+            return "승리", 1
+        if player.total > dealer.total:
+            return "승리", 1
+        if player.total < dealer.total:
+            return "패배", -1
+        return "무승부", 0
+
+
+class Shoe:
+    """여러 덱을 섞어 쓰는 카드 슈
+
+    게임마다 덱을 새로 만들지 않고, 컷 카드(penetration) 위치까지 뽑히면 다음 게임 전에 다시 섞습니다.
+    rng 에 시드를 준 random.Random 을 넘기면 같은 순서가 재현됩니다.
+    """
+    __slots__ = ('decks', 'cut', 'rng', '_cards', '_pos')
+
+    def __init__(self, decks: int = 6, penetration: float = 0.75, rng: random.Random = None):
+        if decks < 1:
+            raise ValueError("덱 수는 1 이상이어야 합니다.")
+        if not 0 < penetration <= 1:
+            raise ValueError("penetration은 0보다 크고 1 이하여야 합니다.")
+        self.decks = decks
+        self.rng = rng or random.Random()
+        self._cards = array('B', range(DECK_SIZE)) * decks
+        self.cut = int(len(self._cards) * penetration)
+        self.shuffle()
+
+    def shuffle(self):
+        self.rng.shuffle(self._cards)
+        self._pos = 0
+
+    @property
+    def remaining(self):
+        return len(self._cards) - self._pos
+
+    @property
+    def needs_shuffle(self):
+        return self._pos >= self.cut
+
+    def prepare(self):
+        """새 게임을 시작하기 전에 호출: 컷 카드를 지났으면 섞음"""
+        if self.needs_shuffle:
+            self.shuffle()
+
+    def draw(self):
+        # 게임 도중 슈가 바닥나면 그 자리에서 다시 섞음
+        if self._pos >= len(self._cards):
+            self.shuffle()
+        card = self._cards[self._pos]
+        self._pos += 1
+        return card
@@ -0,0 +1,37 @@
+import hashlib
+import json
+
+
+def tree_hash(tree, guild=None) -> str:
+    """명령어 트리(이름/설명/옵션 등 Discord 에 보내는 내용)의 해시. 순서와 무관하게 같은 트리면 같은 값"""
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+                     key=lambda command: (command.get("type", 1), command["name"]))
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CommandSync:
+    """명령어 트리가 마지막으로 동기화한 것과 달라졌을 때만 Discord 에 동기화
+
+    마지막으로 동기화한 트리의 해시는 command_sync 테이블에 (애플리케이션, 범위) 별로 저장합니다.
+    """
+
+    def __init__(self, db, tree):
+        self.db = db
+        self.tree = tree
+
+    async def sync(self, application_id: int, guild=None, *, force: bool = False) -> bool:
+        """필요할 때만 동기화하고, 실제로 동기화했는지 반환"""
+        scope = f"{application_id}:{guild.id if guild else 'global'}"
+        digest = tree_hash(self.tree, guild)
+        if not force:
+            synced = await self.db.fetchval("SELECT hash FROM command_sync WHERE scope = %s", (scope,))
+            if synced == digest:
+                return False
+
+        await self.tree.sync(guild=guild)
+        await self.db.execute("""
+            INSERT INTO command_sync (scope, hash, synced_at) VALUES (%s, %s, NOW())
+            ON CONFLICT (scope) DO UPDATE SET hash = EXCLUDED.hash, synced_at = EXCLUDED.synced_at
+        """, (scope, digest))
+        return True
@@ -0,0 +1,236 @@
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import psycopg2
+from psycopg2 import errors, pool
+from psycopg2.extras import execute_values
+
+from core.metrics import Histogram, command_queries
+
+# 커넥션이 끊겼다고 판단하는 예외들
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+# 트랜잭션을 처음부터 다시 실행하면 성공할 수 있는 예외들 (교착 상태, 직렬화 실패)
+RETRYABLE_ERRORS = (errors.DeadlockDetected, errors.SerializationFailure)
+
+
+class Transaction:
+    """커넥션 하나를 점유하는 트랜잭션. 모든 쿼리는 풀 전용 스레드에서 실행됩니다."""
+
+    def __init__(self, db, conn):
+        self._db = db
+        self._conn = conn
+        self._cursor = conn.cursor()
+
+    def _execute(self, query, params, fetch):
+        self._cursor.execute(query, params)
+        if fetch == "one":
+            return self._cursor.fetchone()
+        if fetch == "all":
+            return self._cursor.fetchall()
+        return self._cursor.rowcount
+
+    def _execute_values(self, query, rows, template, fetch):
+        return execute_values(self._cursor, query, rows, template=template, fetch=fetch)
+
+    async def _query(self, func, *args):
+        # 쿼리 수 / 왕복 시간 / 오류 수 기록 (실행 중인 명령어가 있으면 그 명령어의 쿼리 수도 올림)
+        db = self._db
+        db.queries += 1
+        counter = command_queries.get()
+        if counter is not None:
+            counter[0] += 1
+        start = time.perf_counter()
+        try:
+            return await db._run(func, *args)
+        except Exception:
+            db.query_errors += 1
+            raise
+        finally:
+            db.query_time.observe(time.perf_counter() - start)
+
+    async def execute(self, query, params=None) -> int:
+        """쿼리를 실행하고 영향받은 행 수를 반환"""
+        return await self._query(self._execute, query, params, None)
+
+    async def fetchone(self, query, params=None):
+        return await self._query(self._execute, query, params, "one")
+
+    async def fetchall(self, query, params=None):
+        return await self._query(self._execute, query, params, "all")
+
+    async def fetchval(self, query, params=None):
+        row = await self.fetchone(query, params)
+        return row[0] if row else None
+
+    async def execute_values(self, query, rows, template=None, fetch=False):
+        """여러 행을 한 번의 왕복으로 처리 (VALUES %s)"""
+        return await self._query(self._execute_values, query, rows, template, fetch)
+
+
+class Database:
+    """psycopg2 커넥션 풀을 asyncio 에서 쓸 수 있도록 감싼 클래스
+
+    쿼리는 풀 크기만큼의 전용 스레드에서 실행되므로 이벤트 루프를 막지 않고,
+    세마포어로 동시에 빌려 갈 수 있는 커넥션 수를 풀 크기로 제한합니다.
+    """
+
+    def __init__(self, *, minsize: int = 1, maxsize: int = 10, health_check_interval: float = 30.0,
+                 connect_retries: int = 5, **dsn):
+        if minsize > maxsize:
+            raise ValueError("minsize는 maxsize보다 클 수 없습니다.")
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.health_check_interval = health_check_interval
+        self.connect_retries = connect_retries
+        self.dsn = dsn
+
+        self._pool = None
+        self._executor = None
+        self._semaphore = None
+        self._last_used = {}
+        # 통계 (헬스 체크 제외)
+        self.queries = 0
+        self.query_errors = 0
+        self.query_time = Histogram()  # 쿼리 왕복 시간
+        self.pool_wait = Histogram()  # 커넥션을 빌리기까지 기다린 시간
+
+    @classmethod
+    def from_env(cls, share: float = 1.0):
+        """share 는 이 프로세스가 맡은 서버의 비율. 샤드를 여러 프로세스로 나누면 DB_POOL_MAX 를 그 비율만큼 나눠 가짐"""
+        minsize = int(os.getenv("DB_POOL_MIN", 1))
+        return cls(
+            minsize=minsize,
+            maxsize=max(minsize, math.ceil(int(os.getenv("DB_POOL_MAX", 10)) * share)),
+            dbname=os.getenv("DB_NAME"),
+            user=os.getenv("DB_USER"),
+            password=os.getenv("DB_PASSWORD"),
+            host=os.getenv("DB_HOST"),
+        )
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def open(self):
+        if self._pool is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.maxsize, thread_name_prefix="db")
+        self._semaphore = asyncio.Semaphore(self.maxsize)
+
+        # DB가 아직 뜨지 않았을 수 있으므로 지수 백오프로 재시도
+        delay = 1
+        for attempt in range(1, self.connect_retries + 1):
+            try:
+                self._pool = await self._run(
+                    lambda: pool.ThreadedConnectionPool(self.minsize, self.maxsize, **self.dsn))
+                return
+            except CONNECTION_ERRORS:
+                if attempt == self.connect_retries:
+                    raise
+                print(f"DB 연결 실패, {delay}초 후 재시도합니다. ({attempt}/{self.connect_retries})")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    async def close(self):
+        if self._pool is None:
+            return
+        await self._run(self._pool.closeall)
+        self._pool = None
+        self._executor.shutdown(wait=False)
+        self._last_used.clear()
+
+    @property
+    def closed(self) -> bool:
+        return self._pool is None
+
+    def _check(self, conn) -> bool:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except CONNECTION_ERRORS:
+            return False
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+    async def _getconn(self):
+        # 끊긴 커넥션은 버리고 새로 연결 (풀이 부족한 만큼 새 커넥션을 만듦)
+        for _ in range(self.maxsize + 1):
+            conn = await self._run(self._pool.getconn)
+            if conn.closed:
+                self._discard(conn)
+                continue
+            idle = time.monotonic() - self._last_used.get(id(conn), 0)
+            if idle >= self.health_check_interval and not await self._run(self._check, conn):
+                self._discard(conn)
+                continue
+            return conn
+        raise psycopg2.OperationalError("사용 가능한 DB 커넥션을 확보하지 못했습니다.")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """풀에서 커넥션을 빌려 오고, 블록이 끝나면 반납"""
+        if self._pool is None:
+            raise RuntimeError("Database.open()이 호출되지 않았습니다.")
+        start = time.perf_counter()
+        async with self._semaphore:
+            conn = await self._getconn()
+            self.pool_wait.observe(time.perf_counter() - start)
+            try:
+                yield conn
+            finally:
+                if conn.closed:
+                    self._discard(conn)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+                    self._pool.putconn(conn)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """명령어 단위 트랜잭션. 정상 종료 시 커밋, 예외 발생 시 롤백"""
+        async with self.acquire() as conn:
+            tx = Transaction(self, conn)
+            try:
+                yield tx
+            except BaseException:
+                if not conn.closed:
+                    try:
+                        await self._run(conn.rollback)
+                    except CONNECTION_ERRORS:
+                        pass
+                raise
+            else:
+                await self._run(conn.commit)
+            finally:
+                if not conn.closed:
+                    tx._cursor.close()
+
+    # 단일 쿼리용 단축 메서드 (각각 별도의 트랜잭션으로 실행)
+    async def execute(self, query, params=None) -> int:
+        async with self.transaction() as tx:
+            return await tx.execute(query, params)
+
+    async def fetchone(self, query, params=None):
+        async with self.transaction() as tx:
+            return await tx.fetchone(query, params)
+
+    async def fetchall(self, query, params=None):
+        async with self.transaction() as tx:
+            return await tx.fetchall(query, params)
+
+    async def fetchval(self, query, params=None):
+        async with self.transaction() as tx:
+            return await tx.fetchval(query, params)
+
+    async def ping(self) -> float:
+        """/ping 에 표시하는 DB 왕복 시간(초, 커넥션을 빌리는 시간 포함)"""
+        start = time.perf_counter()
+        await self.fetchval("SELECT 1")
+        return time.perf_counter() - start
@@ -0,0 +1,71 @@
+import random
+from typing import List, Optional
+
+DICE_FACES = (1, 2, 3, 4, 5, 6)
+WIN_PAYOUT = 0.75  # 승리 시 배팅 금액 대비 추가 수익 (1.75배 지급)
+
+
+def roll(rounds: int, rng=random) -> List[int]:
+    """rounds 번의 주사위 눈을 한 번에 뽑음"""
+    return rng.choices(DICE_FACES, k=rounds)
+
+
+def winnings_for(amount: int) -> int:
+    """승리 시 추가 수익 (수수료 전)"""
+    return int(amount * WIN_PAYOUT)
+
+
+class DiceRun:
+    """/홀짝 여러 판의 결과
+
+    매 판 같은 금액을 걸고, 잔액이 부족해지거나 손절/익절 기준에 닿으면 남은 판은 하지 않습니다.
+    """
+    __slots__ = ("rolls", "wins", "losses", "net", "longest_win", "longest_loss", "stopped", "required")
+
+    def __init__(self):
+        self.rolls: List[int] = []  # 실제로 진행한 판의 주사위 눈
+        self.wins = 0
+        self.losses = 0
+        self.net = 0  # 수수료를 뺀 총 손익
+        self.longest_win = 0
+        self.longest_loss = 0
+        self.stopped: Optional[str] = None  # 중간에 멈춘 이유 (balance / stop_loss / take_profit)
+        self.required = 0  # 이 결과대로 진행하려면 시작할 때 있어야 하는 최소 잔액 (정산 시 DB에서 확인)
+
+    @property
+    def played(self) -> int:
+        return len(self.rolls)
+
+
+def play_rounds(rolls: List[int], odd: bool, amount: int, win_delta: int, balance: int,
+                stop_loss: Optional[int] = None, take_profit: Optional[int] = None) -> DiceRun:
+    """미리 뽑은 주사위 눈으로 판을 진행. win_delta 는 한 판 이겼을 때의 손익 (수수료 제외)"""
+    run = DiceRun()
+    streak = 0  # 양수면 연승, 음수면 연패
+    for index, dice in enumerate(rolls):
+        if balance + run.net < amount:
+            run.stopped = "balance"
+            break
+        run.rolls.append(dice)
+        # 매 판 시작할 때 배팅 금액만큼은 있어야 함
+        run.required = max(run.required, amount - run.net)
+        if (dice % 2 == 1) == odd:
+            run.wins += 1
+            run.net += win_delta
+            streak = streak + 1 if streak > 0 else 1
+            run.longest_win = max(run.longest_win, streak)
+        else:
+            run.losses += 1
+            run.net -= amount
+            streak = streak - 1 if streak < 0 else -1
+            run.longest_loss = max(run.longest_loss, -streak)
+
+        if index + 1 == len(rolls):
+            break
+        if stop_loss is not None and -run.net >= stop_loss:
+            run.stopped = "stop_loss"
+            break
+        if take_profit is not None and run.net >= take_profit:
+            run.stopped = "take_profit"
+            break
+    return run
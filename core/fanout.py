@@ -0,0 +1,85 @@
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Iterable, List, Tuple
+
+
+@dataclass
+class FanoutReport:
+    """대량 전송 결과"""
+    total: int = 0
+    sent: int = 0
+    failed: List[Tuple[object, BaseException]] = field(default_factory=list)
+    elapsed: float = 0.0  # 시작부터 마지막 전송이 끝날 때까지 걸린 시간(초)
+
+    def summary(self) -> str:
+        return f"{self.sent}/{self.total}건 전송, 실패 {len(self.failed)}건, 마지막 전송까지 {self.elapsed:.2f}초"
+
+
+class RateLimiter:
+    """초당 rate 번까지 허용하는 토큰 버킷"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class FanoutDispatcher:
+    """여러 채널로 보내는 메시지를 동시성 제한과 전송 속도 제한을 지키며 병렬로 보냄
+
+    Discord 의 채널별 rate limit 버킷은 discord.py 가 처리하므로, 여기서는 전체(global)
+    한도를 넘지 않도록 초당 전송 수를 제한하고 동시에 진행되는 요청 수를 묶어 둡니다.
+    """
+
+    def __init__(self, *, concurrency: int = 10, rate: float = 40.0, jitter: float = 0.0):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.jitter = jitter
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            concurrency=int(os.getenv("NOTIFY_CONCURRENCY", 10)),
+            rate=float(os.getenv("NOTIFY_RATE", 40)),
+            jitter=float(os.getenv("NOTIFY_JITTER", 0)),
+        )
+
+    async def run(self, jobs: Iterable[Tuple[object, Callable[[], Awaitable]]]) -> FanoutReport:
+        """jobs 는 (식별자, 전송 함수) 목록. 실패한 작업은 식별자와 예외를 보고서에 남김"""
+        jobs = list(jobs)
+        report = FanoutReport(total=len(jobs))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = RateLimiter(self.rate, burst=self.concurrency)
+        start = time.monotonic()
+
+        async def deliver(key, send):
+            if self.jitter:
+                await asyncio.sleep(random.uniform(0, self.jitter))
+            async with semaphore:
+                await limiter.acquire()
+                try:
+                    await send()
+                except Exception as e:
+                    report.failed.append((key, e))
+                else:
+                    report.sent += 1
+                report.elapsed = time.monotonic() - start
+
+        await asyncio.gather(*(deliver(key, send) for key, send in jobs))
+        return report
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.permissions import PermissionTable
+
+
+@dataclass(frozen=True)
+class GuildConfig:
+    """서버별 설정"""
+    guild_id: int
+    notification_channel_id: Optional[int] = None
+    notification_role_id: Optional[int] = None
+    permissions: PermissionTable = field(default_factory=PermissionTable)
+
+
+class GuildConfigCache:
+    """서버 설정 캐시. 처음 필요할 때 읽고, TTL 이 지나거나 설정이 바뀌면 다시 읽습니다."""
+
+    def __init__(self, db, *, ttl: float = 600.0):
+        self.db = db
+        self.ttl = ttl
+        self._entries = {}  # guild_id -> (GuildConfig, 만료 시각)
+        self._loading = {}  # guild_id -> 읽는 중인 Task (동시에 여러 번 읽지 않도록)
+
+    @classmethod
+    def from_env(cls, db):
+        return cls(db, ttl=float(os.getenv("GUILD_SETTINGS_TTL", 600)))
+
+    def peek(self, guild_id: int) -> Optional[GuildConfig]:
+        """DB를 읽지 않고 캐시에 있는 설정만 반환"""
+        entry = self._entries.get(guild_id)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    async def get(self, guild_id: int) -> GuildConfig:
+        config = self.peek(guild_id)
+        if config is not None:
+            return config
+
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = self._loading[guild_id] = asyncio.ensure_future(self._load(guild_id))
+            task.add_done_callback(lambda done: self._loading.pop(guild_id, None)
+                                   if self._loading.get(guild_id) is done else None)
+        return await asyncio.shield(task)
+
+    async def _load(self, guild_id: int) -> GuildConfig:
+        async with self.db.transaction() as tx:
+            row = await tx.fetchone("""
+                SELECT notification_channel_id, notification_role_id
+                FROM guild_settings
+                WHERE guild_id = %s
+            """, (guild_id,))
+            rules = await tx.fetchall("""
+                SELECT channel_id, allow_mask, deny_mask
+                FROM command_permissions
+                WHERE guild_id = %s
+            """, (guild_id,))
+
+        config = GuildConfig(
+            guild_id,
+            *(row or (None, None)),
+            permissions=PermissionTable({channel_id: (allow, deny) for channel_id, allow, deny in rules}),
+        )
+        # 읽는 동안 invalidate 되었다면 오래된 값이므로 캐시에 넣지 않음
+        if self._loading.get(guild_id) is asyncio.current_task():
+            self.put(config)
+        return config
+
+    async def load_all(self, guild_ids):
+        """여러 서버의 설정을 쿼리 두 번으로 한꺼번에 읽어서 캐시를 채움"""
+        guild_ids = list(guild_ids)
+        async with self.db.transaction() as tx:
+            settings = await tx.fetchall("""
+                SELECT guild_id, notification_channel_id, notification_role_id
+                FROM guild_settings
+                WHERE guild_id = ANY(%s)
+            """, (guild_ids,))
+            rules = await tx.fetchall("""
+                SELECT guild_id, channel_id, allow_mask, deny_mask
+                FROM command_permissions
+                WHERE guild_id = ANY(%s)
+            """, (guild_ids,))
+
+        settings = {guild_id: (channel_id, role_id) for guild_id, channel_id, role_id in settings}
+        rules_by_guild = {}
+        for guild_id, channel_id, allow, deny in rules:
+            rules_by_guild.setdefault(guild_id, {})[channel_id] = (allow, deny)
+
+        configs = []
+        for guild_id in guild_ids:
+            config = GuildConfig(
+                guild_id,
+                *settings.get(guild_id, (None, None)),
+                permissions=PermissionTable(rules_by_guild.get(guild_id)),
+            )
+            if guild_id not in self._loading:
+                self.put(config)
+            configs.append(config)
+        return configs
+
+    def put(self, config: GuildConfig):
+        self._entries[config.guild_id] = (config, time.monotonic() + self.ttl)
+
+    def invalidate(self, guild_id: int):
+        self._entries.pop(guild_id, None)
+        self._loading.pop(guild_id, None)
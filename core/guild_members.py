@@ -0,0 +1,80 @@
+from typing import Iterable, List, Set
+
+from core.members import guild_member_ids
+
+
+class GuildMembers:
+    """guild_members 테이블 (서버별 멤버 목록)
+
+    입장/퇴장 이벤트마다 한 행씩 반영하고, 봇이 꺼져 있던 동안의 변경은 시작할 때 reconcile 로 맞춥니다.
+    reconcile 은 Discord 의 현재 멤버 목록을 임시 테이블에 올린 뒤 달라진 행만 추가/삭제합니다.
+    MEMBER_CACHE=lean 에서는 멤버 목록을 HTTP 로 받아야 하므로, 시작할 때는 멤버 수가 DB와 다른 서버만 맞추고
+    (멤버 수는 같은데 입장/퇴장이 엇갈린 경우는) 주기적인 reconcile_all(force=True) 로 맞춥니다.
+    """
+
+    def __init__(self, db, *, batch: int = 5000):
+        self.db = db
+        self.batch = batch
+        self.reconciled: Set[int] = set()  # 이번 실행에서 맞춘 서버
+
+    async def add(self, guild_id: int, user_id: int):
+        await self.db.execute("""
+            INSERT INTO guild_members (guild_id, user_id) VALUES (%s, %s)
+            ON CONFLICT DO NOTHING
+        """, (guild_id, user_id))
+
+    async def remove(self, guild_id: int, user_id: int):
+        await self.db.execute("DELETE FROM guild_members WHERE guild_id = %s AND user_id = %s", (guild_id, user_id))
+
+    async def remove_guild(self, guild_id: int):
+        self.reconciled.discard(guild_id)
+        await self.db.execute("DELETE FROM guild_members WHERE guild_id = %s", (guild_id,))
+
+    async def reconcile(self, guild) -> tuple:
+        """DB의 멤버 목록을 Discord 와 맞추고 (추가한 수, 삭제한 수) 를 반환"""
+        member_ids = await guild_member_ids(guild)
+        async with self.db.transaction() as tx:
+            await tx.execute("CREATE TEMP TABLE current_members (user_id BIGINT PRIMARY KEY) ON COMMIT DROP")
+            for start in range(0, len(member_ids), self.batch):
+                await tx.execute_values("INSERT INTO current_members (user_id) VALUES %s ON CONFLICT DO NOTHING",
+                                        [(user_id,) for user_id in member_ids[start:start + self.batch]])
+            added = await tx.execute("""
+                INSERT INTO guild_members (guild_id, user_id)
+                SELECT %s, user_id FROM current_members
+                ON CONFLICT DO NOTHING
+            """, (guild.id,))
+            removed = await tx.execute("""
+                DELETE FROM guild_members m
+                WHERE m.guild_id = %s
+                  AND NOT EXISTS (SELECT 1 FROM current_members c WHERE c.user_id = m.user_id)
+            """, (guild.id,))
+        self.reconciled.add(guild.id)
+        return added, removed
+
+    async def stale(self, guilds: Iterable) -> List:
+        """reconcile 이 필요한 서버: 멤버 목록을 캐시하고 있어 싸게 맞출 수 있거나, 멤버 수가 DB와 다른 서버"""
+        guilds = list(guilds)
+        if not guilds:
+            return []
+        counts = dict(await self.db.fetchall("""
+            SELECT guild_id, COUNT(*) FROM guild_members
+            WHERE guild_id = ANY(%s)
+            GROUP BY guild_id
+        """, ([guild.id for guild in guilds],)))
+        return [guild for guild in guilds
+                if guild.chunked or guild.member_count is None or counts.get(guild.id, 0) != guild.member_count]
+
+    async def reconcile_all(self, guilds: Iterable, force: bool = False) -> tuple:
+        """서버를 하나씩 맞추고 (맞춘 서버 수, 추가한 수, 삭제한 수) 를 반환
+
+        force 가 아니면 stale() 인 서버만 맞추고, 나머지는 입장/퇴장 이벤트로 충분하다고 보고 맞춘 것으로 기록합니다.
+        """
+        guilds = list(guilds)
+        targets = guilds if force else await self.stale(guilds)
+        self.reconciled.update(guild.id for guild in guilds)
+        total_added = total_removed = 0
+        for guild in targets:
+            added, removed = await self.reconcile(guild)
+            total_added += added
+            total_removed += removed
+        return len(targets), total_added, total_removed
@@ -0,0 +1,186 @@
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _Node:
+    __slots__ = ("key", "priority", "size", "left", "right")
+
+    def __init__(self, key):
+        self.key = key
+        self.priority = random.random()
+        self.size = 1
+        self.left = None
+        self.right = None
+
+
+def _size(node) -> int:
+    return node.size if node else 0
+
+
+def _update(node):
+    node.size = 1 + _size(node.left) + _size(node.right)
+
+
+def _split(node, key):
+    """node 를 (key 미만, key 이상) 두 트리로 나눔"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        _update(node)
+        return node, right
+    left, right = _split(node.left, key)
+    node.left = right
+    _update(node)
+    return left, node
+
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _delete(node, key):
+    if node is None:
+        return None
+    if key == node.key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    else:
+        node.right = _delete(node.right, key)
+    _update(node)
+    return node
+
+
+class RankTree:
+    """순위 조회용 order-statistic 트리 (treap)
+
+    삽입/삭제/k번째 원소 조회가 모두 O(log n) 입니다.
+    """
+
+    def __init__(self, keys: Iterable = ()):
+        self._root = None
+        for key in sorted(keys):
+            # 정렬된 순서로 넣으면 항상 오른쪽 끝에 붙으므로 split 이 필요 없음
+            self._root = _merge(self._root, _Node(key))
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def insert(self, key):
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _Node(key)), right)
+
+    def remove(self, key):
+        self._root = _delete(self._root, key)
+
+    def slice(self, start: int, stop: int) -> list:
+        """정렬 순서 기준 [start, stop) 구간의 원소"""
+        result = []
+        stack, node, index = [], self._root, start
+        # index 번째 원소까지 내려가면서 이후에 방문할 조상들을 스택에 쌓음
+        while node is not None:
+            left_size = _size(node.left)
+            if index < left_size:
+                stack.append(node)
+                node = node.left
+            elif index == left_size:
+                stack.append(node)
+                break
+            else:
+                index -= left_size + 1
+                node = node.right
+        while stack and len(result) < stop - start:
+            node = stack.pop()
+            result.append(node.key)
+            node = node.right
+            while node is not None:
+                stack.append(node)
+                node = node.left
+        return result
+
+
+class _GuildHoldings:
+    __slots__ = ("owners", "tree")
+
+    def __init__(self):
+        self.owners: Dict[int, Tuple[int, int]] = {}  # owner_id -> (땅 수, 총 가격)
+        self.tree = RankTree()  # (-총 가격, owner_id)
+
+
+class LandHoldings:
+    """서버별 땅 보유 현황 (소유자별 땅 수와 총 가격)
+
+    시작할 때 DB에서 한 번 모으고, 이후에는 땅 구매/인수 때 transfer 로 갱신합니다.
+    /땅순위 는 상위 k명만, /내땅 요약은 한 사람만 읽습니다.
+    """
+
+    def __init__(self):
+        self._guilds: Dict[int, _GuildHoldings] = {}
+
+    async def rebuild(self, db, shard_plan=None):
+        """shard_plan 을 주면 그 프로세스가 맡은 서버의 땅만 모음"""
+        condition, params = shard_plan.guild_filter() if shard_plan else ("TRUE", {})
+        rows = await db.fetchall(f"""
+            SELECT guild_id, owner_id, COUNT(*), SUM(current_price)
+            FROM lands
+            WHERE owner_id IS NOT NULL AND {condition}
+            GROUP BY guild_id, owner_id
+        """, params)
+        guilds: Dict[int, _GuildHoldings] = {}
+        for guild_id, owner_id, count, total in rows:
+            holdings = guilds.get(guild_id)
+            if holdings is None:
+                holdings = guilds[guild_id] = _GuildHoldings()
+            holdings.owners[owner_id] = (count, int(total))
+        for holdings in guilds.values():
+            holdings.tree = RankTree((-total, owner_id) for owner_id, (_, total) in holdings.owners.items())
+        self._guilds = guilds
+
+    def _adjust(self, guild_id: int, owner_id: int, count: int, value: int):
+        holdings = self._guilds.get(guild_id)
+        if holdings is None:
+            holdings = self._guilds[guild_id] = _GuildHoldings()
+
+        old_count, old_total = holdings.owners.get(owner_id, (0, 0))
+        if old_count:
+            holdings.tree.remove((-old_total, owner_id))
+
+        new_count, new_total = old_count + count, old_total + value
+        if new_count > 0:
+            holdings.owners[owner_id] = (new_count, new_total)
+            holdings.tree.insert((-new_total, owner_id))
+        else:
+            holdings.owners.pop(owner_id, None)
+
+    def transfer(self, guild_id: int, seller_id: Optional[int], buyer_id: int, old_price: int, new_price: int):
+        """땅 한 개가 seller 에서 buyer 로 넘어감 (주인 없는 땅이면 seller_id 는 None)"""
+        if seller_id is not None:
+            self._adjust(guild_id, seller_id, -1, -old_price)
+        self._adjust(guild_id, buyer_id, 1, new_price)
+
+    def summary(self, guild_id: int, owner_id: int) -> Tuple[int, int]:
+        """(땅 수, 총 가격)"""
+        holdings = self._guilds.get(guild_id)
+        if holdings is None:
+            return 0, 0
+        return holdings.owners.get(owner_id, (0, 0))
+
+    def top(self, guild_id: int, k: int) -> List[Tuple[int, int, int]]:
+        """총 가격 상위 k명의 (owner_id, 땅 수, 총 가격)"""
+        holdings = self._guilds.get(guild_id)
+        if holdings is None:
+            return []
+        return [(owner_id, holdings.owners[owner_id][0], -negative_total)
+                for negative_total, owner_id in holdings.tree.slice(0, k)]
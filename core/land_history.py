@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+import os
+from typing import Optional
+
+# 거래 내역 한 줄: (created_at, id, channel_id, seller_id, buyer_id, transaction_price, transaction_type)
+_COLUMNS = """
+    t.created_at, t.id, l.channel_id, t.seller_id, t.buyer_id, t.transaction_price, t.transaction_type
+"""
+_ARCHIVE_COLUMNS = "id, guild_id, land_id, seller_id, buyer_id, transaction_price, transaction_type, created_at"
+
+
+class LandHistory:
+    """땅 거래 내역 조회와 오래된 내역 보관
+
+    내역은 (created_at, id) 기준 keyset 방식으로 넘겨 보므로 OFFSET 처럼 앞 페이지를 다시 읽지 않습니다.
+    retention_days 보다 오래된 내역은 archive_batch 건씩 land_transactions_archive 로 옮깁니다.
+    """
+
+    def __init__(self, db, *, retention_days: int = 90, archive_batch: int = 1000):
+        self.db = db
+        self.retention_days = retention_days
+        self.archive_batch = archive_batch
+
+    @classmethod
+    def from_env(cls, db):
+        return cls(
+            db,
+            retention_days=int(os.getenv("LAND_HISTORY_RETENTION_DAYS", 90)),
+            archive_batch=int(os.getenv("LAND_HISTORY_ARCHIVE_BATCH", 1000)),
+        )
+
+    async def page(self, guild_id: int, *, channel_id: Optional[int] = None, user_id: Optional[int] = None,
+                   before: Optional[tuple] = None, limit: int = 10) -> list:
+        """최신순으로 before((created_at, id)) 이전의 내역을 limit 건까지 반환
+
+        channel_id 를 주면 그 땅의 내역, user_id 를 주면 그 사용자가 사고판 내역입니다.
+        """
+        # 첫 페이지는 모든 행보다 큰 커서로 시작
+        cursor = before or (datetime.datetime.max, 0)
+        if channel_id is not None:
+            return await self.db.fetchall(f"""
+                SELECT {_COLUMNS}
+                FROM land_transactions t
+                JOIN lands l ON l.id = t.land_id
+                WHERE t.land_id = (SELECT id FROM lands WHERE guild_id = %s AND channel_id = %s)
+                  AND (t.created_at, t.id) < (%s, %s)
+                ORDER BY t.created_at DESC, t.id DESC
+                LIMIT %s
+            """, (guild_id, channel_id, *cursor, limit))
+
+        if user_id is not None:
+            # 구매/판매 인덱스를 각각 타도록 나눠서 읽고 합침 (한 거래의 구매자와 판매자는 다름)
+            return await self.db.fetchall(f"""
+                SELECT {_COLUMNS}
+                FROM (
+                    (SELECT * FROM land_transactions
+                     WHERE guild_id = %(guild_id)s AND buyer_id = %(user_id)s
+                       AND (created_at, id) < (%(created_at)s, %(id)s)
+                     ORDER BY created_at DESC, id DESC
+                     LIMIT %(limit)s)
+                    UNION ALL
+                    (SELECT * FROM land_transactions
+                     WHERE guild_id = %(guild_id)s AND seller_id = %(user_id)s
+                       AND (created_at, id) < (%(created_at)s, %(id)s)
+                     ORDER BY created_at DESC, id DESC
+                     LIMIT %(limit)s)
+                ) t
+                JOIN lands l ON l.id = t.land_id
+                ORDER BY t.created_at DESC, t.id DESC
+                LIMIT %(limit)s
+            """, {"guild_id": guild_id, "user_id": user_id, "created_at": cursor[0], "id": cursor[1], "limit": limit})
+
+        return await self.db.fetchall(f"""
+            SELECT {_COLUMNS}
+            FROM land_transactions t
+            JOIN lands l ON l.id = t.land_id
+            WHERE t.guild_id = %s AND (t.created_at, t.id) < (%s, %s)
+            ORDER BY t.created_at DESC, t.id DESC
+            LIMIT %s
+        """, (guild_id, *cursor, limit))
+
+    async def archive(self, cutoff: Optional[datetime.datetime] = None) -> int:
+        """cutoff 이전 내역을 archive_batch 건씩 보관 테이블로 옮기고, 옮긴 건수를 반환"""
+        if cutoff is None:
+            cutoff = datetime.datetime.now() - datetime.timedelta(days=self.retention_days)
+
+        total = 0
+        while True:
+            # 한 번에 한 배치씩 짧은 트랜잭션으로 옮겨서 구매 쿼리를 오래 막지 않음
+            moved = await self.db.fetchval(f"""
+                WITH moved AS (
+                    DELETE FROM land_transactions
+                    WHERE id IN (
+                        SELECT id FROM land_transactions
+                        WHERE created_at < %s
+                        ORDER BY created_at, id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING {_ARCHIVE_COLUMNS}
+                ),
+                archived AS (
+                    INSERT INTO land_transactions_archive ({_ARCHIVE_COLUMNS})
+                    SELECT {_ARCHIVE_COLUMNS} FROM moved
+                    ON CONFLICT (id) DO NOTHING
+                )
+                SELECT COUNT(*) FROM moved
+            """, (cutoff, self.archive_batch))
+            total += moved
+            if moved < self.archive_batch:
+                return total
+            await asyncio.sleep(0)
@@ -0,0 +1,54 @@
+from typing import List, Optional, Tuple
+
+
+class BalanceLeaderboard:
+    """서버별 잔고 순위 (guild_members 와 users 를 조인해서 조회)
+
+    페이지는 마지막 사용자의 (잔액, id) 를 커서로 쓰는 keyset 방식이라 뒤 페이지도 users_rank_idx 로 바로 찾습니다.
+    순서는 잔액 내림차순, 잔액이 같으면 id 오름차순입니다.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    async def page(self, guild_id: int, after: Optional[Tuple[int, int]] = None,
+                   limit: int = 10) -> List[Tuple[int, int]]:
+        """after((잔액, user_id)) 다음부터 limit 명의 (user_id, 잔액)"""
+        if after is None:
+            return await self.db.fetchall("""
+                SELECT u.uuid, u.money
+                FROM guild_members m
+                JOIN users u ON u.uuid = m.user_id
+                WHERE m.guild_id = %s
+                ORDER BY u.money DESC, u.uuid
+                LIMIT %s
+            """, (guild_id, limit))
+        money, user_id = after
+        return await self.db.fetchall("""
+            SELECT u.uuid, u.money
+            FROM guild_members m
+            JOIN users u ON u.uuid = m.user_id
+            WHERE m.guild_id = %(guild_id)s
+              AND (u.money < %(money)s OR (u.money = %(money)s AND u.uuid > %(user_id)s))
+            ORDER BY u.money DESC, u.uuid
+            LIMIT %(limit)s
+        """, {"guild_id": guild_id, "money": money, "user_id": user_id, "limit": limit})
+
+    async def summary(self, guild_id: int, user_id: int) -> Tuple[int, Optional[int]]:
+        """(순위에 있는 사용자 수, user_id 의 순위). 순위에 없으면 순위는 None"""
+        total, my_rank = await self.db.fetchone("""
+            WITH me AS (
+                SELECT u.money FROM users u
+                WHERE u.uuid = %(user_id)s
+                  AND EXISTS (SELECT 1 FROM guild_members WHERE guild_id = %(guild_id)s AND user_id = %(user_id)s)
+            )
+            SELECT COUNT(*),
+                   CASE WHEN EXISTS (SELECT 1 FROM me) THEN 1 + COUNT(*) FILTER (
+                       WHERE u.money > (SELECT money FROM me)
+                          OR (u.money = (SELECT money FROM me) AND u.uuid < %(user_id)s)
+                   ) END
+            FROM guild_members m
+            JOIN users u ON u.uuid = m.user_id
+            WHERE m.guild_id = %(guild_id)s
+        """, {"guild_id": guild_id, "user_id": user_id})
+        return total, my_rank
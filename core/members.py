@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+import discord
+
+# 한 번의 게이트웨이 요청(REQUEST_GUILD_MEMBERS)으로 조회할 수 있는 최대 멤버 수
+QUERY_LIMIT = 100
+
+
+def client_options(mode: str) -> dict:
+    """MEMBER_CACHE 모드별 commands.Bot 옵션
+
+    full: 모든 intent 를 켜고 시작할 때 모든 서버의 멤버 목록을 받아 캐시 (기존 동작)
+    lean: presence 를 끄고 멤버 목록을 받지 않으며, discord.py 의 멤버 캐시도 쓰지 않음.
+          입장/퇴장 이벤트는 그대로 받고, 화면에 보여줄 이름만 MemberNames 로 조회
+    """
+    if mode == "full":
+        return {"intents": discord.Intents.all()}
+    if mode == "lean":
+        intents = discord.Intents.all()
+        intents.presences = False
+        return {
+            "intents": intents,
+            "chunk_guilds_at_startup": False,
+            "member_cache_flags": discord.MemberCacheFlags.none(),
+        }
+    raise ValueError(f"MEMBER_CACHE 는 full 또는 lean 이어야 합니다: {mode}")
+
+
+async def guild_member_ids(guild) -> List[int]:
+    """서버의 모든 멤버 id. 멤버 목록을 캐시하고 있으면 캐시에서, 아니면 HTTP 로 1000명씩 받아 id 만 남김"""
+    if guild.chunked:
+        return [member.id for member in guild.members]
+    return [member.id async for member in guild.fetch_members(limit=None)]
+
+
+class MemberNames:
+    """순위/내역 임베드에 표시할 멤버 이름 캐시 (크기 / TTL 제한이 있는 LRU)
+
+    discord.py 의 멤버 캐시에 있으면 그대로 쓰고, 없는 id 만 모아서 게이트웨이로 한 번에 조회합니다.
+    이름이 바뀌어도 ttl 초 안에는 이전 이름이 보일 수 있습니다. 상호작용 응답 제한(3초) 안에 끝나도록
+    조회는 timeout 초까지만 기다립니다.
+    """
+
+    def __init__(self, *, maxsize: int = 10000, ttl: float = 3600.0, timeout: float = 2.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.lookups = 0  # 게이트웨이 조회 횟수
+
+        self._entries = OrderedDict()  # (guild_id, user_id) -> (이름, 만료 시각)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            maxsize=int(os.getenv("MEMBER_NAME_CACHE_SIZE", 10000)),
+            ttl=float(os.getenv("MEMBER_NAME_CACHE_TTL", 3600)),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def remember(self, guild_id: int, user_id: int, name: str):
+        self._entries[(guild_id, user_id)] = (name, time.monotonic() + self.ttl)
+        self._entries.move_to_end((guild_id, user_id))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def forget(self, guild_id: int, user_id: int):
+        self._entries.pop((guild_id, user_id), None)
+
+    def forget_guild(self, guild_id: int):
+        for key in [key for key in self._entries if key[0] == guild_id]:
+            del self._entries[key]
+
+    async def resolve(self, guild, user_ids: Iterable[int]) -> Dict[int, str]:
+        """user_ids 의 이름. 서버에서 찾지 못한 멤버는 결과에 없음"""
+        names = {}
+        missing = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id)
+            if member is not None:
+                names[user_id] = member.name
+                continue
+            name = self._lookup((guild.id, user_id))
+            if name is not None:
+                self.hits += 1
+                names[user_id] = name
+            elif user_id not in missing:
+                self.misses += 1
+                missing.append(user_id)
+
+        for start in range(0, len(missing), QUERY_LIMIT):
+            self.lookups += 1
+            try:
+                members = await asyncio.wait_for(
+                    guild.query_members(user_ids=missing[start:start + QUERY_LIMIT], cache=False), self.timeout)
+            except (asyncio.TimeoutError, discord.ClientException):
+                # 응답이 없거나 members intent 가 꺼져 있으면 이름 없이 표시
+                break
+            for member in members:
+                names[member.id] = member.name
+                self.remember(guild.id, member.id, member.name)
+        return names
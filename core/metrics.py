@@ -0,0 +1,131 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+# 지연 시간 버킷(초)과 명령어당 쿼리 수 버킷
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+# 실행 중인 명령어의 쿼리 수 [count]. Database 가 쿼리를 실행할 때마다 올림
+command_queries: ContextVar[Optional[list]] = ContextVar("command_queries", default=None)
+
+
+class Histogram:
+    """누적 버킷 히스토그램 (Prometheus histogram 과 같은 형식)"""
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """버킷 경계로 근사한 분위수 (마지막 버킷을 넘으면 가장 큰 경계값)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        prefix = f"{labels}," if labels else ""
+        lines = []
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {seen}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class CommandStats:
+    __slots__ = ("latency", "queries", "errors")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.errors = 0
+
+
+class CommandMetrics:
+    """앱 명령어별 지연 시간 / 쿼리 수 / 오류 수
+
+    PermissionTree 가 명령어 시작 시 started, 끝날 때 finished 를 호출합니다.
+    시작 시각과 쿼리 카운터는 interaction.extras 에 담아 둡니다.
+    """
+
+    def __init__(self):
+        self.commands: Dict[str, CommandStats] = {}
+
+    def started(self, interaction):
+        counter = [0]
+        command_queries.set(counter)
+        interaction.extras["metrics"] = (time.perf_counter(), counter)
+
+    def finished(self, interaction, failed: bool = False):
+        started = interaction.extras.pop("metrics", None)
+        if started is None or interaction.command is None:
+            return
+        start, counter = started
+        stats = self.commands.get(interaction.command.qualified_name)
+        if stats is None:
+            stats = self.commands[interaction.command.qualified_name] = CommandStats()
+        stats.latency.observe(time.perf_counter() - start)
+        stats.queries.observe(counter[0])
+        if failed:
+            stats.errors += 1
+
+
+def render_prometheus(commands: CommandMetrics, db, balances=None, gauges: Optional[Dict[str, float]] = None) -> str:
+    """Prometheus text 형식의 지표"""
+    lines = [
+        "# TYPE sjm_command_latency_seconds histogram",
+    ]
+    for name, stats in sorted(commands.commands.items()):
+        lines += stats.latency.render("sjm_command_latency_seconds", f'command="{name}"')
+    lines.append("# TYPE sjm_command_queries histogram")
+    for name, stats in sorted(commands.commands.items()):
+        lines += stats.queries.render("sjm_command_queries", f'command="{name}"')
+    lines.append("# TYPE sjm_command_errors_total counter")
+    for name, stats in sorted(commands.commands.items()):
+        lines.append(f'sjm_command_errors_total{{command="{name}"}} {stats.errors}')
+
+    lines.append("# TYPE sjm_db_queries_total counter")
+    lines.append(f"sjm_db_queries_total {db.queries}")
+    lines.append("# TYPE sjm_db_query_errors_total counter")
+    lines.append(f"sjm_db_query_errors_total {db.query_errors}")
+    lines.append("# TYPE sjm_db_query_seconds histogram")
+    lines += db.query_time.render("sjm_db_query_seconds")
+    lines.append("# TYPE sjm_db_pool_wait_seconds histogram")
+    lines += db.pool_wait.render("sjm_db_pool_wait_seconds")
+
+    if balances is not None:
+        lines.append("# TYPE sjm_balance_cache_hits_total counter")
+        lines.append(f"sjm_balance_cache_hits_total {balances.hits}")
+        lines.append("# TYPE sjm_balance_cache_misses_total counter")
+        lines.append(f"sjm_balance_cache_misses_total {balances.misses}")
+        lines.append("# TYPE sjm_balance_cache_size gauge")
+        lines.append(f"sjm_balance_cache_size {len(balances)}")
+
+    for name, value in (gauges or {}).items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import os
+import re
+import sys
+from typing import List, Tuple
+
+# 저장소 최상위의 migrations 폴더 (NNNN_이름.sql)
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# 여러 프로세스가 동시에 시작해도 한 곳에서만 적용하도록 거는 advisory lock 키
+MIGRATION_LOCK_ID = 0x736A6D  # "sjm"
+
+# 자주 실행되는 쿼리가 기대하는 인덱스 (테이블, 인덱스 이름)
+EXPECTED_INDEXES = (
+    ("users", "users_pkey"),
+    ("users", "users_rank_idx"),
+    ("users", "users_last_active_idx"),
+    ("lands", "lands_guild_channel_key"),
+    ("lands", "lands_guild_owner_idx"),
+    ("land_transactions", "land_transactions_land_idx"),
+    ("land_transactions", "land_transactions_guild_idx"),
+    ("land_transactions", "land_transactions_buyer_idx"),
+    ("land_transactions", "land_transactions_seller_idx"),
+    ("land_transactions", "land_transactions_created_idx"),
+    ("blackjack_sessions", "blackjack_sessions_pkey"),
+    ("guild_settings", "guild_settings_pkey"),
+    ("command_permissions", "command_permissions_pkey"),
+    ("guild_members", "guild_members_pkey"),
+)
+
+# 명령어 경로의 대표 쿼리 (이름, 쿼리, 파라미터). 인덱스로 처리되어야 하는 것만 모음
+HOT_QUERIES = (
+    ("잔고 조회", "SELECT money FROM users WHERE uuid = %s", (1,)),
+    ("잔고 순 조회", "SELECT uuid, money FROM users ORDER BY money DESC, uuid LIMIT 10", None),
+    ("서버 잔고 순위", """
+        SELECT u.uuid, u.money
+        FROM guild_members m
+        JOIN users u ON u.uuid = m.user_id
+        WHERE m.guild_id = %s
+        ORDER BY u.money DESC, u.uuid
+        LIMIT 10
+    """, (1,)),
+    ("최근 활동 사용자", """
+        SELECT uuid FROM users
+        ORDER BY GREATEST(last_hourly, last_interest) DESC NULLS LAST
+        LIMIT 10
+    """, None),
+    ("땅 정보", "SELECT owner_id, current_price FROM lands WHERE guild_id = %s AND channel_id = %s", (1, 1)),
+    ("내 땅 목록", """
+        SELECT channel_id, current_price FROM lands
+        WHERE guild_id = %s AND owner_id = %s
+        ORDER BY purchase_date DESC
+        LIMIT 20
+    """, (1, 1)),
+    ("땅 거래 내역", """
+        SELECT id FROM land_transactions
+        WHERE land_id = %s AND (created_at, id) < (NOW(), 0)
+        ORDER BY created_at DESC, id DESC
+        LIMIT 11
+    """, (1,)),
+    ("서버 거래 내역", """
+        SELECT id FROM land_transactions
+        WHERE guild_id = %s AND (created_at, id) < (NOW(), 0)
+        ORDER BY created_at DESC, id DESC
+        LIMIT 11
+    """, (1,)),
+    ("블랙잭 게임", "SELECT amount FROM blackjack_sessions WHERE user_id = %s", (1,)),
+)
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> List[Tuple[int, str, str]]:
+    """(버전, 이름, SQL) 목록을 버전 순으로 반환"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if match is None:
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as file:
+            migrations.append((int(match.group(1)), match.group(2), file.read()))
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"마이그레이션 버전이 중복되었습니다: {versions}")
+    return migrations
+
+
+async def migrate(db, directory: str = MIGRATIONS_DIR) -> List[str]:
+    """아직 적용하지 않은 마이그레이션을 순서대로 적용하고, 적용한 파일 이름 목록을 반환
+
+    전체를 한 트랜잭션으로 실행하므로 중간에 실패하면 아무것도 적용되지 않습니다.
+    """
+    migrations = load_migrations(directory)
+    async with db.transaction() as tx:
+        await tx.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+        await tx.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+        """)
+        applied = {version for (version,) in await tx.fetchall("SELECT version FROM schema_migrations")}
+        done = []
+        for version, name, sql in migrations:
+            if version in applied:
+                continue
+            await tx.execute(sql)
+            await tx.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+            done.append(f"{version:04d}_{name}")
+    return done
+
+
+def _seq_scans(plan: dict) -> List[str]:
+    """실행 계획에서 Seq Scan 하는 테이블 이름들"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name", "?"))
+    for child in plan.get("Plans", ()):
+        found += _seq_scans(child)
+    return found
+
+
+async def check(db) -> List[str]:
+    """빠진 인덱스와, 인덱스가 있어도 Seq Scan 으로 실행되는 대표 쿼리를 찾아 문제 목록으로 반환
+
+    테이블이 작으면 플래너가 Seq Scan 을 고르므로 enable_seqscan 을 끈 상태에서 계획을 봅니다.
+    그래도 Seq Scan 이면 쓸 수 있는 인덱스가 없다는 뜻입니다.
+    """
+    problems = []
+    rows = await db.fetchall("""
+        SELECT tablename, indexname FROM pg_indexes
+        WHERE schemaname = current_schema()
+    """)
+    existing = set(rows)
+    for table, index in EXPECTED_INDEXES:
+        if (table, index) not in existing:
+            problems.append(f"인덱스 없음: {table}.{index}")
+
+    async with db.transaction() as tx:
+        await tx.execute("SET LOCAL enable_seqscan = off")
+        for name, query, params in HOT_QUERIES:
+            plan = await tx.fetchval(f"EXPLAIN (FORMAT JSON) {query}", params)
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            for table in _seq_scans(plan[0]["Plan"]):
+                problems.append(f"Seq Scan: {name} ({table})")
+    return problems
+
+
+async def _main(command: str):
+    from dotenv import load_dotenv
+
+    from core.db import Database
+
+    load_dotenv()
+    db = Database.from_env()
+    await db.open()
+    try:
+        if command in ("migrate", "all"):
+            applied = await migrate(db)
+            print(f"마이그레이션 적용: {', '.join(applied)}" if applied else "적용할 마이그레이션 없음")
+        if command in ("check", "all"):
+            problems = await check(db)
+            for problem in problems:
+                print(problem)
+            print(f"스키마 점검: 문제 {len(problems)}건" if problems else "스키마 점검: 문제 없음")
+            return 1 if problems else 0
+        return 0
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    # python -m core.migrations [migrate|check|all]
+    command = sys.argv[1] if len(sys.argv) > 1 else "all"
+    if command not in ("migrate", "check", "all"):
+        sys.exit("사용법: python -m core.migrations [migrate|check|all]")
+    sys.exit(asyncio.run(_main(command)))
@@ -0,0 +1,103 @@
+import enum
+from typing import Dict, Optional, Tuple
+
+import discord
+from discord import app_commands
+
+# 서버 전체 규칙을 저장할 때 쓰는 channel_id
+GUILD_SCOPE = 0
+
+
+class Category(enum.IntFlag):
+    """명령어 분류. 권한은 분류별 비트로 저장합니다."""
+    BANK = 1
+    GAMBLING = 2
+    LAND = 4
+
+
+ALL_CATEGORIES = Category.BANK | Category.GAMBLING | Category.LAND
+
+CATEGORY_NAMES = {
+    Category.BANK: "은행",
+    Category.GAMBLING: "도박",
+    Category.LAND: "땅",
+}
+
+
+class PermissionTable:
+    """서버 하나의 채널별 허용/차단 규칙
+
+    - 채널 규칙의 차단 > 채널 규칙의 허용 > 서버 전체 차단 순으로 적용됩니다.
+    - 어떤 분류에 허용 채널이 하나라도 있으면 그 분류는 허용된 채널에서만 쓸 수 있습니다.
+    규칙이 바뀔 때 채널별 최종 비트마스크를 미리 계산해 두므로 검사는 dict 조회 한 번입니다.
+    """
+
+    __slots__ = ("rules", "default_mask", "_effective")
+
+    def __init__(self, rules: Optional[Dict[int, Tuple[int, int]]] = None):
+        self.rules = dict(rules or {})  # channel_id -> (allow_mask, deny_mask)
+
+        guild_allow, guild_deny = self.rules.get(GUILD_SCOPE, (0, 0))
+        allow_listed = 0
+        for channel_id, (allow, _) in self.rules.items():
+            if channel_id != GUILD_SCOPE:
+                allow_listed |= allow
+
+        self.default_mask = ALL_CATEGORIES & ~guild_deny & ~allow_listed
+        self._effective = {
+            channel_id: (self.default_mask | allow) & ~deny
+            for channel_id, (allow, deny) in self.rules.items()
+            if channel_id != GUILD_SCOPE
+        }
+
+    def allows(self, channel_id: int, category: Category) -> bool:
+        return bool(self._effective.get(channel_id, self.default_mask) & category)
+
+    def with_rule(self, channel_id: int, allow: int, deny: int) -> "PermissionTable":
+        """규칙 하나를 바꾼 새 테이블"""
+        rules = dict(self.rules)
+        if allow or deny:
+            rules[channel_id] = (allow, deny)
+        else:
+            rules.pop(channel_id, None)
+        return PermissionTable(rules)
+
+
+class PermissionTree(app_commands.CommandTree):
+    """모든 앱 명령어에 대해 한 곳에서 채널 권한을 검사하는 CommandTree
+
+    명령어가 속한 Cog 의 command_category 속성으로 분류를 정하며, 분류가 없는 명령어는 항상 허용됩니다.
+    bot 에 command_metrics 가 있으면 명령어별 지표 측정도 여기서 시작합니다.
+    """
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # 명령어별 지연 시간/쿼리 수 측정 시작 (끝은 on_app_command_completion / on_error, 막히면 아래에서)
+        metrics = getattr(self.client, "command_metrics", None)
+        if metrics is not None:
+            metrics.started(interaction)
+
+        command = interaction.command
+        category = getattr(getattr(command, "binding", None), "command_category", None)
+        if category is None or interaction.guild_id is None:
+            return True
+
+        settings_cog = self.client.get_cog('GuildSettings')
+        if not settings_cog:
+            return True
+
+        if not await settings_cog.check_command_permission(interaction, category):
+            await interaction.response.send_message("이 채널에서는 명령어를 사용할 수 없습니다.", ephemeral=True)
+            # 막힌 명령어는 on_error 로 가지 않으므로 여기서 실패로 기록
+            if metrics is not None:
+                metrics.finished(interaction, failed=True)
+            return False
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        metrics = getattr(self.client, "command_metrics", None)
+        if metrics is not None:
+            metrics.finished(interaction, failed=True)
+        # 권한 검사에서 막힌 경우는 이미 안내했으므로 로그를 남기지 않음
+        if isinstance(error, app_commands.CheckFailure):
+            return
+        await super().on_error(interaction, error)
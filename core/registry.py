@@ -0,0 +1,63 @@
+import os
+from collections import OrderedDict
+
+
+class UserRegistry:
+    """users 테이블에 행이 있는지 보장하는 공용 서비스
+
+    존재가 확인된 user_id 는 크기 제한이 있는 LRU 에 기억해 두므로, 평소에는 추가 쿼리가 없습니다.
+    모르는 사용자들은 INSERT ... ON CONFLICT DO NOTHING 한 번으로 한꺼번에 보장합니다.
+    (Bloom filter 는 '있을 수도 있음'만 알려주므로 행이 없는데 INSERT 를 건너뛸 수 있어 쓰지 않습니다.)
+    """
+
+    def __init__(self, db, balances=None, *, maxsize: int = 100000):
+        self.db = db
+        self.balances = balances  # 잔액 캐시에 있는 사용자는 이미 존재하는 사용자
+        self.maxsize = maxsize
+        self._known = OrderedDict()
+
+    @classmethod
+    def from_env(cls, db, balances=None):
+        return cls(db, balances, maxsize=int(os.getenv("KNOWN_USERS_SIZE", 100000)))
+
+    def __contains__(self, user_id: int) -> bool:
+        if user_id in self._known:
+            self._known.move_to_end(user_id)
+            return True
+        return self.balances is not None and user_id in self.balances
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def _remember(self, user_id: int):
+        self._known[user_id] = None
+        self._known.move_to_end(user_id)
+        while len(self._known) > self.maxsize:
+            self._known.popitem(last=False)
+
+    async def warm(self):
+        """최근에 활동한 사용자부터 LRU 를 채움"""
+        rows = await self.db.fetchall("""
+            SELECT uuid FROM (
+                SELECT uuid, GREATEST(last_hourly, last_interest) AS last_active
+                FROM users
+                ORDER BY last_active DESC NULLS LAST
+                LIMIT %s
+            ) recent
+            ORDER BY last_active ASC NULLS FIRST
+        """, (self.maxsize,))
+        # 오래된 사용자부터 넣어야 최근 사용자가 LRU 의 뒤쪽(가장 늦게 밀려나는 쪽)에 남음
+        for (user_id,) in rows:
+            self._remember(user_id)
+
+    async def ensure(self, *user_ids: int):
+        """user_ids 가 모두 users 테이블에 있도록 보장 (없으면 추가)"""
+        missing = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in self]
+        if missing:
+            await self.db.execute("""
+                INSERT INTO users (uuid)
+                SELECT unnest(%s::bigint[])
+                ON CONFLICT (uuid) DO NOTHING
+            """, (missing,))
+        for user_id in user_ids:
+            self._remember(user_id)
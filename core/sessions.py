@@ -0,0 +1,206 @@
+import asyncio
+import os
+import time
+
+from core.cards import Hand
+from core.settlement import InsufficientFunds
+
+
+class GameInProgress(Exception):
+    """같은 사용자의 게임이 이미 blackjack_sessions 에 있음 (다른 프로세스에서 시작한 게임 포함)"""
+
+
+class BlackjackSession:
+    """진행 중인 블랙잭 게임 하나"""
+    __slots__ = ('user_id', 'guild_id', 'channel_id', 'amount', 'player_hand', 'dealer_hand', 'status', 'touched')
+
+    def __init__(self, user_id, guild_id, channel_id, amount, player_hand, dealer_hand):
+        self.user_id = user_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.amount = amount
+        self.player_hand = player_hand
+        self.dealer_hand = dealer_hand
+        self.status = 'playing'  # playing -> finished / expired
+        self.touched = time.monotonic()
+
+
+class SessionStore:
+    """진행 중인 블랙잭 게임 저장소
+
+    게임은 메모리에 두고, 패는 카드 바이트열로 blackjack_sessions 테이블에도 저장해서
+    재시작 후에도 이어서 하거나 정산할 수 있습니다.
+    idle_timeout 초 동안 아무 동작이 없는 게임은 sweep_interval 초마다 on_expire 로 넘겨 정리합니다.
+    배팅 차감과 게임 저장은 한 트랜잭션으로, 게임 삭제와 지급은 쿼리 한 번으로 함께 처리됩니다.
+    """
+
+    def __init__(self, db, cache=None, *, idle_timeout: float = 300, sweep_interval: float = 30, on_expire=None):
+        self.db = db
+        self.cache = cache  # 바뀐 잔액을 write-through 할 BalanceCache
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.on_expire = on_expire  # async def on_expire(session)
+
+        self._sessions = {}  # user_id -> BlackjackSession
+        self._task = None
+        self.evicted = 0
+        self.restored = 0
+
+    @classmethod
+    def from_env(cls, db, cache=None, on_expire=None):
+        return cls(
+            db,
+            cache,
+            idle_timeout=float(os.getenv("BLACKJACK_IDLE_TIMEOUT", 300)),
+            sweep_interval=float(os.getenv("BLACKJACK_SWEEP_INTERVAL", 30)),
+            on_expire=on_expire,
+        )
+
+    def __contains__(self, user_id):
+        return user_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, user_id):
+        return self._sessions.get(user_id)
+
+    def stats(self):
+        return {"active": len(self._sessions), "evicted": self.evicted, "restored": self.restored}
+
+    async def restore(self, shard_plan=None):
+        """재시작 전에 진행 중이던 게임을 불러옴 (shard_plan 을 주면 그 프로세스가 맡은 서버의 게임만)"""
+        condition, params = shard_plan.guild_filter() if shard_plan else ("TRUE", {})
+        rows = await self.db.fetchall(f"""
+            SELECT user_id, guild_id, channel_id, amount, player, dealer FROM blackjack_sessions
+            WHERE {condition}
+        """, params)
+        # 불러온 게임은 지금부터 다시 idle_timeout 만큼 기다림
+        for user_id, guild_id, channel_id, amount, player, dealer in rows:
+            if user_id not in self._sessions:
+                self._sessions[user_id] = BlackjackSession(
+                    user_id, guild_id, channel_id, amount, Hand(bytes(player)), Hand(bytes(dealer)))
+                self.restored += 1
+        return len(rows)
+
+    async def begin(self, session):
+        """배팅 금액을 차감하면서 게임을 저장. 잔액이 부족하면 None, 성공하면 차감 후 잔액
+
+        이미 저장된 게임이 있으면 아무것도 차감하지 않고 GameInProgress 를 던집니다.
+        """
+        params = {
+            "user_id": session.user_id,
+            "guild_id": session.guild_id,
+            "channel_id": session.channel_id,
+            "amount": session.amount,
+            "player": bytes(session.player_hand.cards),
+            "dealer": bytes(session.dealer_hand.cards),
+        }
+        try:
+            async with self.db.transaction() as tx:
+                # 게임을 먼저 저장해서, 동시에 시작한 다른 게임은 차감 전에 충돌로 걸러냄
+                inserted = await tx.execute("""
+                    INSERT INTO blackjack_sessions (user_id, guild_id, channel_id, amount, player, dealer)
+                    VALUES (%(user_id)s, %(guild_id)s, %(channel_id)s, %(amount)s, %(player)s, %(dealer)s)
+                    ON CONFLICT (user_id) DO NOTHING
+                """, params)
+                if not inserted:
+                    raise GameInProgress(session.user_id)
+
+                balance = await tx.fetchval("""
+                    UPDATE users SET money = money - %(amount)s
+                    WHERE uuid = %(user_id)s AND money >= %(amount)s
+                    RETURNING money
+                """, params)
+                if balance is None:
+                    # 저장한 게임까지 롤백
+                    raise InsufficientFunds(session.user_id)
+        except InsufficientFunds:
+            return None
+
+        self._sessions[session.user_id] = session
+        if self.cache is not None:
+            self.cache.set(session.user_id, balance)
+        return balance
+
+    def touch(self, session):
+        """게임을 이어서 할 때 호출: idle_timeout 을 지금부터 다시 셈"""
+        session.touched = time.monotonic()
+
+    async def save(self, session):
+        """패가 바뀔 때마다 호출 (마지막 동작 시각도 갱신)"""
+        session.touched = time.monotonic()
+        await self.db.execute(
+            "UPDATE blackjack_sessions SET player = %s, dealer = %s, updated_at = NOW() WHERE user_id = %s",
+            (bytes(session.player_hand.cards), bytes(session.dealer_hand.cards), session.user_id))
+
+    async def finish(self, session, payout: int):
+        """게임을 지우면서 payout 을 지급. 이미 정산된 게임이면 None, 아니면 (지급 후 잔액, 실제 지급액)
+
+        payout 이 음수(딜러 블랙잭 추가 손실)여도 잔액은 0 아래로 내려가지 않고, 그만큼 덜 빠집니다.
+        """
+        row = await self.db.fetchone("""
+            WITH done AS (
+                DELETE FROM blackjack_sessions WHERE user_id = %(user_id)s RETURNING user_id
+            )
+            UPDATE users SET money = GREATEST(o.old_money + %(payout)s, LEAST(o.old_money, 0))
+            FROM (
+                SELECT uuid, money AS old_money FROM users
+                WHERE uuid = (SELECT user_id FROM done)
+                FOR UPDATE
+            ) o
+            WHERE users.uuid = o.uuid
+            RETURNING users.money, users.money - o.old_money
+        """, {"user_id": session.user_id, "payout": payout})
+
+        if self._sessions.get(session.user_id) is session:
+            del self._sessions[session.user_id]
+        if row is None:
+            return None
+        if self.cache is not None:
+            self.cache.set(session.user_id, row[0])
+        return row[0], row[1]
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        # 진행 중인 게임은 테이블에 남겨 두고 다음 실행 때 이어서 처리
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            await self.sweep()
+
+    async def sweep(self):
+        """idle_timeout 을 넘긴 게임을 on_expire 로 정리하고, 정리한 개수를 반환"""
+        deadline = time.monotonic() - self.idle_timeout
+        expired = [s for s in self._sessions.values() if s.status == 'playing' and s.touched <= deadline]
+
+        count = 0
+        for session in expired:
+            # 정리 중에 버튼이 눌려도 무시되도록 먼저 상태를 바꿈
+            session.status = 'expired'
+            try:
+                await self.on_expire(session)
+            except Exception as e:
+                # 다음 정리 때 다시 시도
+                session.status = 'playing'
+                print(f"블랙잭 게임 정리 실패 (user {session.user_id}): {e!r}")
+                continue
+            if self._sessions.get(session.user_id) is session:
+                del self._sessions[session.user_id]
+            count += 1
+
+        self.evicted += count
+        if count:
+            print(f"블랙잭 방치 게임 {count}개 정리 (진행 중 {len(self._sessions)}개)")
+        return count
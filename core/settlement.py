@@ -0,0 +1,199 @@
+import asyncio
+import os
+
+from core.db import RETRYABLE_ERRORS
+from core.metrics import command_queries
+
+
+class InsufficientFunds(Exception):
+    """조건부 정산(required)을 반영할 때 DB의 잔액이 모자람"""
+
+
+class SettlementQueue:
+    """게임 정산(잔액 증감)을 모아서 한 번에 반영하는 write-behind 큐
+
+    같은 사용자의 증감은 하나로 합쳐지고, flush_interval 초마다 또는
+    max_batch 건이 쌓이면 하나의 트랜잭션으로 DB에 반영됩니다.
+    정산을 요청한 쪽은 반영된 뒤의 잔액을 돌려받습니다.
+    required 를 준 정산은 합치지 않고, 반영할 때 DB의 잔액이 required 이상인 경우에만 반영합니다.
+    (잔액 캐시는 프로세스마다 따로 있어 오래된 값일 수 있으므로 차감 가능 여부는 DB에서 판단)
+    /송금, 땅 구매처럼 여러 행을 잠그는 쿼리와 교착 상태가 생기지 않도록 사용자 id 순서로 잠그고,
+    그래도 교착 상태/직렬화 실패가 나면 retries 번까지 다시 시도합니다.
+    배치를 반영한 쿼리 수는 그 배치에 정산을 넣은 명령어마다 쿼리 수에 더합니다. (명령어가 기다린 쿼리 수)
+    """
+
+    def __init__(self, db, cache=None, *, flush_interval: float = 0.05, max_batch: int = 200, retries: int = 3):
+        self.db = db
+        self.cache = cache  # 반영된 잔액을 write-through 할 BalanceCache
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.retries = retries
+
+        self._pending = {}  # user_id -> [delta 합계, [future, ...]]
+        self._conditional = []  # (user_id, delta, required, future)
+        self._counters = {}  # 정산을 넣은 명령어의 쿼리 카운터 (id -> command_queries 값)
+        self._count = 0
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    @classmethod
+    def from_env(cls, db, cache=None):
+        return cls(
+            db,
+            cache,
+            flush_interval=int(os.getenv("SETTLEMENT_FLUSH_MS", 50)) / 1000,
+            max_batch=int(os.getenv("SETTLEMENT_MAX_BATCH", 200)),
+        )
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """남은 정산을 모두 반영한 뒤 종료"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def submit(self, user_id: int, delta: int, required: int = None) -> asyncio.Future:
+        """정산을 큐에 넣고, 반영 후 잔액이 담길 Future 를 반환
+
+        required 를 주면 반영 직전 잔액이 required 보다 적을 때 반영하지 않고 InsufficientFunds 로 실패합니다.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if required is not None:
+            self._conditional.append((user_id, delta, required, future))
+        else:
+            entry = self._pending.get(user_id)
+            if entry is None:
+                self._pending[user_id] = [delta, [future]]
+            else:
+                entry[0] += delta
+                entry[1].append(future)
+        counter = command_queries.get()
+        if counter is not None:
+            self._counters[id(counter)] = counter
+
+        self._count += 1
+        self._wakeup.set()
+        if self._count >= self.max_batch:
+            self._full.set()
+        return future
+
+    async def settle(self, user_id: int, delta: int, required: int = None) -> int:
+        return await self.submit(user_id, delta, required)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # 첫 정산이 들어온 뒤 flush_interval 동안(또는 배치가 찰 때까지) 더 모음
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                # 종료(cancel) 중에도 진행 중인 배치는 끝까지 반영되도록 보호
+                await asyncio.shield(self.flush())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 실패한 배치는 각 Future 에 예외로 전달되었으므로 루프는 계속 돈다
+                print(f"정산 반영 실패: {e!r}")
+
+    async def flush(self):
+        async with self._lock:
+            batch, self._pending = self._pending, {}
+            conditional, self._conditional = self._conditional, []
+            counters, self._counters = self._counters, {}
+            self._count = 0
+            self._wakeup.clear()
+            self._full.clear()
+            if not batch and not conditional:
+                return
+
+            # 사용자별 정산 목록 (합친 무조건 정산이 먼저, 조건부 정산은 들어온 순서대로)
+            entries = {user_id: [(delta, None, futures)] for user_id, (delta, futures) in batch.items()}
+            for user_id, delta, required, future in conditional:
+                entries.setdefault(user_id, []).append((delta, required, [future]))
+
+            # 한 UPDATE 에 같은 사용자가 두 번 나오지 않도록 사용자마다 한 건씩 차례로 반영
+            passes = [sorted((user_id, queued[step][0], queued[step][1])
+                             for user_id, queued in entries.items() if len(queued) > step)
+                      for step in range(max(map(len, entries.values())))]
+            queries = [0]
+            token = command_queries.set(queries)
+            try:
+                results = await self._apply(passes)
+            except Exception as e:
+                for queued in entries.values():
+                    for _, _, futures in queued:
+                        for future in futures:
+                            if not future.done():
+                                future.set_exception(e)
+                raise
+            finally:
+                command_queries.reset(token)
+                # 정산 결과를 받기 전에 요청한 명령어의 쿼리 수에 반영
+                for counter in counters.values():
+                    counter[0] += queries[0]
+
+            for user_id, queued in entries.items():
+                balance = None
+                for step, (_, required, futures) in enumerate(queued):
+                    error = None
+                    if user_id in results[step]:
+                        balance = results[step][user_id]
+                    elif required is not None:
+                        error = InsufficientFunds(f"잔액이 부족합니다: {user_id}")
+                    else:
+                        error = LookupError(f"존재하지 않는 사용자입니다: {user_id}")
+                    for future in futures:
+                        if future.done():
+                            continue
+                        if error is None:
+                            future.set_result(balance)
+                        else:
+                            future.set_exception(error)
+
+                if self.cache is not None:
+                    if balance is not None:
+                        self.cache.set(user_id, balance)
+                    else:
+                        self.cache.invalidate(user_id)
+
+    async def _apply(self, passes):
+        """[(user_id, delta, required), ...] 목록들을 한 트랜잭션으로 차례로 반영하고,
+        목록마다 {user_id: 반영 후 잔액} 을 반환 (required 를 만족하지 못한 사용자는 빠짐)
+        """
+        for attempt in range(1, self.retries + 1):
+            try:
+                async with self.db.transaction() as tx:
+                    results = []
+                    for rows in passes:
+                        # 행 잠금은 사용자 id 순서로 먼저 잡음 (UPDATE ... FROM 의 처리 순서는 정해져 있지 않음)
+                        # 첫 목록에 모든 사용자가 들어 있으므로 이후 목록은 이미 잠근 행만 다룸
+                        results.append(dict(await tx.execute_values("""
+                            WITH v(uuid, delta, required) AS (VALUES %s),
+                            locked AS (
+                                SELECT users.uuid FROM users JOIN v ON v.uuid = users.uuid
+                                ORDER BY users.uuid
+                                FOR UPDATE OF users
+                            )
+                            UPDATE users SET money = users.money + v.delta
+                            FROM v JOIN locked ON locked.uuid = v.uuid
+                            WHERE users.uuid = v.uuid AND (v.required IS NULL OR users.money >= v.required)
+                            RETURNING users.uuid, users.money
+                        """, rows, template="(%s::bigint, %s::bigint, %s::bigint)", fetch=True)))
+                    return results
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.retries:
+                    raise
+                print(f"정산 반영 재시도 ({attempt}/{self.retries}): {e!r}")
+                await asyncio.sleep(0.05 * attempt)
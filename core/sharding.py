@@ -0,0 +1,79 @@
+import os
+from typing import List, Optional, Tuple
+
+
+def parse_shard_ids(value: Optional[str]) -> Optional[List[int]]:
+    """"0,1,2" 또는 "0-3" 형식 (섞어 써도 됨)"""
+    if not value:
+        return None
+    shard_ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = part.split("-", 1)
+            shard_ids.extend(range(int(first), int(last) + 1))
+        elif part:
+            shard_ids.append(int(part))
+    return sorted(set(shard_ids))
+
+
+class ShardPlan:
+    """이 프로세스가 맡은 샤드
+
+    shard_count 와 shard_ids 를 모두 비우면 discord.py 가 권장 샤드 수를 받아 한 프로세스에서 모두 실행합니다.
+    shard_ids 를 주면 그 샤드의 서버만 이 프로세스가 맡고, 나머지는 다른 프로세스가 맡습니다.
+    서버가 속한 샤드는 Discord 와 같은 규칙 (guild_id >> 22) % shard_count 로 계산합니다.
+    """
+
+    def __init__(self, shard_count: Optional[int] = None, shard_ids: Optional[List[int]] = None):
+        if shard_ids is not None:
+            if shard_count is None:
+                raise ValueError("shard_ids 를 지정하려면 shard_count 도 지정해야 합니다.")
+            if not shard_ids or any(not 0 <= shard_id < shard_count for shard_id in shard_ids):
+                raise ValueError(f"shard_ids 는 0 이상 {shard_count} 미만이어야 합니다: {shard_ids}")
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+
+    @classmethod
+    def from_env(cls, shard_count: Optional[int] = None, shard_ids: Optional[List[int]] = None):
+        """인자로 준 값이 우선이고, 없으면 SHARD_COUNT / SHARD_IDS 를 읽음"""
+        if shard_count is None and os.getenv("SHARD_COUNT"):
+            shard_count = int(os.getenv("SHARD_COUNT"))
+        if shard_ids is None:
+            shard_ids = parse_shard_ids(os.getenv("SHARD_IDS"))
+        return cls(shard_count, shard_ids)
+
+    @property
+    def partial(self) -> bool:
+        """다른 프로세스와 샤드를 나눠 맡는지"""
+        return self.shard_ids is not None and len(self.shard_ids) < self.shard_count
+
+    @property
+    def share(self) -> float:
+        """이 프로세스가 맡은 서버의 비율 (샤드 수 기준)"""
+        return len(self.shard_ids) / self.shard_count if self.partial else 1.0
+
+    @property
+    def primary(self) -> bool:
+        """서버와 무관한 전역 작업(이자 자동 지급, 내역 보관, 명령어 동기화)을 맡는 프로세스인지 (샤드 0 담당)"""
+        return not self.partial or 0 in self.shard_ids
+
+    def shard_for(self, guild_id: int) -> int:
+        return (guild_id >> 22) % self.shard_count if self.shard_count else 0
+
+    def owns(self, guild_id: int) -> bool:
+        return not self.partial or self.shard_for(guild_id) in self.shard_ids
+
+    def guild_filter(self, column: str = "guild_id") -> Tuple[str, dict]:
+        """이 프로세스가 맡은 서버만 고르는 WHERE 조건과 파라미터 (%(name)s 형식)"""
+        if not self.partial:
+            return "TRUE", {}
+        return (f"({column} >> 22) %% %(shard_count)s = ANY(%(shard_ids)s)",
+                {"shard_count": self.shard_count, "shard_ids": self.shard_ids})
+
+    def __str__(self):
+        if self.shard_count is None:
+            return "자동"
+        if self.shard_ids is None:
+            return f"{self.shard_count}개 전체"
+        return f"{self.shard_count}개 중 {', '.join(map(str, self.shard_ids))}"
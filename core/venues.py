@@ -0,0 +1,85 @@
+import asyncio
+from typing import Optional
+
+VENUE_FEE_RATE = 0.02  # 땅 주인이 받는 수익 수수료 비율
+
+
+class VenueIndex:
+    """서버별 (채널 -> 땅 주인) 인덱스
+
+    서버마다 처음 필요할 때 한 번만 DB에서 읽고, 이후에는 땅 구매/인수 때 set_owner 로 갱신합니다.
+    게임 cog 는 fee_for 로 DB 조회 없이 땅 주인 수수료를 계산하고, 플레이어 정산이 끝난 뒤에만 pay_fee 로
+    수수료를 정산 큐에 보냅니다. (기다리지 않으며, 같은 주인에게 가는 수수료는 한 번의 정산에서 하나로 합쳐짐)
+    """
+
+    def __init__(self, db, settlement, *, fee_rate: float = VENUE_FEE_RATE):
+        self.db = db
+        self.settlement = settlement
+        self.fee_rate = fee_rate
+        self._owners = {}  # guild_id -> {channel_id: owner_id}
+        self._loading = {}  # guild_id -> 읽는 중인 Task (동시에 여러 번 읽지 않도록)
+
+    async def owners(self, guild_id: int) -> dict:
+        owners = self._owners.get(guild_id)
+        if owners is not None:
+            return owners
+
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = self._loading[guild_id] = asyncio.ensure_future(self._load(guild_id))
+            task.add_done_callback(lambda done: self._loading.pop(guild_id, None)
+                                   if self._loading.get(guild_id) is done else None)
+        return await asyncio.shield(task)
+
+    async def _load(self, guild_id: int) -> dict:
+        rows = await self.db.fetchall("""
+            SELECT channel_id, owner_id
+            FROM lands
+            WHERE guild_id = %s AND owner_id IS NOT NULL
+        """, (guild_id,))
+        owners = dict(rows)
+        # 읽는 동안 주인이 바뀌었다면 오래된 값이므로 저장하지 않음 (다음 조회 때 다시 읽음)
+        if self._loading.get(guild_id) is asyncio.current_task():
+            self._owners[guild_id] = owners
+        return owners
+
+    async def owner(self, guild_id: int, channel_id: int) -> Optional[int]:
+        return (await self.owners(guild_id)).get(channel_id)
+
+    def set_owner(self, guild_id: int, channel_id: int, owner_id: Optional[int]):
+        """땅 주인이 바뀌었을 때 호출"""
+        self._loading.pop(guild_id, None)
+        owners = self._owners.get(guild_id)
+        if owners is None:
+            return
+        if owner_id is None:
+            owners.pop(channel_id, None)
+        else:
+            owners[channel_id] = owner_id
+
+    def forget_guild(self, guild_id: int):
+        self._owners.pop(guild_id, None)
+        self._loading.pop(guild_id, None)
+
+    async def fee_for(self, guild_id: int, channel_id: int, player_id: int, winnings: int):
+        """게임 수익에 대한 (땅 주인 수수료, 땅 주인 ID)
+
+        수익이 없거나, 주인이 없는 땅이거나, 플레이어 자신의 땅이면 수수료는 0 입니다.
+        """
+        if winnings <= 0:
+            return 0, None
+        owner_id = await self.owner(guild_id, channel_id)
+        if owner_id is None or owner_id == player_id:
+            return 0, None
+        return int(winnings * self.fee_rate), owner_id
+
+    def pay_fee(self, owner_id: Optional[int], fee: int):
+        """수수료를 정산 큐에 넣음 (실패는 정산 큐에서 기록)"""
+        if owner_id is None or fee <= 0:
+            return
+        self.settlement.submit(owner_id, fee).add_done_callback(_consume)
+
+
+def _consume(future):
+    if not future.cancelled():
+        future.exception()
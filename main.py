@@ -1,45 +1,134 @@
+import argparse
 import os
+import time
+
 import discord
 from discord.ext import commands
-import psycopg2
 from dotenv import load_dotenv
 
+from core.balances import BalanceCache
+from core.command_sync import CommandSync
+from core.db import Database
+from core.guild_members import GuildMembers
+from core.leaderboard import BalanceLeaderboard
+from core.members import MemberNames, client_options
+from core.metrics import CommandMetrics
+from core.migrations import migrate
+from core.permissions import PermissionTree
+from core.registry import UserRegistry
+from core.settlement import SettlementQueue
+from core.sharding import ShardPlan, parse_shard_ids
+from core.venues import VenueIndex
+
 load_dotenv()
 
-class AClient(commands.Bot):
-    def __init__(self):
-        super().__init__(command_prefix="!", intents=discord.Intents.all())
-        self.synced = False
-        self.conn = psycopg2.connect(
-            dbname=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            host=os.getenv("DB_HOST")
-        )
-        self.cursor = self.conn.cursor()
+COGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cogs")
 
-    async def setup_hook(self):
-        guild = discord.Object(id=os.getenv("GUILD_ID"))  # 여기에 당신의 서버 ID를 넣으세요
-        self.tree.copy_global_to(guild=guild)
-        await self.tree.sync(guild=guild)
+class AClient(commands.AutoShardedBot):
+    def __init__(self, force_sync: bool = False, shard_plan: ShardPlan = None):
+        # 이 프로세스가 맡은 샤드 (SHARD_COUNT / SHARD_IDS, 비우면 권장 샤드 수로 자동)
+        self.shard_plan = shard_plan or ShardPlan.from_env()
+        # MEMBER_CACHE=lean 이면 presence 와 멤버 목록 캐시 없이 실행 (기본 full)
+        self.member_cache = os.getenv("MEMBER_CACHE", "full")
+        # 명령어 채널 권한은 PermissionTree 에서 한 번에 검사
+        super().__init__(command_prefix="!", tree_cls=PermissionTree, **client_options(self.member_cache),
+                         shard_count=self.shard_plan.shard_count, shard_ids=self.shard_plan.shard_ids)
+        # 순위/내역에 표시할 멤버 이름 (MEMBER_NAME_CACHE_SIZE / MEMBER_NAME_CACHE_TTL)
+        self.member_names = MemberNames.from_env()
+        # 시작 단계별 소요 시간 (on_ready 에서 출력)
+        self.started_at = time.perf_counter()
+        self.startup_timings = {}
+        # 명령어 트리가 바뀌었을 때만 동기화 (--force-sync 또는 FORCE_COMMAND_SYNC=1 이면 항상)
+        self.force_sync = force_sync or os.getenv("FORCE_COMMAND_SYNC") == "1"
+        # 명령어별 지연 시간/쿼리 수/오류 수 (/통계, METRICS_PORT 의 /metrics)
+        self.command_metrics = CommandMetrics()
+        # 커넥션 풀은 setup_hook 에서 연결합니다 (DB_POOL_MIN / DB_POOL_MAX 로 크기 조절, 맡은 샤드 비율만큼)
+        self.db = Database.from_env(self.shard_plan.share)
+        # 잔액 캐시 (BALANCE_CACHE_SIZE / BALANCE_CACHE_TTL)
+        self.balances = BalanceCache.from_env(self.db)
+        # 서버별 멤버 목록(guild_members)과 그 테이블로 조회하는 잔고 순위
+        self.guild_members = GuildMembers(self.db)
+        self.leaderboard = BalanceLeaderboard(self.db)
+        # users 테이블에 행이 있는지 보장 (KNOWN_USERS_SIZE 명까지 기억)
+        self.user_registry = UserRegistry.from_env(self.db, self.balances)
+        # 게임 정산은 모아서 한 번에 반영 (SETTLEMENT_FLUSH_MS / SETTLEMENT_MAX_BATCH)
+        self.settlement = SettlementQueue.from_env(self.db, self.balances)
+        # 채널별 땅 주인 (게임 수익의 땅 주인 수수료 계산용)
+        self.venues = VenueIndex(self.db, self.settlement)
+
+    async def open_services(self):
+        """DB 연결과 백그라운드 작업 시작 (Discord 연결 없이도 호출 가능, 벤치마크에서도 사용)"""
+        await self.db.open()
+        # 테이블/인덱스는 migrations 폴더의 SQL 로만 만들고 바꿈 (적용 기록은 schema_migrations)
+        applied = await migrate(self.db)
+        if applied:
+            print(f"마이그레이션 적용: {', '.join(applied)}")
+        self.settlement.start()
+        await self.user_registry.warm()
+
+    async def load_cogs(self):
         # cogs 폴더 내 모든 .py 파일을 로드합니다.
-        for filename in os.listdir("./cogs"):
+        for filename in sorted(os.listdir(COGS_DIR)):
             if filename.endswith(".py"):
                 await self.load_extension(f"cogs.{filename[:-3]}")  # .py 확장자 제거
-        if not self.synced:  # 명령어를 한 번만 동기화
-            await self.tree.sync()
-            self.synced = True
+
+    async def sync_commands(self):
+        """모든 확장을 로드한 뒤의 명령어 트리를 마지막으로 동기화한 것과 비교해서 바뀐 범위만 동기화"""
+        # 명령어는 샤드와 무관하므로 샤드 0 을 맡은 프로세스만 동기화
+        if not self.shard_plan.primary:
+            print("명령어 동기화는 샤드 0 프로세스가 담당")
+            return
+        command_sync = CommandSync(self.db, self.tree)
+        synced = []
+        guild_id = os.getenv("GUILD_ID")  # 여기에 당신의 서버 ID를 넣으세요
+        if guild_id:
+            guild = discord.Object(id=int(guild_id))
+            self.tree.copy_global_to(guild=guild)
+            if await command_sync.sync(self.application_id, guild, force=self.force_sync):
+                synced.append(f"서버 {guild_id}")
+        if await command_sync.sync(self.application_id, force=self.force_sync):
+            synced.append("전역")
+        print(f"명령어 동기화: {', '.join(synced)}" if synced else "명령어 변경 없음, 동기화 생략")
+
+    async def setup_hook(self):
+        start = time.perf_counter()
+        await self.open_services()
+        self.startup_timings["DB 연결"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await self.load_cogs()
+        self.startup_timings["확장 로드"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await self.sync_commands()
+        self.startup_timings["명령어 동기화"] = time.perf_counter() - start
         print("준비 완료")
 
-    def close_db(self):
-        self.cursor.close()
-        self.conn.close()
+    async def on_ready(self):
+        # 재연결 때마다 불리므로 처음 한 번만 출력
+        if "준비" in self.startup_timings:
+            return
+        self.startup_timings["준비"] = time.perf_counter() - self.started_at
+        print(f"샤드: {', '.join(map(str, sorted(self.shards)))} / {self.shard_count}, 서버 {len(self.guilds):,}개")
+        print("시작 시간: " + ", ".join(f"{name} {seconds:.2f}초" for name, seconds in self.startup_timings.items()))
+
+    async def close_services(self):
+        """open_services 의 반대. 남은 정산을 반영한 뒤 풀을 닫음"""
+        await self.settlement.close()
+        await self.db.close()
 
-client = AClient()
+    async def close(self):
+        await super().close()
+        await self.close_services()
 
-@client.event
-async def on_close():
-    client.close_db()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="지민봇 실행")
+    parser.add_argument("--force-sync", action="store_true", help="명령어가 바뀌지 않았어도 Discord 에 동기화")
+    parser.add_argument("--shard-count", type=int, help="전체 샤드 수 (SHARD_COUNT)")
+    parser.add_argument("--shard-ids", help="이 프로세스가 맡을 샤드, 예: 0,1 또는 0-3 (SHARD_IDS)")
+    args = parser.parse_args()
+    client = AClient(force_sync=args.force_sync,
+                     shard_plan=ShardPlan.from_env(args.shard_count, parse_shard_ids(args.shard_ids)))
 
-# 봇 실행
-client.run(os.getenv("DISCORD_TOKEN"))
+    # 봇 실행
+    client.run(os.getenv("DISCORD_TOKEN"))
@@ -0,0 +1,41 @@
+-- 봇이 처음부터 사용하던 테이블 (이미 있는 DB에서는 그대로 둠)
+CREATE TABLE IF NOT EXISTS users (
+    uuid BIGINT PRIMARY KEY,
+    money BIGINT NOT NULL DEFAULT 0,
+    last_hourly TIMESTAMP,
+    last_interest TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS lands (
+    id SERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    owner_id BIGINT,
+    current_price BIGINT NOT NULL,
+    purchase_date TIMESTAMP,
+    last_transaction_date TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS land_transactions (
+    id SERIAL PRIMARY KEY,
+    land_id INTEGER REFERENCES lands (id),
+    seller_id BIGINT,
+    buyer_id BIGINT,
+    transaction_price BIGINT,
+    transaction_type VARCHAR(20)
+);
+
+CREATE TABLE IF NOT EXISTS guild_settings (
+    guild_id BIGINT PRIMARY KEY,
+    notification_channel_id BIGINT,
+    notification_role_id BIGINT
+);
+
+-- channel_id 가 0 인 행은 서버 전체 규칙
+CREATE TABLE IF NOT EXISTS command_permissions (
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    allow_mask INTEGER NOT NULL DEFAULT 0,
+    deny_mask INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, channel_id)
+);
@@ -0,0 +1,42 @@
+-- 예전 구매 경로는 동시에 사면 같은 채널에 땅 행을 여러 개 만들 수 있었음
+-- 채널마다 가장 최근에 거래된 행만 남기고, 지우는 행의 거래 내역은 남기는 행으로 옮김
+CREATE TEMP TABLE land_duplicates ON COMMIT DROP AS
+SELECT id, keep_id FROM (
+    SELECT id, FIRST_VALUE(id) OVER (
+        PARTITION BY guild_id, channel_id
+        ORDER BY COALESCE(last_transaction_date, purchase_date) DESC NULLS LAST, id DESC
+    ) AS keep_id
+    FROM lands
+) ranked
+WHERE id <> keep_id;
+
+UPDATE land_transactions t
+SET land_id = d.keep_id
+FROM land_duplicates d
+WHERE t.land_id = d.id;
+
+DELETE FROM lands l
+USING land_duplicates d
+WHERE l.id = d.id;
+
+-- 땅 구매 쿼리의 ON CONFLICT 와 /땅정보 조회
+CREATE UNIQUE INDEX IF NOT EXISTS lands_guild_channel_key ON lands (guild_id, channel_id);
+
+-- /내땅 목록과 서버별 보유 현황
+CREATE INDEX IF NOT EXISTS lands_guild_owner_idx ON lands (guild_id, owner_id, purchase_date DESC);
+
+-- 잔고 순 조회, 이자 지급 대상(money >= 최소 잔고)
+CREATE INDEX IF NOT EXISTS users_money_idx ON users (money DESC);
+
+-- 시작 시 최근 활동한 사용자부터 읽기 (UserRegistry.warm)
+CREATE INDEX IF NOT EXISTS users_last_active_idx ON users (GREATEST(last_hourly, last_interest) DESC NULLS LAST);
+
+-- 땅 가격은 음수가 될 수 없음 (기존 데이터 검사는 건너뛰고 새로 쓰는 값부터 적용)
+-- users.money 는 /벌금 등으로 음수가 될 수 있으므로 제약을 걸지 않음
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'lands_current_price_check') THEN
+        ALTER TABLE lands ADD CONSTRAINT lands_current_price_check CHECK (current_price >= 0) NOT VALID;
+    END IF;
+END
+$$;
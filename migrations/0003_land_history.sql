@@ -0,0 +1,30 @@
+-- 서버별 거래 내역 조회를 위해 guild_id 를 내역에 같이 저장 (기존 내역은 lands 에서 채움)
+ALTER TABLE land_transactions ADD COLUMN IF NOT EXISTS guild_id BIGINT;
+ALTER TABLE land_transactions ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT NOW();
+
+UPDATE land_transactions t
+SET guild_id = l.guild_id
+FROM lands l
+WHERE t.land_id = l.id AND t.guild_id IS NULL;
+
+UPDATE land_transactions SET created_at = NOW() WHERE created_at IS NULL;
+
+-- 서버 / 땅 / 구매자 / 판매자별 keyset 조회
+CREATE INDEX IF NOT EXISTS land_transactions_guild_idx ON land_transactions (guild_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS land_transactions_land_idx ON land_transactions (land_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS land_transactions_buyer_idx ON land_transactions (guild_id, buyer_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS land_transactions_seller_idx ON land_transactions (guild_id, seller_id, created_at DESC, id DESC);
+
+-- 오래된 내역 보관
+CREATE INDEX IF NOT EXISTS land_transactions_created_idx ON land_transactions (created_at, id);
+
+CREATE TABLE IF NOT EXISTS land_transactions_archive (
+    id BIGINT PRIMARY KEY,
+    guild_id BIGINT,
+    land_id BIGINT,
+    seller_id BIGINT,
+    buyer_id BIGINT,
+    transaction_price BIGINT,
+    transaction_type VARCHAR(20),
+    created_at TIMESTAMP
+);
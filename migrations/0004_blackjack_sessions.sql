@@ -0,0 +1,10 @@
+-- 진행 중인 블랙잭 게임 (패는 카드 번호 바이트열)
+CREATE TABLE IF NOT EXISTS blackjack_sessions (
+    user_id BIGINT PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    amount BIGINT NOT NULL,
+    player BYTEA NOT NULL,
+    dealer BYTEA NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,6 @@
+-- 마지막으로 동기화한 명령어 트리의 해시 (애플리케이션:범위 별)
+CREATE TABLE IF NOT EXISTS command_sync (
+    scope TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    synced_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,10 @@
+-- 서버별 멤버 목록 (입장/퇴장 이벤트로 갱신하고 시작할 때 Discord 와 맞춤)
+CREATE TABLE IF NOT EXISTS guild_members (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+
+-- /순위 keyset 페이지 (잔액 내림차순, 같으면 id 오름차순)
+CREATE INDEX IF NOT EXISTS users_rank_idx ON users (money DESC, uuid);
+DROP INDEX IF EXISTS users_money_idx;
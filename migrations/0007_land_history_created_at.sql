@@ -0,0 +1,30 @@
+-- 0003 에서 created_at 을 추가할 때 기존 내역은 모두 마이그레이션 시각(NOW())으로 채워졌음
+-- 그 시각이 찍힌 내역을 실제 거래 시각으로 다시 채움 (보관 작업과 시간순 조회가 옛 내역을 제대로 다루도록)
+-- 기존 테이블에 transaction_date 가 있으면 그 값을, 없으면 땅의 구매일(첫 구매)/마지막 거래일(인수)로 추정
+DO $$
+DECLARE
+    stamped TIMESTAMP;
+BEGIN
+    SELECT applied_at INTO stamped FROM schema_migrations WHERE version = 3;
+    IF stamped IS NULL THEN
+        RETURN;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'land_transactions'
+          AND column_name = 'transaction_date'
+    ) THEN
+        EXECUTE 'UPDATE land_transactions SET created_at = transaction_date
+                 WHERE created_at = $1 AND transaction_date IS NOT NULL' USING stamped;
+    END IF;
+
+    UPDATE land_transactions t
+    SET created_at = CASE WHEN t.transaction_type = 'PURCHASE'
+                          THEN COALESCE(l.purchase_date, l.last_transaction_date)
+                          ELSE COALESCE(l.last_transaction_date, l.purchase_date) END
+    FROM lands l
+    WHERE t.land_id = l.id AND t.created_at = stamped
+      AND COALESCE(l.purchase_date, l.last_transaction_date) IS NOT NULL;
+END
+$$;
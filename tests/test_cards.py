@@ -0,0 +1,53 @@
+import random
+
+from core.cards import DECK_SIZE, Hand, Shoe
+
+# 카드 번호 (무늬 = card // 13, 숫자 = card % 13 + 1)
+ACE, FIVE, SIX, NINE, TEN, KING = 0, 4, 5, 8, 9, 12
+
+
+def test_hand_totals():
+    assert Hand((TEN, NINE)).total == 19
+    soft = Hand((ACE, SIX))
+    assert soft.total == 17 and soft.soft
+    # A 를 11점으로 세면 21을 넘으므로 hard 로 바뀜
+    assert soft.add(KING) == 17 and not soft.soft
+    assert Hand((ACE, ACE, NINE)).total == 21
+    assert Hand((TEN, SIX, KING)).busted
+
+
+def test_blackjack_needs_two_cards():
+    assert Hand((ACE, KING)).is_blackjack()
+    assert not Hand((FIVE, SIX, TEN)).is_blackjack()
+
+
+def test_shoe_is_reproducible_with_seed():
+    first = Shoe(2, 0.75, random.Random(42))
+    second = Shoe(2, 0.75, random.Random(42))
+    assert [first.draw() for _ in range(50)] == [second.draw() for _ in range(50)]
+
+
+def test_shoe_deals_every_card_once():
+    shoe = Shoe(2, 1.0, random.Random(1))
+    cards = sorted(shoe.draw() for _ in range(2 * DECK_SIZE))
+    assert cards == sorted(list(range(DECK_SIZE)) * 2)
+
+
+def test_shoe_shuffles_only_in_prepare():
+    shoe = Shoe(1, 0.5, random.Random(7))
+    for _ in range(shoe.cut):
+        shoe.draw()
+    assert shoe.needs_shuffle
+    # 컷 카드를 지나도 게임 도중의 드로우는 같은 슈에서 계속 뽑음
+    shoe.draw()
+    assert shoe.remaining == DECK_SIZE - shoe.cut - 1
+    shoe.prepare()
+    assert shoe.remaining == DECK_SIZE and not shoe.needs_shuffle
+
+
+def test_shoe_reshuffles_when_empty():
+    shoe = Shoe(1, 1.0, random.Random(3))
+    for _ in range(DECK_SIZE):
+        shoe.draw()
+    shoe.draw()
+    assert shoe.remaining == DECK_SIZE - 1
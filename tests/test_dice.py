@@ -0,0 +1,69 @@
+import random
+
+from core.dice import play_rounds, roll
+
+# 홀수에 100원씩, 이기면 +75원
+AMOUNT, WIN = 100, 75
+ODD, EVEN = 1, 2
+
+
+def test_roll_is_reproducible_with_seed():
+    assert roll(20, random.Random(7)) == roll(20, random.Random(7))
+    assert all(1 <= dice <= 6 for dice in roll(100, random.Random(7)))
+
+
+def test_plays_every_round_when_nothing_stops():
+    run = play_rounds([ODD, EVEN, ODD], True, AMOUNT, WIN, 1000)
+    assert run.played == 3 and run.stopped is None
+    assert (run.wins, run.losses, run.net) == (2, 1, 50)
+
+
+def test_stop_loss():
+    run = play_rounds([EVEN, EVEN, ODD, ODD], True, AMOUNT, WIN, 1000, stop_loss=200)
+    assert run.rolls == [EVEN, EVEN]
+    assert run.stopped == "stop_loss" and run.net == -200
+
+
+def test_take_profit():
+    run = play_rounds([ODD, ODD, EVEN, EVEN], True, AMOUNT, WIN, 1000, take_profit=150)
+    assert run.rolls == [ODD, ODD]
+    assert run.stopped == "take_profit" and run.net == 150
+
+
+def test_limits_are_not_reported_after_the_last_round():
+    run = play_rounds([EVEN, EVEN], True, AMOUNT, WIN, 1000, stop_loss=200)
+    assert run.played == 2 and run.stopped is None
+
+
+def test_runs_out_of_money():
+    run = play_rounds([EVEN, EVEN, EVEN], True, AMOUNT, WIN, 150)
+    assert run.rolls == [EVEN]
+    assert run.stopped == "balance" and run.net == -100
+    # 잔액이 배팅 금액보다 적으면 한 판도 하지 않음
+    assert play_rounds([ODD], True, AMOUNT, WIN, 99).played == 0
+
+
+def test_required_is_the_lowest_starting_balance():
+    run = play_rounds([ODD, EVEN, EVEN, ODD, EVEN], True, AMOUNT, WIN, 1000)
+    assert run.net == -150
+    # 네 번째 판을 시작할 때 가장 많이 잃은 상태 (-125원) 이므로 100 + 125 원이 있어야 함
+    assert run.required == 225
+    assert play_rounds(run.rolls, True, AMOUNT, WIN, run.required).played == run.played
+    assert play_rounds(run.rolls, True, AMOUNT, WIN, run.required - 1).stopped == "balance"
+
+
+def test_seeded_runs_keep_their_invariants():
+    rng = random.Random(42)
+    for _ in range(200):
+        rolls = roll(10, rng)
+        balance = rng.randrange(0, 1000)
+        odd = rng.random() < 0.5
+        run = play_rounds(rolls, odd, AMOUNT, WIN, balance, stop_loss=300, take_profit=300)
+        assert run.rolls == rolls[:run.played]
+        assert run.net == run.wins * WIN - run.losses * AMOUNT
+        assert run.played == 0 or run.required <= balance
+        if run.stopped == "balance":
+            assert balance + run.net < AMOUNT
+        # 시작 잔액이 required 면 같은 판을 끝까지 진행할 수 있음
+        if run.played:
+            assert play_rounds(run.rolls, odd, AMOUNT, WIN, run.required).played == run.played
@@ -0,0 +1,57 @@
+from core.permissions import GUILD_SCOPE, Category, PermissionTable
+
+BANK, GAMBLING, LAND = Category.BANK, Category.GAMBLING, Category.LAND
+CASINO, LOBBY, OTHER = 11, 12, 13  # 채널 id
+
+
+def test_no_rules_allows_everything():
+    table = PermissionTable()
+    assert all(table.allows(OTHER, category) for category in Category)
+
+
+def test_guild_deny_applies_to_every_channel():
+    table = PermissionTable({GUILD_SCOPE: (0, GAMBLING)})
+    assert not table.allows(OTHER, GAMBLING)
+    assert table.allows(OTHER, BANK)
+
+
+def test_channel_allow_overrides_guild_deny():
+    table = PermissionTable({GUILD_SCOPE: (0, GAMBLING), CASINO: (GAMBLING, 0)})
+    assert table.allows(CASINO, GAMBLING)
+    assert not table.allows(LOBBY, GAMBLING)
+
+
+def test_allow_list_restricts_category_to_listed_channels():
+    table = PermissionTable({CASINO: (GAMBLING, 0)})
+    assert table.allows(CASINO, GAMBLING)
+    # 허용 채널이 있는 분류는 규칙이 없는 채널에서 막히고, 다른 분류는 그대로
+    assert not table.allows(OTHER, GAMBLING)
+    assert table.allows(OTHER, LAND)
+    # 다른 분류의 규칙만 있는 채널에서도 막힘
+    table = table.with_rule(LOBBY, BANK, 0)
+    assert not table.allows(LOBBY, GAMBLING)
+    assert not table.allows(OTHER, BANK)
+
+
+def test_channel_deny_beats_channel_allow():
+    table = PermissionTable({CASINO: (GAMBLING | LAND, GAMBLING)})
+    assert not table.allows(CASINO, GAMBLING)
+    assert table.allows(CASINO, LAND)
+
+
+def test_channel_deny_only_blocks_that_channel():
+    table = PermissionTable({LOBBY: (0, BANK)})
+    assert not table.allows(LOBBY, BANK)
+    assert table.allows(OTHER, BANK)
+
+
+def test_with_rule_replaces_and_removes_rules():
+    table = PermissionTable({CASINO: (GAMBLING, 0)})
+    updated = table.with_rule(CASINO, 0, GAMBLING)
+    assert not updated.allows(CASINO, GAMBLING)
+    assert updated.allows(OTHER, GAMBLING)
+    # 허용/차단이 모두 0 이면 규칙을 지움
+    cleared = updated.with_rule(CASINO, 0, 0)
+    assert CASINO not in cleared.rules
+    # 원래 테이블은 바뀌지 않음
+    assert table.allows(CASINO, GAMBLING) and not table.allows(OTHER, GAMBLING)